@@ -20,6 +20,7 @@ from app.api.v1.endpoints import (
 from app.api.v1.endpoints import rules
 from app.api.v1.endpoints import ai
 from app.api.v1.endpoints import genetic_timetable
+from app.api.v1.endpoints import generation_jobs
 from app.api.v1.endpoints import users
 
 
@@ -37,6 +38,7 @@ api_router.include_router(constraints.router, prefix="/constraints", tags=["Cons
 api_router.include_router(rules.router, prefix="/rules", tags=["Rules"])
 api_router.include_router(ai.router, prefix="/ai", tags=["AI Assistance"])
 api_router.include_router(genetic_timetable.router, prefix="/genetic-timetable", tags=["Genetic Algorithm Timetable"])
+api_router.include_router(generation_jobs.router, prefix="/generation-jobs", tags=["Generation Jobs"])
 api_router.include_router(enrollments.router, prefix="/enrollments", tags=["Enrollments"])
 
 # ✅ ADMIN ROUTES (THIS WAS MISSING)
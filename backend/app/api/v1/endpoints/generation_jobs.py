@@ -0,0 +1,77 @@
+from typing import List, Dict, Any
+from fastapi import APIRouter, Query, Depends, HTTPException, status
+from app.services.auth import get_current_active_user
+from app.models.user import User
+from app.services.timetable.jobs import job_manager, serialize_job, JOB_COMPLETED, JOB_FAILED, ACTIVE_STATUSES
+
+router = APIRouter()
+
+async def _get_job_for_user(job_id: str, current_user: User, include_result: bool = False) -> Dict[str, Any]:
+    """Load a job, checking that it exists and belongs to the user (admins see every job)"""
+    job = await job_manager.get_job(job_id, include_result=include_result)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Generation job not found")
+    if current_user.role.value != "admin" and str(job.get("created_by")) != str(current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to access this generation job")
+    return job
+
+@router.get("/", response_model=List[dict])
+async def list_generation_jobs(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of jobs to return"),
+    current_user: User = Depends(get_current_active_user),
+):
+    """List recent generation jobs (all jobs for admins, otherwise the user's own)"""
+    user_id = None if current_user.role.value == "admin" else current_user.id
+    jobs = await job_manager.list_jobs(user_id, limit)
+    return [serialize_job(job) for job in jobs]
+
+@router.get("/{job_id}")
+async def get_generation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the status of a generation job, including its latest progress"""
+    job = await _get_job_for_user(job_id, current_user)
+    return serialize_job(job)
+
+@router.get("/{job_id}/progress")
+async def get_generation_job_progress(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get only the status and latest progress event of a generation job"""
+    job = await _get_job_for_user(job_id, current_user)
+    return {"job_id": job_id, "status": job.get("status"), "progress": job.get("progress")}
+
+@router.get("/{job_id}/result")
+async def get_generation_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the result of a completed generation job"""
+    job = await _get_job_for_user(job_id, current_user, include_result=True)
+    if job.get("status") == JOB_FAILED:
+        error = job.get("error") or {}
+        raise HTTPException(status_code=error.get("status_code", 500), detail=error.get("detail", "Generation failed"))
+    if job.get("status") != JOB_COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Generation job is {job.get('status')}, no result available"
+        )
+    return job["result"]
+
+@router.delete("/{job_id}")
+async def cancel_generation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Cancel a queued or running generation job"""
+    job = await _get_job_for_user(job_id, current_user)
+    if job.get("status") not in ACTIVE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Generation job is already {job.get('status')}"
+        )
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Generation job has already finished")
+    return {"message": "Generation job cancelled", "job_id": job_id}
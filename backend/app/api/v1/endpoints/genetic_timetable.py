@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
 from app.services.auth import get_current_active_user
 from app.models.user import User
 from app.services.genetic_algorithm.genetic_timetable_generator import GeneticTimetableGenerator
+from app.services.timetable import generation
+from app.services.timetable.generation import GenerationError, progress_event_stream
+from app.services.timetable.jobs import job_manager, serialize_job
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from app.db.mongodb import db
-from datetime import datetime
 import logging
 
 router = APIRouter()
@@ -25,6 +28,17 @@ class GeneticTimetableRequest(BaseModel):
     mutation_rate: float = Field(0.1, description="Mutation rate", ge=0.01, le=0.5)
     crossover_rate: float = Field(0.8, description="Crossover rate", ge=0.1, le=1.0)
     
+    # Island model: independent sub-populations evolved in parallel processes
+    islands: Optional[int] = Field(None, description="Number of islands (defaults to one per CPU core)", ge=1, le=32)
+    migration_interval: int = Field(10, description="Generations between migrations", ge=1, le=500)
+    migrants: int = Field(2, description="Best chromosomes sent to the next island at each migration", ge=1, le=50)
+    
+    # Reproducibility and caching
+    seed: Optional[int] = Field(None, description="Random seed (a random one is used if omitted)")
+    use_cache: bool = Field(True, description="Reuse the result of an identical earlier run")
+    time_budget_ms: Optional[int] = Field(None, description="Wall-clock budget; the best timetable found by then is returned", ge=100)
+    respect_published: bool = Field(True, description="Treat rooms and faculty booked by other published timetables as busy")
+    
     # Optional time and rules configuration
     time_rules: Dict[str, Any] = Field(default_factory=dict, description="Custom time rules configuration")
 
@@ -38,6 +52,16 @@ class GeneticTimetableResponse(BaseModel):
     conflicts: list = None
     fitness_score: float = None
     entries: list = None
+    cached: bool = False
+
+async def _ensure_program_exists(program_id: str):
+    """Raise 404 unless the program exists"""
+    program = await db.db.programs.find_one({"_id": ObjectId(program_id)})
+    if not program:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Program not found: {program_id}"
+        )
 
 @router.post("/generate", response_model=GeneticTimetableResponse)
 async def generate_genetic_timetable(
@@ -47,114 +71,14 @@ async def generate_genetic_timetable(
     """Generate timetable using genetic algorithm approach"""
     try:
         logger.info(f"Starting genetic algorithm timetable generation for program {request.program_id}")
+        await _ensure_program_exists(request.program_id)
         
-        # Validate program exists
-        program = await db.db.programs.find_one({"_id": ObjectId(request.program_id)})
-        if not program:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Program not found: {request.program_id}"
-            )
-        
-        # Initialize genetic algorithm generator
-        generator = GeneticTimetableGenerator()
-        
-        # Set custom parameters if provided
-        if request.population_size:
-            generator.population_size = request.population_size
-        if request.generations:
-            generator.generations = request.generations
-        if request.mutation_rate:
-            generator.mutation_rate = request.mutation_rate
-        if request.crossover_rate:
-            generator.crossover_rate = request.crossover_rate
-        
-        # Set custom time rules if provided
-        if request.time_rules:
-            generator.time_rules.update(request.time_rules)
-        
-        # Generate timetable using genetic algorithm
-        result = await generator.generate_timetable(
-            program_id=request.program_id,
-            semester=request.semester,
-            academic_year=request.academic_year
-        )
-        
-        logger.info(f"Genetic algorithm result: {result.keys()}")
-        logger.info(f"Timetable entries count: {len(result.get('timetable_entries', []))}")
-        print(f"DEBUG: Genetic algorithm result keys: {result.keys()}")
-        print(f"DEBUG: Timetable entries count: {len(result.get('timetable_entries', []))}")
-        print(f"DEBUG: First few entries: {result.get('timetable_entries', [])[:2]}")
-        
-        if not result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to generate timetable using genetic algorithm"
-            )
-        
-        # Save the generated timetable to database
-        timetable_doc = {
-            "title": request.title,
-            "program_id": ObjectId(request.program_id),
-            "semester": request.semester,
-            "academic_year": request.academic_year,
-            "entries": result["timetable_entries"],
-            "is_draft": False,
-            "created_by": ObjectId(current_user.id),
-            "created_at": datetime.utcnow(),
-            "generated_at": datetime.utcnow(),
-            "generation_method": "genetic_algorithm",
-            "validation_status": "generated",
-            "optimization_score": result["best_fitness_score"],
-            "metadata": {
-                "genetic_algorithm_stats": {
-                    "generations_completed": result["generations_completed"],
-                    "population_size": generator.population_size,
-                    "mutation_rate": generator.mutation_rate,
-                    "crossover_rate": generator.crossover_rate,
-                    "fitness_history": result["fitness_history"],
-                    "final_fitness_score": result["best_fitness_score"],
-                    "total_classes_scheduled": result["total_classes_scheduled"],
-                    "conflicts_detected": len(result["conflicts"]),
-                    "data_summary": result["data_collected"]
-                },
-                "time_slots_generated": result["time_slots_generated"],
-                "conflicts": result["conflicts"]
-            }
-        }
-        
-        # Insert timetable into database
-        insert_result = await db.db.timetables.insert_one(timetable_doc)
-        timetable_id = str(insert_result.inserted_id)
-        
-        logger.info(f"Genetic algorithm timetable generated successfully with ID: {timetable_id}")
-        
-        # Create response with entries included for frontend display
-        response_data = {
-            "success": True,
-            "message": "Timetable generated successfully using genetic algorithm",
-            "timetable_id": timetable_id,
-            "generation_stats": {
-                "generations_completed": result["generations_completed"],
-                "population_size": generator.population_size,
-                "mutation_rate": generator.mutation_rate,
-                "crossover_rate": generator.crossover_rate,
-                "total_classes_scheduled": result["total_classes_scheduled"],
-                "time_slots_generated": result["time_slots_generated"]
-            },
-            "data_summary": {
-                **result["data_collected"],
-                "total_entries": result["total_classes_scheduled"]
-            },
-            "conflicts": result["conflicts"],
-            "fitness_score": result["best_fitness_score"],
-            "entries": result["timetable_entries"]  # Include entries for frontend display
-        }
-        
-        return response_data
+        return await generation.generate_genetic_timetable(request.dict(), current_user.id)
         
     except HTTPException:
         raise
+    except GenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         logger.error(f"Error generating genetic algorithm timetable: {str(e)}")
         raise HTTPException(
@@ -162,6 +86,44 @@ async def generate_genetic_timetable(
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.post("/generate/stream")
+async def stream_genetic_timetable(
+    request: GeneticTimetableRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Generate a timetable with the genetic algorithm, streaming progress as server-sent events
+
+    Sends a `progress` event after every migration interval (best fitness,
+    conflicts, per-island best and elapsed time) and a final `result` or
+    `error` event. Closing the stream stops the evolution early; the best
+    timetable found so far is still saved.
+    """
+    await _ensure_program_exists(request.program_id)
+    params = request.dict()
+    return StreamingResponse(
+        progress_event_stream(lambda progress: generation.generate_genetic_timetable(params, current_user.id, progress)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/jobs", status_code=202)
+async def submit_genetic_timetable_job(
+    request: GeneticTimetableRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Queue genetic algorithm generation as a background job and return its id immediately
+
+    Poll /generation-jobs/{job_id} for status and progress and fetch
+    /generation-jobs/{job_id}/result when it completes.
+    """
+    await _ensure_program_exists(request.program_id)
+    params = request.dict()
+    job = await job_manager.submit(
+        "genetic", params, current_user.id,
+        lambda progress: generation.generate_genetic_timetable(params, current_user.id, progress)
+    )
+    return serialize_job(job)
+
 @router.get("/algorithm-info")
 async def get_genetic_algorithm_info(
     current_user: User = Depends(get_current_active_user)
@@ -209,7 +171,10 @@ async def get_genetic_algorithm_info(
             "generations": 100,
             "mutation_rate": 0.1,
             "crossover_rate": 0.8,
-            "elite_size": 5
+            "elite_size": 5,
+            "islands": "one per CPU core",
+            "migration_interval": 10,
+            "migrants": 2
         }
     }
 
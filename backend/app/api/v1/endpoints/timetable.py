@@ -7,8 +7,13 @@ from app.models.user import User
 from app.models.timetable import Timetable, TimetableCreate
 from app.services.auth import get_current_active_user
 from app.db.mongodb import db
-from app.services.timetable.advanced_generator import AdvancedTimetableGenerator
-import asyncio
+from fastapi.responses import StreamingResponse
+from app.services.timetable.generation import (
+    GenerationError, check_generation_options, generate_for_timetable, generate_for_institution,
+    progress_event_stream
+)
+from app.services.timetable.jobs import job_manager, serialize_job
+from app.services.timetable.exporter import TimetableExporter
 import logging
 
 router = APIRouter()
@@ -654,13 +659,8 @@ async def delete_timetable(
 # =====================================================
 # GENERATE TIMETABLE
 # =====================================================
-@router.post("/{timetable_id}/generate")
-async def generate_timetable(
-    timetable_id: str,
-    request_body: dict = None,
-    current_user: User = Depends(get_current_active_user),
-):
-    """Generate timetable entries using AI/optimization with user-provided data"""
+async def _get_timetable_for_generation(timetable_id: str, current_user: User) -> Dict:
+    """Load the timetable to generate, checking that it exists and the user is an admin"""
     # Check if timetable exists
     try:
         existing = await db.db.timetables.find_one({"_id": ObjectId(timetable_id)})
@@ -674,123 +674,178 @@ async def generate_timetable(
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can generate timetables")
 
-    # Extract generation options and user data
-    opts = request_body or {}
-    method = opts.get("method", "advanced")
-    semester = existing.get("semester")
-    program_id = str(existing.get("program_id")) if existing.get("program_id") else None
-    
-    # Get academic setup (user-provided data from frontend)
-    academic_setup = opts.get("academic_setup", {})
-    user_courses = academic_setup.get("courses", [])
-    user_faculty = academic_setup.get("faculty", [])
-    user_rooms = academic_setup.get("rooms", [])
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"🔄 Generation request - User courses count: {len(user_courses)}, Faculty count: {len(user_faculty)}")
-
-    try:
-        if method == "advanced":
-            # Use AdvancedTimetableGenerator
-            generator = AdvancedTimetableGenerator()
-
-            # If user provided data, use it; otherwise load from database
-            if user_courses and len(user_courses) > 0:
-                logger.info(f"📥 Using user-provided data: {len(user_courses)} courses")
-                # Load with user-provided setup data
-                await generator.load_from_database_with_setup(program_id, semester, academic_setup)
-            else:
-                # Fallback to database data
-                logger.info("📥 Using database data (no user courses provided)")
-                await generator.load_from_database_with_setup(program_id, semester, academic_setup)
+    return existing
 
-            # Run the synchronous generation in a threadpool to avoid blocking event loop
-            loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(None, generator.generate_timetable, program_id, semester)
 
-            if not result.get("success"):
-                logger.error(f"Advanced generator failed: {result.get('error')}")
-                raise HTTPException(status_code=500, detail=result.get("error", "Generation failed"))
+@router.post("/generate/institution")
+async def generate_institution_timetables(
+    request_body: dict,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Generate the timetables of several programs and semesters together
 
-            # Save generated entries into timetable document
-            entries = result.get("schedule", [])
-            
-            # ✅ NEW: Validate faculty max periods per day constraint
-            faculty_max_per_day = 1  # Default to 1, can be overridden by metadata
-            if "metadata" in existing and isinstance(existing["metadata"], dict):
-                constraints = existing["metadata"].get("constraints", {})
-                faculty_max_per_day = constraints.get("faculty_max_periods_per_day", 1)
-            
-            # Check constraint: faculty max periods per day
-            faculty_periods_by_day = {}  # {faculty_id: {day: count}}
-            for entry in entries:
-                faculty_id = entry.get("faculty_id") or entry.get("faculty")
-                day = entry.get("day") or (entry.get("time_slot", {}).get("day") if isinstance(entry.get("time_slot"), dict) else None)
-                
-                if faculty_id and day:
-                    if faculty_id not in faculty_periods_by_day:
-                        faculty_periods_by_day[faculty_id] = {}
-                    if day not in faculty_periods_by_day[faculty_id]:
-                        faculty_periods_by_day[faculty_id][day] = 0
-                    faculty_periods_by_day[faculty_id][day] += 1
-            
-            # Check for violations
-            violations = []
-            for faculty_id, days_dict in faculty_periods_by_day.items():
-                for day, count in days_dict.items():
-                    if count > faculty_max_per_day:
-                        violations.append(f"Faculty {faculty_id} has {count} periods on {day} (max: {faculty_max_per_day})")
-            
-            if violations:
-                logger.warning(f"⚠️ Faculty constraint violations detected: {violations}")
-                print(f"⚠️ Faculty constraint violations: {violations}")
-            
-            update_doc = {
-                "entries": entries,
-                "is_draft": False,
-                "generated_at": datetime.utcnow(),
-                "generation_method": "advanced",
-                "validation_status": "generated",
-                "optimization_score": result.get("score"),
-                "metadata": {
-                    "generation_attempts": result.get("attempts_made"),
-                    "statistics": result.get("statistics"),
-                    "validation": result.get("validation"),
-                    "constraint_violations": violations if violations else []
-                }
-            }
+    Send `timetable_ids` with the usual advanced-engine options. The programs
+    are scheduled by department over the shared rooms and faculty, so no room
+    or faculty member is double-booked across them; each timetable that could
+    be placed is saved and the others are reported with their error.
+    """
+    timetable_ids = request_body.get("timetable_ids") or []
+    if not timetable_ids:
+        raise HTTPException(status_code=400, detail="timetable_ids is required")
+    timetables = [await _get_timetable_for_generation(timetable_id, current_user)
+                  for timetable_id in dict.fromkeys(timetable_ids)]
 
-            await db.db.timetables.update_one({"_id": ObjectId(timetable_id)}, {"$set": update_doc})
+    try:
+        return await generate_for_institution(timetables, request_body)
+    except GenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        logging.getLogger(__name__).exception("Error during institution-wide generation")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-            return {
-                "message": "Timetable generated successfully",
-                "timetable_id": timetable_id,
-                "status": "generated",
-                "entries": entries,
-                "score": result.get("score")
-            }
 
-        else:
-            # Unsupported method; fallback to generic response
-            raise HTTPException(status_code=400, detail=f"Unsupported generation method: {method}")
+@router.post("/{timetable_id}/generate")
+async def generate_timetable(
+    timetable_id: str,
+    request_body: dict = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Generate timetable entries using AI/optimization with user-provided data
+
+    Send `"mode": "repair"` (optionally with `unavailable_faculty` ids) to keep
+    the current entries that are still valid and re-place only the affected
+    ones instead of regenerating the whole timetable. `time_budget_ms` caps
+    the search; the best timetable found by then is returned together with
+    a `search` summary of how far the engine got. The advanced engine
+    improves its best attempt by local search; `improve_iterations` bounds
+    it (0 turns it off). Rooms and faculty booked by the other published
+    timetables of the same academic year count as taken unless
+    `respect_published` is false.
+    """
+    existing = await _get_timetable_for_generation(timetable_id, current_user)
 
-    except HTTPException:
-        raise
+    try:
+        return await generate_for_timetable(timetable_id, existing, request_body or {})
+    except GenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        logger.exception("Error during timetable generation")
+        logging.getLogger(__name__).exception("Error during timetable generation")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/{timetable_id}/generate/stream")
+async def stream_generate_timetable(
+    timetable_id: str,
+    request_body: dict = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Generate timetable entries, streaming progress as server-sent events
+
+    Accepts the same options as /generate. Sends a `progress` event per
+    attempt, generation or CP-SAT solution (score, violations, elapsed time)
+    and a final `result` or `error` event. Closing the stream stops the
+    engine early; the best timetable found so far is still saved.
+    """
+    existing = await _get_timetable_for_generation(timetable_id, current_user)
+    opts = request_body or {}
+    try:
+        check_generation_options(opts, existing)
+    except GenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return StreamingResponse(
+        progress_event_stream(lambda progress: generate_for_timetable(timetable_id, existing, opts, progress)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+
+@router.post("/{timetable_id}/generate/jobs", status_code=202)
+async def submit_generation_job(
+    timetable_id: str,
+    request_body: dict = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Queue timetable generation as a background job and return its id immediately
+
+    Accepts the same options as /generate. Poll /generation-jobs/{job_id}
+    for status and progress, fetch /generation-jobs/{job_id}/result when it
+    completes, or DELETE the job to cancel it.
+    """
+    existing = await _get_timetable_for_generation(timetable_id, current_user)
+    opts = request_body or {}
+    try:
+        check_generation_options(opts, existing)
+    except GenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    job = await job_manager.submit(
+        "timetable", opts, current_user.id,
+        lambda progress: generate_for_timetable(timetable_id, existing, opts, progress),
+        timetable_id=timetable_id
+    )
+    return serialize_job(job)
+
 # =====================================================
 # EXPORT TIMETABLE
 # =====================================================
+STREAMING_EXPORT_FORMATS = {"csv": "text/csv", "json": "application/json"}
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _streaming_export(query: Dict, format: str, filename: str, single: bool = False) -> StreamingResponse:
+    """Stream the timetables matching `query` as CSV or JSON"""
+    exporter = TimetableExporter()
+    if format == "csv":
+        body = exporter.stream_csv(query, per_timetable=not single)
+    else:
+        body = exporter.stream_json(query, single=single)
+    return StreamingResponse(
+        body,
+        media_type=STREAMING_EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
+
+async def _excel_export(query: Dict, views: str, filename: str) -> StreamingResponse:
+    """Send the workbook of the timetables matching `query` from its spooled file
+
+    `views` is a comma-separated list of timetable, group, faculty and room.
+    """
+    try:
+        workbook = await TimetableExporter().export_workbook(query, [view.strip() for view in views.split(",")])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def chunks(size: int = 64 * 1024):
+        try:
+            while True:
+                chunk = workbook.read(size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            workbook.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=EXCEL_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'}
+    )
+
+
 @router.get("/{timetable_id}/export")
 async def export_timetable(
     timetable_id: str,
     format: str = "excel",
+    views: str = "timetable",
     current_user: User = Depends(get_current_active_user),
 ):
-    """Export timetable in specified format"""
+    """Export timetable in specified format
+
+    Excel exports hold one sheet per entry in `views` (timetable, group,
+    faculty, room; comma-separated).
+    """
     # Check if timetable exists and user has access
     existing = await db.db.timetables.find_one({"_id": ObjectId(timetable_id)})
     if not existing:
@@ -808,13 +863,46 @@ async def export_timetable(
     ):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # TODO: Implement actual export logic
-    # For now, return a placeholder
-    if format == "json":
-        return existing
-    else:
-        # Return placeholder for other formats
-        return {"message": f"Export in {format} format not yet implemented"}
+    if format in STREAMING_EXPORT_FORMATS:
+        return _streaming_export({"_id": existing["_id"]}, format, f"timetable_{timetable_id}", single=True)
+    if format == "excel":
+        return await _excel_export({"_id": existing["_id"]}, views, f"timetable_{timetable_id}")
+
+    # Return placeholder for other formats
+    return {"message": f"Export in {format} format not yet implemented"}
+
+
+@router.get("/export/all")
+async def export_all_timetables(
+    format: str = "csv",
+    academic_year: str = None,
+    department: str = None,
+    views: str = "group,faculty,room",
+    current_user: User = Depends(get_current_active_user),
+):
+    """Export every published timetable (optionally of one academic year or department)
+
+    CSV and JSON are streamed with timetables read from a cursor and written
+    one at a time, so memory use does not grow with the number of timetables
+    exported. Excel workbooks hold one sheet per entry in `views` (timetable,
+    group, faculty, room; comma-separated), written write-only.
+    """
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export all timetables")
+    if format not in STREAMING_EXPORT_FORMATS and format != "excel":
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    query = {"is_draft": False}
+    if academic_year:
+        query["academic_year"] = academic_year
+    if department:
+        programs = await db.db.programs.find({"department": department}, {"_id": 1}).to_list(length=None)
+        # program_id may be stored as ObjectId or string
+        query["program_id"] = {"$in": [value for program in programs for value in (program["_id"], str(program["_id"]))]}
+    filename = "_".join(["timetables", department or "all", academic_year or "all"])
+    if format == "excel":
+        return await _excel_export(query, views, filename)
+    return _streaming_export(query, format, filename)
 
 
 # =====================================================
@@ -40,6 +40,11 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     
+    # Timetable generation
+    GENERATION_WORKERS: int = 2  # Generation runs (and queued jobs) executed at the same time
+    GENERATION_CACHE_SIZE: int = 64  # Cached results kept per process (0 disables the cache)
+    GENERATION_CACHE_COLLECTION: Optional[str] = None  # e.g. "generation_cache" to also keep results in MongoDB
+    
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
@@ -27,6 +27,7 @@ async def connect_to_mongo():
         await db.client.admin.command('ping')
         logging.info(f"Connected to MongoDB at {settings.MONGODB_URL[:50]}...")
         print(f"[SUCCESS] Successfully connected to MongoDB!")
+        await ensure_indexes()
         
     except Exception as e:
         logging.warning(f"Could not connect to MongoDB: {e}")
@@ -34,6 +35,14 @@ async def connect_to_mongo():
         logging.info("API will run without database connection for testing")
         # Don't raise exception - allow API to start without DB
 
+async def ensure_indexes():
+    """Create the indexes the generators' queries rely on (no-op if they exist)"""
+    try:
+        # Published timetables are read as pre-booked rooms and faculty before every generation
+        await db.db.timetables.create_index([("is_draft", 1), ("academic_year", 1)], name="published_by_year")
+    except Exception as e:
+        logging.warning(f"Could not create MongoDB indexes: {e}")
+
 async def close_mongo_connection():
     """Close database connection"""
     try:
@@ -1,12 +1,16 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.api.api_v1.api import api_router
 from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.services.timetable.parallel import shutdown_process_pools
+from app.services.timetable.generation import shutdown_generation_executor
+from app.services.timetable.jobs import job_manager
+from app.services.timetable.instrumentation import metrics
 
 # -------------------------
 # App Lifespan
@@ -15,8 +19,12 @@ from app.db.mongodb import connect_to_mongo, close_mongo_connection
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await job_manager.recover_interrupted_jobs()
     yield
     # Shutdown
+    await job_manager.shutdown()
+    shutdown_generation_executor()
+    shutdown_process_pools()
     await close_mongo_connection()
 
 # -------------------------
@@ -85,6 +93,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def generation_metrics():
+    """Generation counters and timings in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # -------------------------
 # API ROUTER (ONLY THIS)
 # -------------------------
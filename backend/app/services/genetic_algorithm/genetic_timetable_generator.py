@@ -1,16 +1,23 @@
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from functools import lru_cache
 import random
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import time
+from dataclasses import dataclass, replace
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import Executor
 import logging
 from app.db.mongodb import db
+from app.services.timetable.advanced_generator import t2min, min2t
+from app.services.timetable.parallel import get_process_pool, discard_process_pool, map_bounded, run_in_thread, worker_count
+from app.services.timetable.result_cache import ResultCache, fingerprint
+from app.services.timetable.instrumentation import GenerationStats, metrics
 from .data_collector import TimetableDataCollector
 
 logger = logging.getLogger(__name__)
 
 # -------------------- DATA STRUCTURES --------------------
 
-@dataclass
+@dataclass(frozen=True)
 class TimeSlot:
     day: str
     start_time: str
@@ -35,6 +42,33 @@ class Chromosome:
     fitness_score: float = 0.0
 
 
+# -------------------- TIME SLOT GRID --------------------
+
+MINUTES_PER_DAY = 24 * 60
+
+@lru_cache(maxsize=32)
+def compile_time_slots(days: Tuple[str, ...], start_time: str, end_time: str, class_duration: int,
+                       break_duration: int, lunch_start_time: str, lunch_end_time: str) -> Tuple[TimeSlot, ...]:
+    """Slot grid for a set of time rules, built once and shared by every generator,
+    island and worker epoch that uses the same rules"""
+    start, end = t2min(start_time), t2min(end_time)
+    lunch_start, lunch_end = t2min(lunch_start_time), t2min(lunch_end_time)
+    slots = []
+    for day in days:
+        current = start
+        while current < end:
+            next_time = current + class_duration
+            if not (lunch_start <= current < lunch_end):
+                slots.append(TimeSlot(
+                    day=day,
+                    start_time=min2t(current % MINUTES_PER_DAY),
+                    end_time=min2t(next_time % MINUTES_PER_DAY),
+                    duration_minutes=class_duration,
+                    slot_index=len(slots),
+                ))
+            current = next_time + break_duration
+    return tuple(slots)
+
 # -------------------- GENETIC ALGORITHM ENGINE --------------------
 
 class GeneticTimetableGenerator:
@@ -56,13 +90,25 @@ class GeneticTimetableGenerator:
         student_groups: Optional[List[Dict[str, Any]]] = None,
         academic_setup: Optional[Dict[str, Any]] = None,
         time_rules: Optional[Dict[str, Any]] = None,
+        islands: int = 1,
+        migration_interval: int = 10,
+        migrants: int = 2,
+        workers: Optional[int] = None,
+        reservations: Optional[List[Tuple[Optional[str], Optional[str], Any]]] = None,
     ):
-        self.population_size = population_size
+        self.population_size = population_size  # per island
         self.generations = generations
         self.mutation_rate = mutation_rate
         self.crossover_rate = crossover_rate
         self.elite_size = 5
 
+        # Island model: sub-populations evolve in separate processes and
+        # pass their best chromosomes around a ring every migration_interval
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.workers = workers
+
         self.test_mode = test_mode
         # when not in test mode we collect data from DB via TimetableDataCollector
         self.data_collector = None if test_mode else TimetableDataCollector()
@@ -76,6 +122,11 @@ class GeneticTimetableGenerator:
         self.time_rules = time_rules or {}
         self.time_slots: List[TimeSlot] = []
 
+        # (room id, faculty id, advanced-generator TimeSlot) booked by other
+        # timetables; genes using them at an overlapping slot count as conflicts
+        self.reservations = reservations or []
+        self.reserved_by_slot: Dict[int, Tuple[set, set]] = {}
+
         # sensible defaults for test mode
         if self.test_mode:
             if not self.academic_setup:
@@ -113,41 +164,33 @@ class GeneticTimetableGenerator:
     # -------------------- TIME SLOT GENERATION --------------------
 
     def generate_time_slots(self) -> List[TimeSlot]:
-        slots = []
-        index = 0
-
-        for day, enabled in self.academic_setup["working_days"].items():
-            if not enabled:
-                continue
-
-            current = datetime.strptime(self.time_rules["college_start_time"], "%H:%M")
-            end = datetime.strptime(self.time_rules["college_end_time"], "%H:%M")
-            lunch_start = datetime.strptime(self.time_rules["lunch_start_time"], "%H:%M")
-            lunch_end = datetime.strptime(self.time_rules["lunch_end_time"], "%H:%M")
-
-            while current < end:
-                next_time = current + timedelta(minutes=self.time_rules["class_duration"])
-
-                if not (lunch_start <= current < lunch_end):
-                    slots.append(
-                        TimeSlot(
-                            day=day,
-                            start_time=current.strftime("%H:%M"),
-                            end_time=next_time.strftime("%H:%M"),
-                            duration_minutes=self.time_rules["class_duration"],
-                            slot_index=index,
-                        )
-                    )
-                    index += 1
-
-                current = next_time + timedelta(minutes=self.time_rules["break_duration"])
-
-        self.time_slots = slots
-        return slots
+        days = tuple(day for day, enabled in self.academic_setup["working_days"].items() if enabled)
+        rules = self.time_rules
+        key = (days, rules["college_start_time"], rules["college_end_time"], rules["class_duration"],
+               rules["break_duration"], rules["lunch_start_time"], rules["lunch_end_time"])
+        self.time_slots = list(compile_time_slots(*key))
+        self.index_reservations()
+        return self.time_slots
+
+    def index_reservations(self):
+        """Reserved room and faculty ids per slot index of the slot grid"""
+        self.reserved_by_slot = {}
+        for slot in self.time_slots:
+            day, start = slot.day[:3].title(), t2min(slot.start_time)
+            end = start + slot.duration_minutes
+            rooms, faculty = set(), set()
+            for room_id, faculty_id, reserved in self.reservations:
+                if reserved.day == day and reserved.start_min < end and start < reserved.end_min:
+                    if room_id:
+                        rooms.add(room_id)
+                    if faculty_id:
+                        faculty.add(faculty_id)
+            if rooms or faculty:
+                self.reserved_by_slot[slot.slot_index] = (rooms, faculty)
 
     # -------------------- CHROMOSOME CREATION --------------------
 
-    def create_random_chromosome(self) -> Chromosome:
+    def create_random_chromosome(self, rng: random.Random = random) -> Chromosome:
         genes = []
 
         for course in self.courses:
@@ -167,10 +210,10 @@ class GeneticTimetableGenerator:
                 genes.append(
                     TimetableGene(
                         course_id=course["id"],
-                        faculty_id=random.choice(eligible_faculty)["id"],
-                        room_id=random.choice(eligible_rooms)["id"],
-                        group_id=random.choice(eligible_groups)["id"],
-                        time_slot=random.choice(self.time_slots),
+                        faculty_id=rng.choice(eligible_faculty)["id"],
+                        room_id=rng.choice(eligible_rooms)["id"],
+                        group_id=rng.choice(eligible_groups)["id"],
+                        time_slot=rng.choice(self.time_slots),
                         session_type="practical" if is_lab else "theory",
                     )
                 )
@@ -202,6 +245,12 @@ class GeneticTimetableGenerator:
         for g in chromosome.genes:
             key = f"{g.time_slot.day}-{g.time_slot.start_time}"
             slot_map.setdefault(key, []).append(g)
+            reserved = self.reserved_by_slot.get(g.time_slot.slot_index)
+            if reserved:
+                if g.room_id in reserved[0]:
+                    conflicts.append(f"Room reserved at {key}")
+                if g.faculty_id in reserved[1]:
+                    conflicts.append(f"Faculty reserved at {key}")
 
         for key, genes in slot_map.items():
             if len({g.faculty_id for g in genes}) < len(genes):
@@ -221,20 +270,220 @@ class GeneticTimetableGenerator:
 
     # -------------------- EVOLUTION --------------------
 
-    def evolve(self, population: List[Chromosome]) -> List[Chromosome]:
+    def crossover(self, p1: Chromosome, p2: Chromosome, rng: random.Random = random) -> Chromosome:
+        """Single-point crossover (genes are laid out in the same course order)"""
+        if len(p1.genes) != len(p2.genes) or len(p1.genes) < 2:
+            return Chromosome(genes=rng.choice([p1, p2]).genes.copy())
+        point = rng.randint(1, len(p1.genes) - 1)
+        return Chromosome(genes=p1.genes[:point] + p2.genes[point:])
+
+    def mutate(self, chromosome: Chromosome, rng: random.Random = random) -> Chromosome:
+        """Randomly reassign the time slot, faculty or room of some genes"""
+        genes = chromosome.genes
+        for i, gene in enumerate(genes):
+            if rng.random() >= self.mutation_rate:
+                continue
+            target = rng.choice(["time_slot", "faculty", "room"])
+            if target == "time_slot" and self.time_slots:
+                genes[i] = replace(gene, time_slot=rng.choice(self.time_slots))
+            elif target == "faculty" and self.faculty:
+                genes[i] = replace(gene, faculty_id=rng.choice(self.faculty)["id"])
+            elif target == "room" and self.rooms:
+                genes[i] = replace(gene, room_id=rng.choice(self.rooms)["id"])
+        return chromosome
+
+    def evolve(self, population: List[Chromosome], rng: random.Random = random) -> List[Chromosome]:
         population.sort(key=lambda c: c.fitness_score, reverse=True)
         new_population = population[: self.elite_size]
 
         while len(new_population) < self.population_size:
-            p1, p2 = random.sample(population[:20], 2)
-            child = Chromosome(genes=random.choice([p1, p2]).genes.copy())
-            new_population.append(child)
+            p1, p2 = rng.sample(population[:20], 2)
+            if rng.random() < self.crossover_rate:
+                child = self.crossover(p1, p2, rng)
+            else:
+                child = Chromosome(genes=rng.choice([p1, p2]).genes.copy())
+            new_population.append(self.mutate(child, rng))
 
         return new_population
 
+    def create_population(self, rng: random.Random = random) -> List[Chromosome]:
+        population = []
+        for _ in range(self.population_size):
+            c = self.create_random_chromosome(rng)
+            c.fitness_score = self.calculate_fitness(c)
+            population.append(c)
+        return population
+
+    def evolve_generations(self, population: List[Chromosome], generations: int,
+                           deadline: Optional[float] = None,
+                           rng: random.Random = random) -> Tuple[List[Chromosome], List[float]]:
+        """Run several generations, returning the scored population and best fitness per generation
+
+        Stops early once time.time() passes `deadline`. Random choices come
+        from `rng` (the module's global generator by default).
+        """
+        history = []
+        for _ in range(generations):
+            if deadline is not None and time.time() >= deadline:
+                break
+            for c in population:
+                c.fitness_score = self.calculate_fitness(c)
+            population = self.evolve(population, rng)
+            history.append(population[0].fitness_score)
+
+        for c in population:
+            c.fitness_score = self.calculate_fitness(c)
+        return population, history
+
+    # -------------------- ISLAND MODEL --------------------
+
+    def island_settings(self) -> Dict[str, Any]:
+        """Picklable snapshot of the data and parameters an island needs"""
+        return {
+            "population_size": self.population_size,
+            "mutation_rate": self.mutation_rate,
+            "crossover_rate": self.crossover_rate,
+            "faculties": self.faculty,
+            "courses": self.courses,
+            "rooms": self.rooms,
+            "student_groups": self.student_groups,
+            "academic_setup": self.academic_setup,
+            "time_rules": self.time_rules,
+            "reservations": self.reservations,
+        }
+
+    def migrate(self, populations: List[List[Chromosome]], received: List[int]):
+        """Ring migration: each island's best replace the next island's worst"""
+        count = min(self.migrants, self.population_size - 1)
+        if len(populations) < 2 or count < 1:
+            return
+        best = [sorted(p, key=lambda c: c.fitness_score, reverse=True)[:count] for p in populations]
+        for i in range(len(populations)):
+            target = (i + 1) % len(populations)
+            populations[target].sort(key=lambda c: c.fitness_score, reverse=True)
+            populations[target][-count:] = [Chromosome(genes=c.genes.copy(), fitness_score=c.fitness_score)
+                                            for c in best[i]]
+            received[target] += count
+
+    def run_islands(self, seed: Optional[int] = None,
+                    progress: Optional[Callable[[Dict[str, Any]], Optional[bool]]] = None,
+                    time_budget_ms: Optional[int] = None) -> Dict[str, Any]:
+        """Evolve all islands, exchanging migrants every migration_interval generations
+
+        `progress` is called after every migration interval and may stop the
+        run early, keeping the best chromosome found so far. With
+        `time_budget_ms` every island stops evolving when the budget runs out.
+        """
+        deadline = time.time() + time_budget_ms / 1000 if time_budget_ms else None
+        deadline_reached = False
+        islands = max(1, self.islands)
+        workers = worker_count(self.workers, islands)
+        seed = random.randrange(2**32) if seed is None else seed
+        settings = self.island_settings()
+        interval = max(1, self.migration_interval)
+
+        populations: List[Optional[List[Chromosome]]] = [None] * islands
+        histories: List[List[float]] = [[] for _ in range(islands)]
+        received = [0] * islands
+        migrations = 0
+        done = 0
+        epoch = 0
+        stopped_early = False
+        stats = GenerationStats()
+        started = time.perf_counter()
+
+        while done < self.generations or populations[0] is None:
+            generations = min(interval, self.generations - done)
+            seeds = [seed + epoch * islands + i for i in range(islands)]
+            results = None
+
+            with stats.phase("evolution"):
+                if workers > 1:
+                    pool = get_process_pool()
+                    try:
+                        results = map_bounded(pool, _evolve_island_in_worker,
+                                              [(settings, populations[i], generations, seeds[i], deadline)
+                                               for i in range(islands)], workers)
+                    except BrokenProcessPool as e:
+                        logger.warning(f"Process pool failed ({e}), evolving islands in-process")
+                        discard_process_pool(pool)
+                        workers = 1
+
+                if results is None:
+                    results = [_evolve_island(self, populations[i], generations, seeds[i], deadline) for i in range(islands)]
+
+            for i, (population, history) in enumerate(results):
+                populations[i] = population
+                histories[i].extend(history)
+
+            # Islands cut short by the deadline may have run fewer generations
+            completed = min(len(history) for _, history in results)
+            done += completed
+            epoch += 1
+            stats.count("generations", completed)
+            stats.count("epochs")
+            if deadline is not None and time.time() >= deadline and done < self.generations:
+                deadline_reached = True
+                break
+
+            if progress:
+                island_best = [max(p, key=lambda c: c.fitness_score) for p in populations]
+                best = max(island_best, key=lambda c: c.fitness_score)
+                if progress({
+                    "engine": "genetic_islands",
+                    "generation": done,
+                    "total": self.generations,
+                    "best_fitness": best.fitness_score,
+                    "conflicts": len(self._check_conflicts(best)),
+                    "islands": [c.fitness_score for c in island_best],
+                    "elapsed": round(time.perf_counter() - started, 3),
+                }):
+                    stopped_early = True
+                    break
+
+            if done < self.generations and islands > 1:
+                with stats.phase("migration"):
+                    self.migrate(populations, received)
+                migrations += 1
+                stats.count("migrations")
+
+        island_stats = []
+        for i, population in enumerate(populations):
+            best = max(population, key=lambda c: c.fitness_score)
+            island_stats.append({
+                "island": i,
+                "best_fitness": best.fitness_score,
+                "average_fitness": sum(c.fitness_score for c in population) / len(population),
+                "fitness_history": histories[i],
+                "migrants_received": received[i],
+            })
+
+        best_island = max(range(islands), key=lambda i: island_stats[i]["best_fitness"])
+        best = max(populations[best_island], key=lambda c: c.fitness_score)
+        stats.count("migrants", sum(received))
+        metrics.record_run("genetic_islands", stats, time.perf_counter() - started, True)
+        return {
+            "best": best,
+            "island_stats": island_stats,
+            "best_island": best_island,
+            "migrations": migrations,
+            "generations_completed": done,
+            "stopped_early": stopped_early,
+            "deadline_reached": deadline_reached,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+            "workers": workers,
+            "seed": seed,
+            "instrumentation": stats.as_dict(),
+            # Best fitness across all islands after each generation
+            "fitness_history": [max(values) for values in zip(*histories)],
+        }
+
     # -------------------- MAIN ENTRY POINT --------------------
 
-    async def generate_timetable(self, program_id: Optional[str] = None, semester: Optional[int] = None, academic_year: Optional[str] = None):
+    async def generate_timetable(self, program_id: Optional[str] = None, semester: Optional[int] = None, academic_year: Optional[str] = None,
+                                 progress: Optional[Callable[[Dict[str, Any]], Optional[bool]]] = None,
+                                 executor: Optional[Executor] = None, seed: Optional[int] = None,
+                                 cache: Optional[ResultCache] = None, time_budget_ms: Optional[int] = None):
         # If not in test mode, collect data from DB as before
         if not self.test_mode:
             collected = await self.data_collector.collect_all_data(
@@ -250,18 +499,17 @@ class GeneticTimetableGenerator:
 
         self.generate_time_slots()
 
-        population = []
-        for _ in range(self.population_size):
-            c = self.create_random_chromosome()
-            c.fitness_score = self.calculate_fitness(c)
-            population.append(c)
+        # Identical data, rules, GA parameters and seed give the cached result
+        cache_key = self.input_fingerprint(seed) if cache else None
+        if cache:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached genetic algorithm result {cache_key[:12]}")
+                return {**cached, "cached": True}
 
-        for _ in range(self.generations):
-            for c in population:
-                c.fitness_score = self.calculate_fitness(c)
-            population = self.evolve(population)
-
-        best = max(population, key=lambda c: c.fitness_score)
+        # Evolution is CPU-bound, keep it off the event loop
+        evolution = await run_in_thread(executor, lambda: self.run_islands(seed=seed, progress=progress, time_budget_ms=time_budget_ms))
+        best = evolution["best"]
 
         timetable_entries = [
             {
@@ -282,7 +530,7 @@ class GeneticTimetableGenerator:
         faculty_wise_timetable = self._generate_faculty_wise_timetable(timetable_entries)
         student_wise_timetable = self._generate_student_wise_timetable(timetable_entries)
 
-        return {
+        result = {
             "success": True,
             "timetable_entries": timetable_entries,
             "best_fitness_score": best.fitness_score,
@@ -290,10 +538,78 @@ class GeneticTimetableGenerator:
             "rules_applied": self.explain_rules(),
             "conflicts": self._check_conflicts(best),
             "total_classes_scheduled": len(timetable_entries),
+            "generations_completed": evolution["generations_completed"],
+            "stopped_early": evolution["stopped_early"],
+            "search": {
+                "time_budget_ms": time_budget_ms,
+                "deadline_reached": evolution["deadline_reached"],
+                "elapsed_ms": evolution["elapsed_ms"],
+                "completed": evolution["generations_completed"],
+                "planned": self.generations,
+            },
+            "fitness_history": evolution["fitness_history"],
+            "instrumentation": evolution["instrumentation"],
+            "time_slots_generated": len(self.time_slots),
+            "data_collected": {
+                "courses": len(self.courses),
+                "faculty": len(self.faculty),
+                "student_groups": len(self.student_groups),
+                "rooms": len(self.rooms),
+            },
+            "islands": {
+                "count": len(evolution["island_stats"]),
+                "workers": evolution["workers"],
+                "migration_interval": self.migration_interval,
+                "migrants": self.migrants,
+                "migrations": evolution["migrations"],
+                "best_island": evolution["best_island"],
+                "seed": evolution["seed"],
+                "stats": evolution["island_stats"],
+            },
             "group_wise_timetable": group_wise_timetable,
             "faculty_wise_timetable": faculty_wise_timetable,
             "student_wise_timetable": student_wise_timetable,
         }
+        if cache and not evolution["stopped_early"] and not evolution["deadline_reached"]:
+            await cache.put(cache_key, result)
+        return {**result, "cached": False}
+
+    def input_fingerprint(self, seed: Optional[int] = None) -> str:
+        """Result cache key for the collected data, time rules, GA parameters and seed
+
+        Reservations are part of the key only when there are any, so keys of
+        standalone runs stay as they were.
+        """
+        def by_id(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return sorted(items, key=lambda item: str(item.get("id")))
+
+        parts = [
+            type(self).__name__,
+            self.academic_setup,
+            by_id(self.courses),
+            by_id(self.faculty),
+            by_id(self.student_groups),
+            by_id(self.rooms),
+            self.time_rules,
+            {
+                "population_size": self.population_size,
+                "generations": self.generations,
+                "mutation_rate": self.mutation_rate,
+                "crossover_rate": self.crossover_rate,
+                "elite_size": self.elite_size,
+                "islands": self.islands,
+                "migration_interval": self.migration_interval,
+                "migrants": self.migrants,
+                "seed": seed,
+            }
+        ]
+        if self.reservations:
+            parts.append(sorted(
+                self.reservations,
+                key=lambda booking: (booking[2].day, booking[2].start_min, booking[2].end_min,
+                                     booking[0] or "", booking[1] or "")
+            ))
+        return fingerprint(*parts)
 
     # -------------------- TIMETABLE VIEW GENERATORS --------------------
 
@@ -400,3 +716,27 @@ class GeneticTimetableGenerator:
             student_timetable[student_id].sort(key=lambda x: (x["day"], x["start_time"]))
         
         return student_timetable
+
+
+# -------------------- PROCESS-POOL ENTRY POINTS --------------------
+
+def _evolve_island(generator: GeneticTimetableGenerator, population: Optional[List[Chromosome]],
+                   generations: int, seed: int, deadline: Optional[float] = None) -> Tuple[List[Chromosome], List[float]]:
+    """Evolve one island for a number of generations, creating it on the first call
+
+    The island draws from its own Random(seed), so islands evolved in-process
+    by concurrent jobs never share (or reseed) the global generator.
+    """
+    rng = random.Random(seed)
+    if population is None:
+        population = generator.create_population(rng)
+    return generator.evolve_generations(population, generations, deadline, rng)
+
+
+def _evolve_island_in_worker(settings: Dict[str, Any], population: Optional[List[Chromosome]],
+                             generations: int, seed: int, deadline: Optional[float] = None) -> Tuple[List[Chromosome], List[float]]:
+    """Process-pool entry point: rebuild the generator from its settings and evolve one island"""
+    # test_mode only skips the database collector; all data comes from settings
+    generator = GeneticTimetableGenerator(test_mode=True, **settings)
+    generator.generate_time_slots()
+    return _evolve_island(generator, population, generations, seed, deadline)
@@ -4,16 +4,32 @@ Advanced Timetable Generator with Hard and Soft Constraints
 Implements the detailed scheduling rules for CSE AI & ML program
 """
 from __future__ import annotations
-from typing import Dict, List, Any, Optional, Tuple, Set
+from typing import Dict, List, Any, Optional, Tuple, Set, Iterable, Callable
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from types import MappingProxyType
 from bson import ObjectId
 import datetime
 import random
-from copy import deepcopy
+import heapq
+import math
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 
 from app.db.mongodb import db
+from .parallel import get_process_pool, discard_process_pool, worker_count
+from .result_cache import fingerprint
+from .instrumentation import GenerationStats, metrics
 
 DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+WEEK_DAYS = DAY_NAMES + ["Sat", "Sun"]  # days a stored entry may use (working days are configurable)
+
+# Called by the engines with a progress event (attempt, generation or
+# solution); returning True asks the engine to stop and keep its best result
+ProgressCallback = Callable[[Dict[str, Any]], Optional[bool]]
 
 def t2min(t: str) -> int:
     """Convert time string to minutes since midnight"""
@@ -24,7 +40,7 @@ def min2t(m: int) -> str:
     """Convert minutes since midnight to time string"""
     return f"{m//60:02d}:{m%60:02d}"
 
-@dataclass
+@dataclass(frozen=True)
 class TimeSlot:
     day: str
     start_min: int  # minutes since midnight
@@ -42,6 +58,11 @@ class TimeSlot:
     def duration(self) -> int:
         return self.end_min - self.start_min
     
+    @property
+    def mask(self) -> int:
+        """Bitmask of the minutes covered by this slot (bit m = minute m of the day)"""
+        return ((1 << (self.end_min - self.start_min)) - 1) << self.start_min
+    
     def overlaps(self, other: 'TimeSlot') -> bool:
         if self.day != other.day:
             return False
@@ -50,6 +71,78 @@ class TimeSlot:
     def __str__(self) -> str:
         return f"{self.day} {self.start_time}-{self.end_time}"
 
+class OccupancyCalendar(Mapping):
+    """Per-resource, per-day booking calendar backed by integer bitmasks.
+    
+    Each resource keeps one integer per day on a one-minute grid, so checking,
+    booking and unbooking a slot are single bit operations instead of scans
+    over every booked slot. Reservations (time booked elsewhere) sit in a
+    separate fixed mask: sessions are only booked where the resource is free,
+    so reservations are the only bookings they can overlap, and unbooking a
+    session clears its bits and restores the reserved ones. Booked slots are
+    reference counted, so a slot booked twice stays busy until unbooked twice.
+    Indexing by resource id still returns the list of booked TimeSlots, which
+    is what daily checks read; booked() gives the count for load ranking.
+    """
+    
+    def __init__(self, resource_ids: Iterable[str] = ()):
+        self._masks: Dict[str, Dict[str, int]] = {}
+        self._reserved: Dict[str, Dict[str, int]] = {}
+        self._slots: Dict[str, Dict[TimeSlot, int]] = {}
+        self._counts: Dict[str, int] = {}
+        for resource_id in resource_ids:
+            self._masks[resource_id] = {}
+            self._reserved[resource_id] = {}
+            self._slots[resource_id] = {}
+            self._counts[resource_id] = 0
+    
+    def __getitem__(self, resource_id: str) -> List[TimeSlot]:
+        return [slot for slot, count in self._slots[resource_id].items() for _ in range(count)]
+    
+    def __iter__(self):
+        return iter(self._slots)
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def booked(self, resource_id: str) -> int:
+        """Number of slots booked (or reserved) for the resource"""
+        return self._counts[resource_id]
+    
+    def is_free(self, resource_id: str, time_slot: TimeSlot) -> bool:
+        """Check whether the resource has nothing booked during the slot"""
+        return not (self._masks[resource_id].get(time_slot.day, 0) & time_slot.mask)
+    
+    def _add(self, resource_id: str, time_slot: TimeSlot):
+        slots = self._slots[resource_id]
+        slots[time_slot] = slots.get(time_slot, 0) + 1
+        self._counts[resource_id] += 1
+        day_masks = self._masks[resource_id]
+        day_masks[time_slot.day] = day_masks.get(time_slot.day, 0) | time_slot.mask
+    
+    def book(self, resource_id: str, time_slot: TimeSlot):
+        """Mark the slot as busy for the resource"""
+        self._add(resource_id, time_slot)
+    
+    def reserve(self, resource_id: str, time_slot: TimeSlot):
+        """Mark the slot as busy for good (booked elsewhere); reservations are never unbooked"""
+        day_reserved = self._reserved[resource_id]
+        day_reserved[time_slot.day] = day_reserved.get(time_slot.day, 0) | time_slot.mask
+        self._add(resource_id, time_slot)
+    
+    def unbook(self, resource_id: str, time_slot: TimeSlot):
+        """Release a previously booked slot for the resource"""
+        slots = self._slots[resource_id]
+        remaining = slots[time_slot] - 1
+        self._counts[resource_id] -= 1
+        if remaining:
+            slots[time_slot] = remaining
+            return
+        del slots[time_slot]
+        day_masks = self._masks[resource_id]
+        day_masks[time_slot.day] = ((day_masks.get(time_slot.day, 0) & ~time_slot.mask) |
+                                    self._reserved[resource_id].get(time_slot.day, 0))
+
 @dataclass
 class CourseRequirement:
     """Defines a course and its scheduling requirements"""
@@ -108,9 +201,9 @@ class Faculty:
     name: str
     subjects: List[str]
 
-@dataclass
+@dataclass(frozen=True)
 class ScheduleEntry:
-    """Represents a scheduled class session"""
+    """Represents a scheduled class session (immutable, so schedules can share entries)"""
     course_code: str
     course_name: str
     group_id: str
@@ -120,6 +213,154 @@ class ScheduleEntry:
     is_lab: bool
     session_duration: int
 
+def slot_periods(time_slot: TimeSlot) -> int:
+    """Number of periods a slot counts for against the daily cap"""
+    if time_slot.duration >= 180:  # Lab session = 3+ periods
+        return 3
+    elif time_slot.duration >= 100:  # Double period
+        return 2
+    return 1  # Single period
+
+class ScheduleIndex:
+    """Incremental lookups over the schedule, updated as entries are booked
+    
+    Keeps (group, day) -> entries, (course, group, day) -> session count and
+    per (group, day) period and lab counts, so slot scoring and daily checks
+    read a dictionary instead of rescanning the whole schedule.
+    """
+    
+    def __init__(self):
+        self.group_day_entries: Dict[Tuple[str, str], List[ScheduleEntry]] = {}
+        self.course_group_day_count: Dict[Tuple[str, str, str], int] = {}
+        self.group_day_periods: Dict[Tuple[str, str], int] = {}
+        self.group_day_labs: Dict[Tuple[str, str], int] = {}
+    
+    def add(self, entry: ScheduleEntry):
+        """Record a newly scheduled entry"""
+        day = entry.time_slot.day
+        key = (entry.group_id, day)
+        course_key = (entry.course_code, entry.group_id, day)
+        self.group_day_entries.setdefault(key, []).append(entry)
+        self.course_group_day_count[course_key] = self.course_group_day_count.get(course_key, 0) + 1
+        self.group_day_periods[key] = self.group_day_periods.get(key, 0) + slot_periods(entry.time_slot)
+        if entry.time_slot.duration >= 180:
+            self.group_day_labs[key] = self.group_day_labs.get(key, 0) + 1
+    
+    def remove(self, entry: ScheduleEntry):
+        """Forget an entry that was taken out of the schedule"""
+        day = entry.time_slot.day
+        key = (entry.group_id, day)
+        course_key = (entry.course_code, entry.group_id, day)
+        self.group_day_entries[key].remove(entry)
+        self.course_group_day_count[course_key] -= 1
+        self.group_day_periods[key] -= slot_periods(entry.time_slot)
+        if entry.time_slot.duration >= 180:
+            self.group_day_labs[key] -= 1
+    
+    def entries_on(self, group_id: str, day: str) -> List[ScheduleEntry]:
+        return self.group_day_entries.get((group_id, day), [])
+    
+    def course_count(self, course_code: str, group_id: str, day: str) -> int:
+        return self.course_group_day_count.get((course_code, group_id, day), 0)
+    
+    def periods_on(self, group_id: str, day: str) -> int:
+        return self.group_day_periods.get((group_id, day), 0)
+    
+    def labs_on(self, group_id: str, day: str) -> int:
+        return self.group_day_labs.get((group_id, day), 0)
+
+class ResourceIndex:
+    """Candidate lookups over faculty and rooms, built once per run
+    
+    Eligible faculty are resolved once per course and kept in a heap ordered
+    by (load, position) that is updated as sessions are booked, and rooms are
+    kept in capacity-sorted lists per lab/theory type so the rooms that fit a
+    group are found with a bisect. Ties resolve to the earlier faculty member
+    or room in the loaded order, as the linear scans did.
+    """
+    
+    def __init__(self, courses: List[CourseRequirement], rooms: List[Room], faculty: List[Faculty],
+                 faculty_load: Dict[str, int] = None, room_load: Dict[str, int] = None):
+        self.courses = courses
+        self.rooms = rooms
+        self.faculty = faculty
+        self.faculty_load: Dict[str, int] = {fac.id: 0 for fac in faculty}
+        self.faculty_load.update(faculty_load or {})
+        self.room_load: Dict[str, int] = {room.id: 0 for room in rooms}
+        self.room_load.update(room_load or {})
+        
+        self._course_names: Dict[str, str] = {}
+        for course in courses:
+            self._course_names.setdefault(course.code, course.name)
+        
+        # subject -> positions of the faculty members teaching it
+        self._by_subject: Dict[str, List[int]] = {}
+        self._faculty_position: Dict[str, int] = {}
+        for position, fac in enumerate(faculty):
+            self._faculty_position.setdefault(fac.id, position)
+            for subject in dict.fromkeys(fac.subjects):
+                self._by_subject.setdefault(subject, []).append(position)
+        
+        self._eligible: Dict[str, List[Faculty]] = {}
+        self._heaps: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._courses_of_faculty: Dict[str, Set[str]] = {}
+        
+        self._room_position = {room.id: position for position, room in enumerate(rooms)}
+        self._rooms_by_type: Dict[bool, Tuple[List[int], List[Room]]] = {}
+        for is_lab in (False, True):
+            ordered = sorted((room for room in rooms if room.is_lab == is_lab),
+                             key=lambda room: (room.capacity, self._room_position[room.id]))
+            self._rooms_by_type[is_lab] = ([room.capacity for room in ordered], ordered)
+    
+    def matches(self, courses: List[CourseRequirement], rooms: List[Room], faculty: List[Faculty]) -> bool:
+        """Whether the index was built from these resource lists"""
+        return self.courses is courses and self.rooms is rooms and self.faculty is faculty
+    
+    def eligible_faculty(self, course_code: str) -> List[Faculty]:
+        """Faculty allowed to teach the course: by code, then course name, then GENERAL, then anyone"""
+        eligible = self._eligible.get(course_code)
+        if eligible is None:
+            positions = (self._by_subject.get(course_code)
+                         or self._by_subject.get(self._course_names.get(course_code))
+                         or self._by_subject.get("GENERAL")
+                         or range(len(self.faculty)))
+            eligible = [self.faculty[position] for position in positions]
+            self._eligible[course_code] = eligible
+            
+            heap = [(self.faculty_load.get(fac.id, 0), self._faculty_position[fac.id], fac.id)
+                    for fac in eligible]
+            heapq.heapify(heap)
+            self._heaps[course_code] = heap
+            for fac in eligible:
+                self._courses_of_faculty.setdefault(fac.id, set()).add(course_code)
+        return eligible
+    
+    def least_loaded_faculty(self, course_code: str) -> Optional[str]:
+        """Eligible faculty member with the fewest booked sessions"""
+        self.eligible_faculty(course_code)
+        heap = self._heaps[course_code]
+        # Every load change pushes a fresh entry, so outdated ones are dropped
+        while heap and heap[0][0] != self.faculty_load.get(heap[0][2], 0):
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+    
+    def rooms_for(self, group_size: int, is_lab: bool) -> List[Room]:
+        """Rooms of the right type that fit the group, smallest first"""
+        capacities, rooms = self._rooms_by_type[is_lab]
+        return rooms[bisect_left(capacities, group_size):]
+    
+    def room_rank(self, room: Room) -> Tuple[int, int]:
+        """Sort key preferring less occupied rooms"""
+        return (self.room_load.get(room.id, 0), self._room_position[room.id])
+    
+    def record_booking(self, room_id: str, faculty_id: str, delta: int = 1):
+        """Update loads after a session was booked (delta=1) or released (delta=-1)"""
+        self.room_load[room_id] = self.room_load.get(room_id, 0) + delta
+        load = self.faculty_load[faculty_id] = self.faculty_load.get(faculty_id, 0) + delta
+        position = self._faculty_position.get(faculty_id)
+        for course_code in self._courses_of_faculty.get(faculty_id, ()):
+            heapq.heappush(self._heaps[course_code], (load, position, faculty_id))
+
 class SchedulingRules:
     """Defines all hard and soft constraints"""
     
@@ -285,57 +526,168 @@ class SchedulingRules:
         
         return rules
     
+    def grid_key(self) -> Tuple:
+        """The rule values that determine the time grid"""
+        return (tuple(self.WORKING_DAYS), self.DAY_START, self.DAY_END, self.LUNCH_START, self.LUNCH_END,
+                self.PERIOD_DURATION, self.PASSING_TIME, tuple(tuple(window) for window in self.LAB_WINDOWS))
+    
+    def time_grid(self) -> "TimeGrid":
+        """The compiled time grid for the current rule values, shared by every rules instance with the same values"""
+        return TimeGrid.for_rules(self)
+    
     def get_theory_slots(self) -> List[TimeSlot]:
-        """Generate all possible 50-minute theory slots"""
-        slots = []
-        for day in self.WORKING_DAYS:
-            current_time = self.DAY_START
+        """All possible 50-minute theory slots"""
+        return list(self.time_grid().theory)
+    
+    def get_double_period_slots(self) -> List[TimeSlot]:
+        """All possible 100-minute double period slots"""
+        return list(self.time_grid().double)
+    
+    def get_lab_slots(self) -> List[TimeSlot]:
+        """All possible 180-minute lab slots"""
+        return list(self.time_grid().lab)
+
+@dataclass(frozen=True)
+class TimeGrid:
+    """Slot enumeration compiled once per distinct set of scheduling rules
+    
+    Theory periods get integer ids in day/time order; `double_periods[k]`
+    holds the ids of the two consecutive periods behind `double[k]` and
+    `next_period[i]` the id of the period directly after period i (or -1).
+    Grids are memoized by a fingerprint of the rule values, so every
+    generator, attempt and individual built from the same rules shares them.
+    """
+    key: Tuple
+    fingerprint: str
+    theory: Tuple[TimeSlot, ...]
+    double: Tuple[TimeSlot, ...]
+    lab: Tuple[TimeSlot, ...]
+    double_periods: Tuple[Tuple[int, int], ...]
+    next_period: Tuple[int, ...]
+    slot_ids: Mapping  # TimeSlot -> theory period id (read-only)
+    
+    @classmethod
+    def for_rules(cls, rules: SchedulingRules) -> "TimeGrid":
+        key = rules.grid_key()
+        grid = _TIME_GRIDS.get(key)
+        if grid is None:
+            grid = cls.compile(rules, key)
+            with _TIME_GRIDS_LOCK:
+                if len(_TIME_GRIDS) >= MAX_TIME_GRIDS:
+                    _TIME_GRIDS.clear()
+                grid = _TIME_GRIDS.setdefault(key, grid)
+        return grid
+    
+    @classmethod
+    def compile(cls, rules: SchedulingRules, key: Tuple = None) -> "TimeGrid":
+        key = key or rules.grid_key()
+        theory: List[TimeSlot] = []
+        for day in rules.WORKING_DAYS:
+            current_time = rules.DAY_START
             
-            while current_time + self.PERIOD_DURATION <= self.DAY_END:
-                slot_end = current_time + self.PERIOD_DURATION
+            while current_time + rules.PERIOD_DURATION <= rules.DAY_END:
+                slot_end = current_time + rules.PERIOD_DURATION
                 
                 # Skip lunch period
-                if not (current_time < self.LUNCH_END and slot_end > self.LUNCH_START):
-                    slots.append(TimeSlot(day, current_time, slot_end))
+                if not (current_time < rules.LUNCH_END and slot_end > rules.LUNCH_START):
+                    theory.append(TimeSlot(day, current_time, slot_end))
                 
-                current_time += self.PERIOD_DURATION + self.PASSING_TIME
+                current_time += rules.PERIOD_DURATION + rules.PASSING_TIME
                 
                 # Jump over lunch if we hit it
-                if current_time < self.LUNCH_END and current_time + self.PERIOD_DURATION > self.LUNCH_START:
-                    current_time = self.LUNCH_END
-        
-        return slots
+                if current_time < rules.LUNCH_END and current_time + rules.PERIOD_DURATION > rules.LUNCH_START:
+                    current_time = rules.LUNCH_END
+        
+        # Two periods form a double when they are consecutive on the same day
+        next_period = [-1] * len(theory)
+        double: List[TimeSlot] = []
+        double_periods: List[Tuple[int, int]] = []
+        for i in range(len(theory) - 1):
+            slot1, slot2 = theory[i], theory[i + 1]
+            if slot1.day == slot2.day and slot1.end_min + rules.PASSING_TIME == slot2.start_min:
+                next_period[i] = i + 1
+                double.append(TimeSlot(slot1.day, slot1.start_min, slot2.end_min))
+                double_periods.append((i, i + 1))
+        
+        lab = [TimeSlot(day, start_min, start_min + 180)
+               for day in rules.WORKING_DAYS
+               for start_min, end_min in rules.LAB_WINDOWS
+               if end_min - start_min >= 180]  # Window must fit a 3-hour lab
+        
+        return cls(
+            key=key,
+            fingerprint=fingerprint(key),
+            theory=tuple(theory),
+            double=tuple(double),
+            lab=tuple(lab),
+            double_periods=tuple(double_periods),
+            next_period=tuple(next_period),
+            slot_ids=MappingProxyType({slot: i for i, slot in enumerate(theory)})
+        )
+
+# Compiled grids by rule values; rules rarely vary, the bound only guards
+# against unbounded growth
+_TIME_GRIDS: Dict[Tuple, TimeGrid] = {}
+_TIME_GRIDS_LOCK = threading.Lock()
+MAX_TIME_GRIDS = 32
+
+# Only these entry fields are read from published timetables
+PUBLISHED_ENTRY_FIELDS = ("room_id", "faculty_id", "day", "start_time", "end_time", "time_slot")
+
+def stored_entry_slot(entry: Dict[str, Any]) -> Optional[TimeSlot]:
+    """TimeSlot of a stored timetable entry (flat day/start/end or a nested time_slot)"""
+    source = entry.get("time_slot") if isinstance(entry.get("time_slot"), dict) else entry
+    day = str(source.get("day") or "")[:3].title()  # "Monday" and "Mon" both become "Mon"
+    try:
+        start_min, end_min = t2min(source["start_time"]), t2min(source["end_time"])
+    except (KeyError, AttributeError, ValueError):
+        return None
+    if day not in WEEK_DAYS or end_min <= start_min:
+        return None
+    return TimeSlot(day, start_min, end_min)
+
+async def load_published_bookings(exclude_ids: Iterable[Any] = (),
+                                  academic_year: str = None) -> List[Tuple[Optional[str], Optional[str], TimeSlot]]:
+    """(room id, faculty id, slot) of every entry of the published timetables
     
-    def get_double_period_slots(self) -> List[TimeSlot]:
-        """Generate all possible 100-minute double period slots"""
-        slots = []
-        theory_slots = self.get_theory_slots()
-        
-        for i in range(len(theory_slots) - 1):
-            slot1 = theory_slots[i]
-            slot2 = theory_slots[i + 1]
-            
-            # Check if slots are consecutive on the same day
-            if (slot1.day == slot2.day and 
-                slot1.end_min + self.PASSING_TIME == slot2.start_min):
-                
-                double_slot = TimeSlot(
-                    slot1.day, 
-                    slot1.start_min, 
-                    slot2.end_min
-                )
-                slots.append(double_slot)
-        
-        return slots
+    One query on the is_draft/academic_year index that projects only the
+    entries' room, faculty and time fields. Timetables in `exclude_ids` (the
+    ones being generated) are skipped, and with `academic_year` only that
+    year's timetables are read.
+    """
+    query: Dict[str, Any] = {"is_draft": False}
+    exclude = [ObjectId(str(timetable_id)) for timetable_id in exclude_ids if ObjectId.is_valid(str(timetable_id))]
+    if exclude:
+        query["_id"] = {"$nin": exclude}
+    if academic_year:
+        query["academic_year"] = academic_year
+    projection = {"_id": 0, **{f"entries.{name}": 1 for name in PUBLISHED_ENTRY_FIELDS}}
     
-    def get_lab_slots(self) -> List[TimeSlot]:
-        """Generate all possible 180-minute lab slots"""
-        slots = []
-        for day in self.WORKING_DAYS:
-            for start_min, end_min in self.LAB_WINDOWS:
-                if end_min - start_min >= 180:  # Ensure window can fit 3-hour lab
-                    slots.append(TimeSlot(day, start_min, start_min + 180))
-        return slots
+    bookings = []
+    for timetable in await db.db.timetables.find(query, projection).to_list(length=None):
+        for entry in timetable.get("entries") or []:
+            time_slot = stored_entry_slot(entry)
+            if time_slot is None:
+                continue
+            room_id, faculty_id = entry.get("room_id"), entry.get("faculty_id")
+            bookings.append((str(room_id) if room_id else None, str(faculty_id) if faculty_id else None, time_slot))
+    return bookings
+
+def merge_slots(slots: Iterable[TimeSlot]) -> List[TimeSlot]:
+    """Disjoint slots covering the same minutes, per day in start order
+    
+    Overlapping and touching slots are merged into one, so published
+    timetables that double book a resource still give non-overlapping
+    reservations.
+    """
+    merged: List[TimeSlot] = []
+    for slot in sorted(slots, key=lambda slot: (slot.day, slot.start_min)):
+        last = merged[-1] if merged else None
+        if last is not None and last.day == slot.day and slot.start_min <= last.end_min:
+            merged[-1] = TimeSlot(last.day, last.start_min, max(last.end_min, slot.end_min))
+        else:
+            merged.append(slot)
+    return merged
 
 class AdvancedTimetableGenerator:
     """Advanced constraint-based timetable generator"""
@@ -347,11 +699,21 @@ class AdvancedTimetableGenerator:
         self.rooms: List[Room] = []
         self.faculty: List[Faculty] = []
         self.schedule: List[ScheduleEntry] = []
+        self.schedule_index = ScheduleIndex()
         
         # Occupancy tracking
-        self.room_occupancy: Dict[str, List[TimeSlot]] = {}
-        self.faculty_occupancy: Dict[str, List[TimeSlot]] = {}
-        self.group_occupancy: Dict[str, List[TimeSlot]] = {}
+        self.room_occupancy = OccupancyCalendar()
+        self.faculty_occupancy = OccupancyCalendar()
+        self.group_occupancy = OccupancyCalendar()
+        self.resource_index: Optional[ResourceIndex] = None
+        
+        # Room and faculty time already taken elsewhere (e.g. by other programs),
+        # booked into every fresh set of calendars
+        self.reserved_rooms: Dict[str, List[TimeSlot]] = {}
+        self.reserved_faculty: Dict[str, List[TimeSlot]] = {}
+        
+        # Hot-path counters and phase timings of the current attempt
+        self.stats = GenerationStats()
     
     def setup_cse_ai_ml_courses(self):
         """Setup the specific CSE AI & ML course requirements"""
@@ -407,143 +769,167 @@ class AdvancedTimetableGenerator:
         ]
     
     def initialize_occupancy_tracking(self):
-        """Initialize occupancy tracking dictionaries"""
-        self.room_occupancy = {room.id: [] for room in self.rooms}
-        self.faculty_occupancy = {faculty.id: [] for faculty in self.faculty}
-        self.group_occupancy = {group.id: [] for group in self.groups}
+        """Initialize occupancy tracking calendars"""
+        self.room_occupancy = OccupancyCalendar(room.id for room in self.rooms)
+        self.faculty_occupancy = OccupancyCalendar(faculty.id for faculty in self.faculty)
+        self.group_occupancy = OccupancyCalendar(group.id for group in self.groups)
+        for calendar, reserved in ((self.room_occupancy, self.reserved_rooms),
+                                   (self.faculty_occupancy, self.reserved_faculty)):
+            for resource_id, slots in reserved.items():
+                if resource_id in calendar:
+                    for slot in slots:
+                        calendar.reserve(resource_id, slot)
+        self.schedule_index = ScheduleIndex()
+        # Rebuilt from the calendars, so reserved bookings count towards the
+        # load that ranks rooms and faculty
+        self.resource_index = None
+        self.get_resource_index()
+    
+    def reserve_resources(self, entries: Iterable[ScheduleEntry]):
+        """Treat the rooms and faculty booked by entries scheduled elsewhere as busy
+        
+        Reservations count as bookings in every attempt (and in repairs), so
+        the run only uses time the shared rooms and faculty still have free.
+        """
+        for entry in entries:
+            self.reserve(entry.room_id, entry.faculty_id, entry.time_slot)
+    
+    def reserve(self, room_id: Optional[str], faculty_id: Optional[str], time_slot: TimeSlot):
+        """Reserve one booking made elsewhere for the room and faculty member (either may be None)"""
+        if room_id:
+            self.reserved_rooms.setdefault(room_id, []).append(time_slot)
+        if faculty_id:
+            self.reserved_faculty.setdefault(faculty_id, []).append(time_slot)
+    
+    async def reserve_published_timetables(self, exclude_ids: Iterable[Any] = (), academic_year: str = None) -> int:
+        """Reserve the rooms and faculty used by published timetables, returning the booking count"""
+        bookings = await load_published_bookings(exclude_ids, academic_year)
+        for room_id, faculty_id, time_slot in bookings:
+            self.reserve(room_id, faculty_id, time_slot)
+        print(f"[INFO] Reserved {len(bookings)} bookings of published timetables")
+        return len(bookings)
+    
+    def clear_reservations(self):
+        self.reserved_rooms = {}
+        self.reserved_faculty = {}
+    
+    def get_resource_index(self) -> ResourceIndex:
+        """Resource index for the loaded courses, rooms and faculty (rebuilt if they were replaced)"""
+        index = self.resource_index
+        if index is None or not index.matches(self.courses, self.rooms, self.faculty):
+            index = self.resource_index = ResourceIndex(
+                self.courses, self.rooms, self.faculty,
+                faculty_load={fid: self.faculty_occupancy.booked(fid) for fid in self.faculty_occupancy},
+                room_load={rid: self.room_occupancy.booked(rid) for rid in self.room_occupancy}
+            )
+        return index
+    
+    def input_fingerprint(self, **params) -> str:
+        """Result cache key for the loaded data, rules and engine parameters
+        
+        Resources are sorted by id so the key does not depend on the order
+        the database returned them in. Reservations are part of the key only
+        when there are any, so keys of standalone runs stay as they were.
+        """
+        parts = [
+            type(self).__name__,
+            sorted(self.courses, key=lambda course: course.code),
+            sorted(self.groups, key=lambda group: group.id),
+            sorted(self.rooms, key=lambda room: room.id),
+            sorted(self.faculty, key=lambda fac: fac.id),
+            {name: value for name, value in vars(self.rules).items() if name.isupper()},
+            params
+        ]
+        if self.reserved_rooms or self.reserved_faculty:
+            slot_order = lambda slot: (slot.day, slot.start_min, slot.end_min)
+            parts.append({
+                kind: {resource_id: sorted(slots, key=slot_order) for resource_id, slots in reserved.items()}
+                for kind, reserved in (("rooms", self.reserved_rooms), ("faculty", self.reserved_faculty))
+            })
+        return fingerprint(*parts)
     
     def is_slot_available(self, time_slot: TimeSlot, room_id: str, 
                          faculty_id: str, group_id: str) -> bool:
         """Check if a time slot is available for all resources"""
+        self.stats.count("availability_checks")
+        
         # Check room availability
-        for occupied_slot in self.room_occupancy[room_id]:
-            if time_slot.overlaps(occupied_slot):
-                print(f"    Slot {time_slot}: Room {room_id} conflict with {occupied_slot}")
-                return False
+        if not self.room_occupancy.is_free(room_id, time_slot):
+            self.stats.reject("room_conflict")
+            return False
         
         # Check faculty availability (time overlap only)
-        for occupied_slot in self.faculty_occupancy[faculty_id]:
-            if time_slot.overlaps(occupied_slot):
-                print(f"    Slot {time_slot}: Faculty {faculty_id} conflict with {occupied_slot}")
-                return False
+        if not self.faculty_occupancy.is_free(faculty_id, time_slot):
+            self.stats.reject("faculty_conflict")
+            return False
         
         # Check group availability
-        for occupied_slot in self.group_occupancy[group_id]:
-            if time_slot.overlaps(occupied_slot):
-                print(f"    Slot {time_slot}: Group {group_id} conflict with {occupied_slot}")
-                return False
+        if not self.group_occupancy.is_free(group_id, time_slot):
+            self.stats.reject("group_conflict")
+            return False
         
-        print(f"    Slot {time_slot}: Available (Room: {room_id}, Faculty: {faculty_id}, Group: {group_id})")
         return True
     
     def book_slot(self, time_slot: TimeSlot, room_id: str, 
                   faculty_id: str, group_id: str):
         """Book a time slot for the specified resources"""
-        self.room_occupancy[room_id].append(time_slot)
-        self.faculty_occupancy[faculty_id].append(time_slot)
-        self.group_occupancy[group_id].append(time_slot)
+        self.get_resource_index().record_booking(room_id, faculty_id)
+        self.room_occupancy.book(room_id, time_slot)
+        self.faculty_occupancy.book(faculty_id, time_slot)
+        self.group_occupancy.book(group_id, time_slot)
+    
+    def unbook_slot(self, time_slot: TimeSlot, room_id: str, 
+                    faculty_id: str, group_id: str):
+        """Release a time slot previously booked for the specified resources"""
+        self.get_resource_index().record_booking(room_id, faculty_id, -1)
+        self.room_occupancy.unbook(room_id, time_slot)
+        self.faculty_occupancy.unbook(faculty_id, time_slot)
+        self.group_occupancy.unbook(group_id, time_slot)
+    
+    def place_entry(self, entry: ScheduleEntry):
+        """Book the entry's resources and add it to the schedule"""
+        self.book_slot(entry.time_slot, entry.room_id, entry.faculty_id, entry.group_id)
+        self.schedule.append(entry)
+        self.schedule_index.add(entry)
+    
+    def remove_entry(self, entry: ScheduleEntry):
+        """Release the entry's resources and take it out of the schedule"""
+        self.unbook_slot(entry.time_slot, entry.room_id, entry.faculty_id, entry.group_id)
+        self.schedule.remove(entry)
+        self.schedule_index.remove(entry)
     
     def find_suitable_faculty(self, course_code: str) -> Optional[str]:
         """Find a faculty member who can teach the course, preferring less-loaded faculty"""
-        suitable_faculty = []
-        
-        # First try exact course code match
-        for faculty in self.faculty:
-            if course_code in faculty.subjects:
-                suitable_faculty.append(faculty)
-        
-        # Then try course name match if no exact match (for courses loaded from database)
-        if not suitable_faculty:
-            course_name = None
-            for course in self.courses:
-                if course.code == course_code:
-                    course_name = course.name
-                    break
-            
-            if course_name:
-                for faculty in self.faculty:
-                    if course_name in faculty.subjects:
-                        suitable_faculty.append(faculty)
-        
-        # Try to find general faculty if no specific match
-        if not suitable_faculty:
-            for faculty in self.faculty:
-                if "GENERAL" in faculty.subjects:
-                    suitable_faculty.append(faculty)
-        
-        # If no suitable faculty found, use any available
-        if not suitable_faculty and self.faculty:
-            suitable_faculty = self.faculty
-        
-        if not suitable_faculty:
-            return None
-        
-        # Prefer less-loaded faculty (better load balancing)
-        faculty_loads = {}
-        for fac in suitable_faculty:
-            load = len(self.faculty_occupancy.get(fac.id, []))
-            faculty_loads[fac.id] = load
-        
-        # Return faculty with minimum load
-        best_faculty_id = min(faculty_loads, key=faculty_loads.get)
-        best_faculty = next(f for f in suitable_faculty if f.id == best_faculty_id)
-        
-        return best_faculty.id
+        return self.get_resource_index().least_loaded_faculty(course_code)
+    
+    def eligible_faculty(self, course_code: str) -> List[Faculty]:
+        """List the faculty members allowed to teach the course"""
+        return list(self.get_resource_index().eligible_faculty(course_code))
     
     def find_suitable_room(self, group_size: int, is_lab: bool, time_slot: TimeSlot = None) -> Optional[str]:
         """Find a suitable room for the session"""
-        suitable_rooms = [room for room in self.rooms 
-                         if room.can_accommodate(group_size, is_lab)]
+        index = self.get_resource_index()
+        suitable_rooms = index.rooms_for(group_size, is_lab)
         
         if not suitable_rooms:
             return None
         
         # If time_slot is provided, filter out rooms that are occupied at that time
         if time_slot:
-            available_rooms = []
-            for room in suitable_rooms:
-                is_available = True
-                for occupied_slot in self.room_occupancy[room.id]:
-                    if time_slot.overlaps(occupied_slot):
-                        is_available = False
-                        break
-                if is_available:
-                    available_rooms.append(room)
+            available_rooms = [room for room in suitable_rooms
+                               if self.room_occupancy.is_free(room.id, time_slot)]
             
             if available_rooms:
                 # Prefer rooms with less current occupancy
-                return min(available_rooms, 
-                           key=lambda r: len(self.room_occupancy[r.id])).id
+                return min(available_rooms, key=index.room_rank).id
         
         # Fallback: return room with least occupancy (for backward compatibility)
-        return min(suitable_rooms, 
-                   key=lambda r: len(self.room_occupancy[r.id])).id
+        return min(suitable_rooms, key=index.room_rank).id
     
     def check_daily_constraints(self, group_id: str, day: str, 
                               new_slot: TimeSlot) -> bool:
         """Check if adding this slot violates daily constraints"""
-        day_slots = [slot for slot in self.group_occupancy[group_id] 
-                    if slot.day == day]
-        
-        # Calculate periods more accurately
-        existing_periods = 0
-        for slot in day_slots:
-            if slot.duration >= 180:  # Lab session = 3+ periods
-                existing_periods += 3
-            elif slot.duration >= 100:  # Double period
-                existing_periods += 2
-            else:  # Single period
-                existing_periods += 1
-        
-        new_periods = 0
-        if new_slot.duration >= 180:
-            new_periods = 3
-        elif new_slot.duration >= 100:
-            new_periods = 2
-        else:
-            new_periods = 1
-        
-        total_periods = existing_periods + new_periods
+        total_periods = self.schedule_index.periods_on(group_id, day) + slot_periods(new_slot)
         
         # Allow up to 8 periods per day if needed
         if total_periods > self.rules.ABSOLUTE_MAX_PERIODS_PER_DAY:
@@ -551,8 +937,7 @@ class AdvancedTimetableGenerator:
         
         # Check max labs per day
         if new_slot.duration >= 180:  # This is a lab
-            lab_count = sum(1 for slot in day_slots if slot.duration >= 180)
-            if lab_count >= self.rules.MAX_LABS_PER_DAY_PER_GROUP:
+            if self.schedule_index.labs_on(group_id, day) >= self.rules.MAX_LABS_PER_DAY_PER_GROUP:
                 return False
         
         return True
@@ -599,12 +984,16 @@ class AdvancedTimetableGenerator:
                 scheduled = False
                 
                 for slot in lab_slots:
+                    self.stats.count("slots_examined")
+                    
                     # Check daily constraints
                     if not self.check_daily_constraints(subgroup.id, slot.day, slot):
+                        self.stats.reject("daily_cap")
                         continue
                     
                     # CRITICAL: Prevent lab scheduling same course multiple times on same day
                     if self.has_course_on_day(course.code, subgroup.id, slot.day):
+                        self.stats.reject("same_day_course")
                         continue
                     
                     # Find suitable faculty and room
@@ -612,14 +1001,12 @@ class AdvancedTimetableGenerator:
                     room_id = self.find_suitable_room(subgroup.size, True, slot)
                     
                     if not faculty_id or not room_id:
+                        self.stats.reject("no_resources")
                         continue
                     
                     # Check availability
                     if self.is_slot_available(slot, room_id, faculty_id, subgroup.id):
-                        # Book the slot
-                        self.book_slot(slot, room_id, faculty_id, subgroup.id)
-                        
-                        # Add to schedule
+                        # Book the slot and add it to the schedule
                         entry = ScheduleEntry(
                             course_code=course.code,
                             course_name=course.name,
@@ -630,7 +1017,8 @@ class AdvancedTimetableGenerator:
                             is_lab=True,
                             session_duration=180
                         )
-                        self.schedule.append(entry)
+                        self.place_entry(entry)
+                        self.stats.count("sessions_placed")
                         scheduled = True
                         break
                 
@@ -655,9 +1043,7 @@ class AdvancedTimetableGenerator:
             sessions_needed = course.get_session_structure()
             main_group = next(group for group in self.groups if not group.is_subgroup)
             
-            print(f"[INFO] Scheduling {course.code}: {len(sessions_needed)} sessions {sessions_needed}")
-            
-            for i, session_duration in enumerate(sessions_needed):
+            for session_duration in sessions_needed:
                 scheduled = False
                 
                 # Choose appropriate slot type
@@ -668,13 +1054,13 @@ class AdvancedTimetableGenerator:
                     available_slots, course, main_group.id
                 )
                 
-                print(f"  Session {i+1} ({session_duration}min): Checking {len(available_slots)} slots")
-                
-                for slot_idx, slot in enumerate(available_slots):
+                for slot in available_slots:
+                    self.stats.count("slots_examined")
+                    
                     # Check constraints
                     daily_ok = self.check_daily_constraints(main_group.id, slot.day, slot)
                     if not daily_ok:
-                        print(f"    Slot {slot}: Daily constraint failed")
+                        self.stats.reject("daily_cap")
                         continue
                     
                     # Relax continuous periods constraint for now
@@ -685,7 +1071,7 @@ class AdvancedTimetableGenerator:
                     # CRITICAL: Prevent scheduling same course multiple times on same day
                     # Each course session should be on a DIFFERENT day (spread across week)
                     if self.has_course_on_day(course.code, main_group.id, slot.day):
-                        print(f"    Slot {slot}: Course {course.code} already scheduled on {slot.day}")
+                        self.stats.reject("same_day_course")
                         continue
                     
                     # Find resources
@@ -693,15 +1079,12 @@ class AdvancedTimetableGenerator:
                     room_id = self.find_suitable_room(main_group.size, False, slot)
                     
                     if not faculty_id or not room_id:
-                        print(f"    Slot {slot}: No faculty ({faculty_id}) or room ({room_id})")
+                        self.stats.reject("no_resources")
                         continue
                     
                     # Check availability
                     if self.is_slot_available(slot, room_id, faculty_id, main_group.id):
-                        # Book the slot
-                        self.book_slot(slot, room_id, faculty_id, main_group.id)
-                        
-                        # Add to schedule
+                        # Book the slot and add it to the schedule
                         entry = ScheduleEntry(
                             course_code=course.code,
                             course_name=course.name,
@@ -712,12 +1095,10 @@ class AdvancedTimetableGenerator:
                             is_lab=False,
                             session_duration=session_duration
                         )
-                        self.schedule.append(entry)
-                        print(f"    [SUCCESS] Scheduled at {slot} with {faculty_id} in {room_id}")
+                        self.place_entry(entry)
+                        self.stats.count("sessions_placed")
                         scheduled = True
                         break
-                    else:
-                        print(f"    Slot {slot}: Resource conflict (detailed check failed)")
                 
                 if not scheduled:
                     print(f"[ERROR] Failed to schedule {session_duration}min session for {course.code}")
@@ -730,8 +1111,11 @@ class AdvancedTimetableGenerator:
                                       course: CourseRequirement, 
                                       group_id: str) -> List[TimeSlot]:
         """Apply soft constraints to prioritize slots"""
+        index = self.schedule_index
+        
         def slot_score(slot: TimeSlot) -> int:
             score = 0
+            day_entries = index.entries_on(group_id, slot.day)
             
             # Avoid early slots (08:00) for electives/minor
             if course.elective_type and slot.start_min == t2min("08:00"):
@@ -752,19 +1136,15 @@ class AdvancedTimetableGenerator:
             
             # Spread heavy theory courses (OS, OOP, ML) across different days
             if course.code in ["OS_THEORY", "OOP_THEORY", "ML_THEORY"]:
-                occupied_days = {entry.time_slot.day for entry in self.schedule 
-                               if entry.course_code == course.code and entry.group_id == group_id}
-                if slot.day not in occupied_days:
+                if not index.course_count(course.code, group_id, slot.day):
                     score += 8
                 else:
                     score -= 10  # Penalize same day scheduling
             
             # Avoid Cloud + Optimization back-to-back
             if course.code in ["CLOUD_COMP", "OPT_TECH"]:
-                for entry in self.schedule:
-                    if (entry.group_id == group_id and 
-                        entry.time_slot.day == slot.day and
-                        entry.course_code in ["CLOUD_COMP", "OPT_TECH"] and
+                for entry in day_entries:
+                    if (entry.course_code in ["CLOUD_COMP", "OPT_TECH"] and
                         entry.course_code != course.code):
                         # Check if slots are adjacent
                         time_diff = abs(entry.time_slot.start_min - slot.start_min)
@@ -772,8 +1152,7 @@ class AdvancedTimetableGenerator:
                             score -= 12
             
             # Balance daily load (prefer 7-9 periods/day)
-            daily_periods = len([e for e in self.schedule 
-                               if e.group_id == group_id and e.time_slot.day == slot.day])
+            daily_periods = len(day_entries)
             if 7 <= daily_periods <= 9:
                 score += 5
             elif daily_periods < 7:
@@ -785,8 +1164,7 @@ class AdvancedTimetableGenerator:
             adjacent_sessions = any(
                 abs(entry.time_slot.end_min - slot.start_min) <= 10 or
                 abs(slot.end_min - entry.time_slot.start_min) <= 10
-                for entry in self.schedule
-                if entry.group_id == group_id and entry.time_slot.day == slot.day
+                for entry in day_entries
             )
             if adjacent_sessions:
                 score += 3
@@ -798,10 +1176,7 @@ class AdvancedTimetableGenerator:
     
     def has_course_on_day(self, course_code: str, group_id: str, day: str) -> bool:
         """Check if a course is already scheduled on a specific day for a group"""
-        return any(entry.course_code == course_code and 
-                  entry.group_id == group_id and 
-                  entry.time_slot.day == day 
-                  for entry in self.schedule)
+        return self.schedule_index.course_count(course_code, group_id, day) > 0
     
     def calculate_schedule_score(self) -> int:
         """Calculate overall schedule score based on soft constraints and optimization metrics"""
@@ -1120,104 +1495,169 @@ class AdvancedTimetableGenerator:
             print(f"  {faculty.id}: {faculty.name} (Subjects: {faculty.subjects})")
         print("\n")
     
-    def generate_timetable(self, program_id: str = None, semester: int = None) -> Dict[str, Any]:
-        """Main method to generate the timetable with multiple attempts for optimization"""
+    def run_attempt(self, attempt: int, seed: int = None) -> Dict[str, Any]:
+        """Run one greedy construction attempt from a clean state"""
+        print(f"\n🔄 Attempt {attempt + 1}...")
+        
+        # Reset for each attempt
+        self.initialize_occupancy_tracking()
+        self.schedule = []
+        stats = self.stats = GenerationStats()
+        stats.count("attempts")
+        
+        try:
+            # Every attempt after the first explores its own course order;
+            # the construction itself is deterministic for a given order
+            if attempt > 0:
+                random.Random(seed).shuffle(self.courses)
+                print("  → Shuffled course order for diversity")
+            
+            # Step 1: Schedule labs first (they have stricter constraints)
+            with stats.phase("labs"):
+                labs_ok = self.schedule_labs_first()
+            if not labs_ok:
+                print(f"  ❌ Failed to schedule lab sessions")
+                return self._attempt_failed(attempt)
+            
+            lab_count = len([e for e in self.schedule if e.is_lab])
+            print(f"  ✓ Scheduled {lab_count} lab sessions")
+            
+            # Step 2: Schedule theory sessions
+            with stats.phase("theory"):
+                theory_ok = self.schedule_theory_sessions()
+            if not theory_ok:
+                print(f"  ❌ Failed to schedule theory sessions")
+                return self._attempt_failed(attempt)
+            
+            theory_count = len([e for e in self.schedule if not e.is_lab])
+            print(f"  ✓ Scheduled {theory_count} theory sessions")
+            
+            # Step 3: Validate the schedule
+            with stats.phase("validate"):
+                validation_result = self.validate_schedule()
+            
+            # Only treat overlaps as critical errors, allow missing sessions as warnings
+            critical_errors = [error for error in validation_result["errors"] 
+                              if "Overlap detected" in error]
+            
+            if critical_errors:
+                print(f"  ❌ Critical validation errors: {len(critical_errors)}")
+                return self._attempt_failed(attempt)
+            
+            # Step 4: Calculate score with enhanced metrics
+            with stats.phase("score"):
+                score = self.calculate_schedule_score()
+            print(f"  📈 Score = {score}")
+            
+            # Show validation warnings (not failures)
+            warnings = [w for w in validation_result.get("warnings", []) if w]
+            if warnings:
+                print(f"  ⚠️  Warnings: {len(warnings)}")
+            
+            stats.count("attempts_succeeded")
+            return {
+                "attempt": attempt,
+                "success": True,
+                "score": score,
+                "schedule": self.schedule,
+                "validation": validation_result,
+                "statistics": self.get_schedule_statistics(),
+                "instrumentation": stats.as_dict()
+            }
+            
+        except Exception as e:
+            print(f"  ❌ Exception: {str(e)}")
+            return self._attempt_failed(attempt)
+    
+    def _attempt_failed(self, attempt: int) -> Dict[str, Any]:
+        self.stats.count("attempts_failed")
+        return {"attempt": attempt, "success": False, "instrumentation": self.stats.as_dict()}
+    
+    def generate_timetable(self, program_id: str = None, semester: int = None,
+                           attempts: int = 15, workers: int = None,
+                           seed: int = None, progress: Optional[ProgressCallback] = None,
+                           time_budget_ms: int = None, improve_iterations: int = 1000) -> Dict[str, Any]:
+        """Main method to generate the timetable with multiple attempts for optimization
+        
+        Attempts are independent and are fanned out over a process pool of
+        `workers` processes (defaults to one per CPU core, 1 runs in-process).
+        Attempt i uses seed + i, so a fixed seed reproduces the same result.
+        `progress` is called as each attempt finishes and may stop the run early.
+        With `time_budget_ms` the best timetable found when the budget runs
+        out is returned (the run continues past it only until one attempt
+        has succeeded). The best attempt is then improved by up to
+        `improve_iterations` local-search moves (0 skips this phase) within
+        what is left of the budget.
+        """
+        started = time.monotonic()
+        deadline = started + time_budget_ms / 1000 if time_budget_ms else None
         # If no database data loaded, fall back to hardcoded setup
         if not self.courses or not self.groups or not self.rooms or not self.faculty:
             print("No database data loaded, using hardcoded setup...")
             self.setup_cse_ai_ml_courses()
             self.setup_groups_and_resources()
         
+        attempts = max(1, int(attempts))
+        workers = worker_count(workers, attempts)
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        
         print("Starting AI timetable generation with hard and soft constraints...")
         print(f"📊 Using {len(self.courses)} courses, {len(self.rooms)} rooms, {len(self.faculty)} faculty")
+        print(f"Running {attempts} attempts on {workers} worker(s) (seed={seed})")
+        
+        results, deadline_reached = self._run_attempts(attempts, workers, seed, progress, deadline)
+        stopped_early = len(results) < attempts and not deadline_reached
+        stats = GenerationStats()
+        for result in results:
+            stats.merge(result["instrumentation"])
+        search = {
+            "time_budget_ms": time_budget_ms,
+            "deadline_reached": deadline_reached,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "completed": len(results),
+            "planned": attempts
+        }
+        successful = [r for r in results if r["success"]]
         
-        best_schedule = None
-        best_score = float('-inf')
-        best_validation = None
-        best_statistics = None
-        attempts = 15  # Increased from 5 to 15 for better optimization
-        successful_attempts = 0
-        
-        for attempt in range(attempts):
-            print(f"\n🔄 Attempt {attempt + 1}/{attempts}...")
-            
-            # Reset for each attempt
-            self.initialize_occupancy_tracking()
-            self.schedule = []
-            
-            try:
-                # Add randomization by shuffling course order every 3 attempts
-                # This helps explore different solution spaces
-                if attempt % 3 == 0 and attempt > 0:
-                    import random as rand
-                    rand.shuffle(self.courses)
-                    print("  → Shuffled course order for diversity")
-                
-                # Step 1: Schedule labs first (they have stricter constraints)
-                if not self.schedule_labs_first():
-                    print(f"  ❌ Failed to schedule lab sessions")
-                    continue
-                
-                lab_count = len([e for e in self.schedule if e.is_lab])
-                print(f"  ✓ Scheduled {lab_count} lab sessions")
-                
-                # Step 2: Schedule theory sessions
-                if not self.schedule_theory_sessions():
-                    print(f"  ❌ Failed to schedule theory sessions")
-                    continue
-                
-                theory_count = len([e for e in self.schedule if not e.is_lab])
-                print(f"  ✓ Scheduled {theory_count} theory sessions")
-                
-                # Step 3: Validate the schedule
-                validation_result = self.validate_schedule()
-                
-                # Only treat overlaps as critical errors, allow missing sessions as warnings
-                critical_errors = [error for error in validation_result["errors"] 
-                                  if "Overlap detected" in error]
-                
-                if critical_errors:
-                    print(f"  ❌ Critical validation errors: {len(critical_errors)}")
-                    continue
-                
-                # Step 4: Calculate score with enhanced metrics
-                score = self.calculate_schedule_score()
-                successful_attempts += 1
-                print(f"  📈 Score = {score}")
-                
-                # Show validation warnings (not failures)
-                warnings = [w for w in validation_result.get("warnings", []) if w]
-                if warnings:
-                    print(f"  ⚠️  Warnings: {len(warnings)}")
-                
-                # Keep the best scoring arrangement
-                if score > best_score:
-                    best_score = score
-                    best_schedule = deepcopy(self.schedule)
-                    best_validation = validation_result
-                    best_statistics = self.get_schedule_statistics()
-                    print(f"  🏆 New best score: {best_score}")
-                
-            except Exception as e:
-                print(f"  ❌ Exception: {str(e)}")
-                continue
+        # Keep the best scoring arrangement (earliest attempt wins ties)
+        best = max(successful, key=lambda r: (r["score"], -r["attempt"]), default=None)
         
         # Return the best result found
-        if best_schedule is None:
+        if best is None:
             return {
                 "success": False, 
-                "error": f"Failed to generate a valid timetable after {attempts} attempts. Please check constraints.",
-                "attempts_made": attempts,
-                "successful_attempts": successful_attempts
+                "error": f"Failed to generate a valid timetable after {len(results)} attempts. Please check constraints.",
+                "attempts_made": len(results),
+                "successful_attempts": 0,
+                "search": search,
+                "instrumentation": self._record_run("advanced", stats, started, False)
             }
         
-        # Restore the best schedule for output formatting
-        self.schedule = best_schedule
-        formatted_schedule = self.format_schedule_output()
+        best_score = best["score"]
+        best_validation = best["validation"]
+        best_statistics = best["statistics"]
+        
+        # Restore the best schedule and improve it by local search
+        self.load_schedule(best["schedule"])
+        improvement = None
+        if improve_iterations and not stopped_early:
+            self.stats = stats
+            improvement = self.improve_schedule(improve_iterations, deadline, seed)
+            if improvement["score"] != best_score:
+                best_score = improvement["score"]
+                with stats.phase("validate"):
+                    best_validation = self.validate_schedule()
+                best_statistics = self.get_schedule_statistics()
+            search["deadline_reached"] = search["deadline_reached"] or improvement["deadline_reached"]
+            search["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+        
+        with stats.phase("format"):
+            formatted_schedule = self.format_schedule_output()
         
         print(f"\n[SUCCESS] AI Generation Complete!")
-        print(f"Best arrangement found with score: {best_score}")
-        print(f"Total sessions scheduled: {len(best_schedule)}")
+        print(f"Best arrangement found with score: {best_score} (attempt {best['attempt'] + 1})")
+        print(f"Total sessions scheduled: {len(self.schedule)}")
         print(f"Hard constraints satisfied: {len(best_validation['errors']) == 0}")
         
         return {
@@ -1226,14 +1666,652 @@ class AdvancedTimetableGenerator:
             "score": best_score,
             "validation": best_validation,
             "statistics": best_statistics,
-            "attempts_made": attempts,
+            "attempts_made": len(results),
+            "successful_attempts": len(successful),
+            "stopped_early": stopped_early,
+            "search": search,
+            "improvement": improvement,
+            "instrumentation": self._record_run("advanced", stats, started, True),
+            "workers": workers,
+            "seed": seed,
             "message": f"AI generated timetable with score {best_score}. All hard constraints satisfied."
         }
     
+    def _record_run(self, engine: str, stats: GenerationStats, started: float, success: bool) -> Dict[str, Any]:
+        """Add the run to the process metrics and return its stats for the result"""
+        metrics.record_run(engine, stats, time.monotonic() - started, success)
+        return stats.as_dict()
+    
+    def _run_attempts(self, attempts: int, workers: int, seed: int,
+                      progress: Optional[ProgressCallback] = None,
+                      deadline: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Run all attempts, in a process pool when more than one worker is requested
+        
+        At most `workers` attempts are on the shared pool at once. Results are
+        returned in completion order; if `progress` asks to stop,
+        attempts that have not started are cancelled and only finished ones
+        are returned. Past the `deadline` (a time.monotonic() value) no new
+        results are waited for once one attempt has succeeded. Also returns
+        whether the deadline cut the run short.
+        """
+        base_courses = list(self.courses)
+        started = time.perf_counter()
+        results: List[Dict[str, Any]] = []
+        
+        def report(result: Dict[str, Any]) -> bool:
+            results.append(result)
+            if progress is None:
+                return False
+            scores = [r["score"] for r in results if r["success"]]
+            return bool(progress({
+                "engine": "advanced",
+                "attempt": result["attempt"] + 1,
+                "completed": len(results),
+                "total": attempts,
+                "success": result["success"],
+                "score": result.get("score"),
+                "violations": len(result["validation"]["errors"]) if result["success"] else None,
+                "best_score": max(scores) if scores else None,
+                "elapsed": round(time.perf_counter() - started, 3)
+            }))
+        
+        def out_of_time() -> bool:
+            return (deadline is not None and time.monotonic() >= deadline and
+                    any(r["success"] for r in results))
+        
+        def deadline_reached() -> bool:
+            return len(results) < attempts and out_of_time()
+        
+        if workers > 1:
+            # Workers get a pickled copy of this generator with a clean state
+            self.initialize_occupancy_tracking()
+            self.schedule = []
+            pool = get_process_pool()
+            try:
+                futures: Dict[Any, int] = {}
+                pending = set()
+                
+                def submit_next():
+                    attempt = len(futures)
+                    if attempt < attempts:
+                        future = pool.submit(_run_attempt_in_worker, self, attempt, seed + attempt)
+                        futures[future] = attempt
+                        pending.add(future)
+                
+                for _ in range(workers):
+                    submit_next()
+                while pending:
+                    # Once there is a timetable to return, wait no longer than the deadline
+                    timeout = None
+                    if deadline is not None and any(r["success"] for r in results):
+                        timeout = max(0.0, deadline - time.monotonic())
+                    finished, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    stop = not finished
+                    for future in sorted(finished, key=futures.get):
+                        if report(future.result()):
+                            stop = True
+                            break
+                    if not stop:
+                        for _ in finished:
+                            submit_next()
+                    if stop or out_of_time():
+                        for future in pending:
+                            future.cancel()
+                        break
+                return results, deadline_reached()
+            except BrokenProcessPool as e:
+                print(f"[WARNING] Process pool failed ({e}), running attempts in-process")
+                discard_process_pool(pool)
+                results.clear()
+        
+        for attempt in range(attempts):
+            self.courses = list(base_courses)
+            if report(self.run_attempt(attempt, seed + attempt)) or out_of_time():
+                break
+        self.courses = base_courses
+        return results, deadline_reached()
+    
+    def session_demand(self) -> Dict[Tuple[str, str], List[int]]:
+        """Session durations each (course, group) needs per week, as the greedy passes place them"""
+        demand: Dict[Tuple[str, str], List[int]] = {}
+        subgroups = [group for group in self.groups if group.is_subgroup]
+        main_group = next((group for group in self.groups if not group.is_subgroup), None)
+        for course in self.courses:
+            if course.is_lab:
+                for subgroup in subgroups:
+                    demand[(course.code, subgroup.id)] = [180]
+            elif main_group:
+                demand[(course.code, main_group.id)] = course.get_session_structure()
+        return demand
+    
+    def decode_entries(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Map stored timetable entries back onto the loaded data
+        
+        Each result holds the entry's course, group, room, faculty and time
+        slot; anything that no longer exists is None. Rooms and faculty are
+        matched by id, then by name for entries saved before ids were stored.
+        """
+        courses_by_code = {course.code: course for course in self.courses}
+        rooms_by_id, groups_by_id, faculty_by_id = self.resource_lookup()
+        rooms_by_name = {room.name: room for room in self.rooms}
+        groups_by_name = {group.name: group for group in self.groups}
+        faculty_by_name = {fac.name: fac for fac in self.faculty}
+        
+        decoded = []
+        for entry in entries:
+            try:
+                time_slot = TimeSlot(entry["day"], t2min(entry["start_time"]), t2min(entry["end_time"]))
+            except (KeyError, TypeError, ValueError):
+                time_slot = None
+            decoded.append({
+                "course": courses_by_code.get(entry.get("course_code")),
+                "group": groups_by_id.get(entry.get("group_id")) or groups_by_name.get(entry.get("group")),
+                "room": rooms_by_id.get(entry.get("room_id")) or rooms_by_name.get(entry.get("room")),
+                "faculty": faculty_by_id.get(entry.get("faculty_id")) or faculty_by_name.get(entry.get("faculty")),
+                "time_slot": time_slot,
+                "is_lab": bool(entry.get("is_lab")),
+                "duration": entry.get("duration_minutes")
+            })
+        return decoded
+    
+    def slots_for_session(self, is_lab: bool, duration: int) -> List[TimeSlot]:
+        """Candidate time slots for a session of the given kind and length"""
+        if is_lab:
+            return self.rules.get_lab_slots()
+        return self.rules.get_double_period_slots() if duration == 100 else self.rules.get_theory_slots()
+    
+    def free_faculty(self, course_code: str, time_slot: TimeSlot) -> Optional[str]:
+        """Least-loaded eligible faculty member who is free at the slot"""
+        free = [fac for fac in self.get_resource_index().eligible_faculty(course_code)
+                if self.faculty_occupancy.is_free(fac.id, time_slot)]
+        if not free:
+            return None
+        return min(free, key=lambda fac: self.faculty_occupancy.booked(fac.id)).id
+    
+    def free_room(self, group_size: int, is_lab: bool, time_slot: TimeSlot) -> Optional[str]:
+        """Best-fitting suitable room that is free at the slot"""
+        index = self.get_resource_index()
+        free = [room for room in index.rooms_for(group_size, is_lab)
+                if self.room_occupancy.is_free(room.id, time_slot)]
+        return min(free, key=index.room_rank).id if free else None
+    
+    def group_can_take(self, course: CourseRequirement, group: StudentGroup, time_slot: TimeSlot) -> bool:
+        """Hard checks for the group at a slot: free, within daily caps, course not already that day"""
+        return (time_slot.day in self.rules.WORKING_DAYS and
+                self.group_occupancy.is_free(group.id, time_slot) and
+                self.check_daily_constraints(group.id, time_slot.day, time_slot) and
+                not self.has_course_on_day(course.code, group.id, time_slot.day))
+    
+    def try_place_session(self, course: CourseRequirement, group: StudentGroup, duration: int,
+                          slots: List[TimeSlot]) -> Optional[ScheduleEntry]:
+        """Place a session in the first slot (in the given order) where it fits"""
+        for slot in slots:
+            if not self.group_can_take(course, group, slot):
+                continue
+            faculty_id = self.free_faculty(course.code, slot)
+            room_id = self.free_room(group.size, course.is_lab, slot) if faculty_id else None
+            if room_id:
+                entry = ScheduleEntry(
+                    course_code=course.code,
+                    course_name=course.name,
+                    group_id=group.id,
+                    faculty_id=faculty_id,
+                    room_id=room_id,
+                    time_slot=slot,
+                    is_lab=course.is_lab,
+                    session_duration=duration
+                )
+                self.place_entry(entry)
+                return entry
+        return None
+    
+    def place_with_eviction(self, course: CourseRequirement, group: StudentGroup, duration: int,
+                            slots: List[TimeSlot], frozen: Set[ScheduleEntry],
+                            rng: random.Random, max_tries: int = 200) -> Optional[List[ScheduleEntry]]:
+        """Place a session by moving one kept entry that blocks it to another slot
+        
+        Tries the blockers at each candidate slot (the group's own sessions and
+        sessions of eligible faculty) and keeps the first move where both the
+        new session and the displaced one fit. Entries in `frozen` are never
+        moved. Returns the placed entries, or None if no single move works.
+        """
+        index = self.get_resource_index()
+        eligible = {fac.id for fac in index.eligible_faculty(course.code)}
+        suitable_rooms = {room.id for room in index.rooms_for(group.size, course.is_lab)}
+        courses_by_code = {c.code: c for c in self.courses}
+        _, groups_by_id, _ = self.resource_lookup()
+        tries = 0
+        for slot in slots:
+            # The group's sessions that day (overlap, daily caps, same course) and
+            # overlapping sessions holding an eligible faculty member or suitable room
+            blockers = [entry for entry in self.schedule_index.entries_on(group.id, slot.day)
+                        if entry not in frozen]
+            blockers += [entry for entry in self.schedule
+                         if entry not in frozen and entry.group_id != group.id and entry.time_slot.overlaps(slot) and
+                         (entry.faculty_id in eligible or entry.room_id in suitable_rooms)]
+            rng.shuffle(blockers)
+            for blocker in blockers:
+                tries += 1
+                if tries > max_tries:
+                    return None
+                self.remove_entry(blocker)
+                placed = self.try_place_session(course, group, duration, [slot])
+                if placed:
+                    moved_course = courses_by_code[blocker.course_code]
+                    moved_group = groups_by_id[blocker.group_id]
+                    moved_slots = self.apply_soft_constraints_to_slots(
+                        [candidate for candidate in self.slots_for_session(blocker.is_lab, blocker.session_duration)
+                         if candidate != blocker.time_slot],
+                        moved_course, moved_group.id
+                    )
+                    moved = self.try_place_session(moved_course, moved_group, blocker.session_duration, moved_slots)
+                    if moved:
+                        return [placed, moved]
+                    self.remove_entry(placed)
+                self.place_entry(blocker)
+        return None
+    
+    def load_schedule(self, entries: Iterable[ScheduleEntry]):
+        """Make `entries` the current schedule, rebuilding the occupancy calendars around them"""
+        self.initialize_occupancy_tracking()
+        self.schedule = []
+        for entry in entries:
+            self.place_entry(entry)
+    
+    def _release_at(self, indices: List[int]):
+        """Unbook the entries at the schedule positions (they stay in the list until replaced)"""
+        for i in indices:
+            entry = self.schedule[i]
+            self.unbook_slot(entry.time_slot, entry.room_id, entry.faculty_id, entry.group_id)
+            self.schedule_index.remove(entry)
+    
+    def _occupy_at(self, i: int, entry: ScheduleEntry):
+        """Book `entry` in schedule position i, after the entry there was released"""
+        self.book_slot(entry.time_slot, entry.room_id, entry.faculty_id, entry.group_id)
+        self.schedule[i] = entry
+        self.schedule_index.add(entry)
+    
+    def _moved_entry(self, entry: ScheduleEntry, course: CourseRequirement, group: StudentGroup,
+                     time_slot: TimeSlot) -> Optional[ScheduleEntry]:
+        """The entry at another slot, keeping its faculty and room when they are free there"""
+        if not self.group_can_take(course, group, time_slot):
+            return None
+        faculty_id = entry.faculty_id
+        if not self.faculty_occupancy.is_free(faculty_id, time_slot):
+            faculty_id = self.free_faculty(course.code, time_slot)
+        room_id = entry.room_id
+        if not self.room_occupancy.is_free(room_id, time_slot):
+            room_id = self.free_room(group.size, course.is_lab, time_slot)
+        if not faculty_id or not room_id:
+            return None
+        return ScheduleEntry(
+            course_code=entry.course_code,
+            course_name=entry.course_name,
+            group_id=entry.group_id,
+            faculty_id=faculty_id,
+            room_id=room_id,
+            time_slot=time_slot,
+            is_lab=entry.is_lab,
+            session_duration=entry.session_duration
+        )
+    
+    def _try_move(self, rng: random.Random, courses_by_code: Dict[str, CourseRequirement],
+                  groups_by_id: Dict[str, StudentGroup], movable: List[int]) -> Optional[Tuple[str, List[int], List[ScheduleEntry]]]:
+        """Apply one random feasible move to the schedule
+        
+        Moves relocate a session to another slot of its kind, swap the slots of
+        two sessions of a group with the same length, or change a session's
+        room. Every move keeps the hard constraints the construction checks.
+        Returns the move, the positions it changed and their previous entries
+        (to undo it), or None if the drawn move does not fit.
+        """
+        move = rng.choice(("relocate", "swap", "room"))
+        i = rng.choice(movable)
+        entry = self.schedule[i]
+        course = courses_by_code[entry.course_code]
+        group = groups_by_id[entry.group_id]
+        
+        if move == "room":
+            index = self.get_resource_index()
+            rooms = [room.id for room in index.rooms_for(group.size, course.is_lab)
+                     if room.id != entry.room_id and self.room_occupancy.is_free(room.id, entry.time_slot)]
+            if not rooms:
+                return None
+            self._release_at([i])
+            self._occupy_at(i, ScheduleEntry(
+                course_code=entry.course_code,
+                course_name=entry.course_name,
+                group_id=entry.group_id,
+                faculty_id=entry.faculty_id,
+                room_id=rng.choice(rooms),
+                time_slot=entry.time_slot,
+                is_lab=entry.is_lab,
+                session_duration=entry.session_duration
+            ))
+            return move, [i], [entry]
+        
+        if move == "relocate":
+            slots = [slot for slot in self.slots_for_session(entry.is_lab, entry.session_duration)
+                     if slot != entry.time_slot]
+            if not slots:
+                return None
+            self._release_at([i])
+            moved = self._moved_entry(entry, course, group, rng.choice(slots))
+            if moved is None:
+                self._occupy_at(i, entry)
+                return None
+            self._occupy_at(i, moved)
+            return move, [i], [entry]
+        
+        partners = [j for j in movable
+                    if j != i and self.schedule[j].group_id == entry.group_id and
+                    self.schedule[j].is_lab == entry.is_lab and
+                    self.schedule[j].session_duration == entry.session_duration and
+                    self.schedule[j].time_slot != entry.time_slot]
+        if not partners:
+            return None
+        j = rng.choice(partners)
+        other = self.schedule[j]
+        self._release_at([i, j])
+        first = self._moved_entry(entry, course, group, other.time_slot)
+        if first is not None:
+            self._occupy_at(i, first)
+            second = self._moved_entry(other, courses_by_code[other.course_code], group, entry.time_slot)
+            if second is not None:
+                self._occupy_at(j, second)
+                return move, [i, j], [entry, other]
+            self._release_at([i])
+        self._occupy_at(i, entry)
+        self._occupy_at(j, other)
+        return None
+    
+    def improve_schedule(self, iterations: int = 1000, deadline: Optional[float] = None,
+                         seed: int = None, temperature: float = 10.0, cooling: float = 0.995,
+                         tabu_tenure: int = 5) -> Dict[str, Any]:
+        """Improve the current schedule by simulated annealing over local moves
+        
+        Each iteration applies one random move (see _try_move) and keeps it if
+        calculate_schedule_score does not drop, or with probability
+        exp(delta / T) if it does; T starts at `temperature` and is multiplied
+        by `cooling` every iteration. Sessions moved in the last `tabu_tenure`
+        iterations are not moved again. Stops after `iterations` or at the
+        `deadline` (a time.monotonic() value) and leaves the best schedule seen
+        as the current one, so the score never ends lower than it started.
+        """
+        rng = random.Random(seed)
+        started = time.monotonic()
+        courses_by_code = {course.code: course for course in self.courses}
+        _, groups_by_id, _ = self.resource_lookup()
+        stats = self.stats
+        
+        current = initial = self.calculate_schedule_score()
+        best, best_schedule = current, list(self.schedule)
+        tabu: Dict[int, int] = {}
+        tenure = max(0, min(tabu_tenure, len(self.schedule) - 1))
+        deadline_reached = False
+        completed = accepted = 0
+        
+        with stats.phase("improve"):
+            for iteration in range(max(0, int(iterations)) if self.schedule else 0):
+                if deadline is not None and time.monotonic() >= deadline:
+                    deadline_reached = True
+                    break
+                completed += 1
+                movable = [i for i in range(len(self.schedule)) if tabu.get(i, -1) < iteration]
+                applied = self._try_move(rng, courses_by_code, groups_by_id, movable)
+                temperature *= cooling
+                if applied is None:
+                    stats.count("improve_infeasible")
+                    continue
+                move, indices, previous = applied
+                stats.count(f"improve_{move}")
+                
+                score = self.calculate_schedule_score()
+                delta = score - current
+                if delta >= 0 or rng.random() < math.exp(delta / max(temperature, 1e-6)):
+                    accepted += 1
+                    stats.count("improve_accepted")
+                    current = score
+                    for i in indices:
+                        tabu[i] = iteration + tenure
+                    if current > best:
+                        stats.count("improve_new_best")
+                        best, best_schedule = current, list(self.schedule)
+                    continue
+                
+                # Undo the rejected move
+                self._release_at(indices)
+                for i, entry in zip(indices, previous):
+                    self._occupy_at(i, entry)
+            
+            if current != best:
+                self.load_schedule(best_schedule)
+        
+        summary = {
+            "iterations": completed,
+            "accepted": accepted,
+            "initial_score": initial,
+            "score": best,
+            "deadline_reached": deadline_reached,
+            "elapsed_ms": round((time.monotonic() - started) * 1000)
+        }
+        print(f"  🔧 Local search: {initial} → {best} in {completed} iterations ({accepted} moves accepted)")
+        return summary
+    
+    def repair_timetable(self, entries: List[Dict[str, Any]], seed: int = None,
+                         unavailable_faculty: Iterable[str] = (),
+                         progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Repair an existing timetable after a change instead of regenerating it
+        
+        Stored entries that are still valid against the loaded data are kept
+        as they are. An entry whose faculty or room became unusable keeps its
+        slot with another free faculty member or room where possible, entries
+        that no longer fit are unassigned, and every session still missing is
+        placed around the kept entries, moving at most one kept entry per
+        session when it cannot fit otherwise. A repair stopped by `progress`
+        fails, with the sessions it did not reach listed as unplaced.
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        rng = random.Random(seed)
+        started = time.monotonic()
+        
+        stats = self.stats = GenerationStats()
+        
+        unavailable = set(unavailable_faculty)
+        if unavailable:
+            self.faculty = [fac for fac in self.faculty if fac.id not in unavailable]
+        self.initialize_occupancy_tracking()
+        self.schedule = []
+        
+        demand = self.session_demand()
+        valid_slots = {
+            (False, 50): set(self.slots_for_session(False, 50)),
+            (False, 100): set(self.slots_for_session(False, 100)),
+            (True, 180): set(self.slots_for_session(True, 180))
+        }
+        kept: List[ScheduleEntry] = []
+        reassigned = dropped = 0
+        index = self.get_resource_index()
+        
+        # Keep every stored entry that is still valid, fixing its faculty or room in place
+        with stats.phase("keep"):
+            for item in self.decode_entries(entries):
+                course, group, time_slot = item["course"], item["group"], item["time_slot"]
+                durations = demand.get((course.code, group.id)) if course and group else None
+                duration = 180 if course and course.is_lab else item["duration"]
+                if (not durations or duration not in durations or
+                        time_slot not in valid_slots.get((course.is_lab, duration), ()) or
+                        not self.group_can_take(course, group, time_slot)):
+                    dropped += 1
+                    continue
+            
+                faculty, room = item["faculty"], item["room"]
+                faculty_id = faculty.id if (faculty and faculty in index.eligible_faculty(course.code) and
+                                            self.faculty_occupancy.is_free(faculty.id, time_slot)) else None
+                room_id = room.id if (room and room.can_accommodate(group.size, course.is_lab) and
+                                      self.room_occupancy.is_free(room.id, time_slot)) else None
+                changed = not faculty_id or not room_id
+                faculty_id = faculty_id or self.free_faculty(course.code, time_slot)
+                room_id = room_id or self.free_room(group.size, course.is_lab, time_slot)
+                if not faculty_id or not room_id:
+                    dropped += 1
+                    continue
+            
+                entry = ScheduleEntry(
+                    course_code=course.code,
+                    course_name=course.name,
+                    group_id=group.id,
+                    faculty_id=faculty_id,
+                    room_id=room_id,
+                    time_slot=time_slot,
+                    is_lab=course.is_lab,
+                    session_duration=duration
+                )
+                self.place_entry(entry)
+                durations.remove(duration)
+                if changed:
+                    reassigned += 1
+                else:
+                    kept.append(entry)
+        
+        
+        # Re-place the sessions that are still missing, most constrained first
+        with stats.phase("place"):
+            courses_by_code = {course.code: course for course in self.courses}
+            _, groups_by_id, _ = self.resource_lookup()
+            pending = [(courses_by_code[code], groups_by_id[group_id], duration)
+                       for (code, group_id), durations in demand.items() for duration in durations]
+            pending.sort(key=lambda session: (not session[0].is_lab, -session[2]))
+        
+            frozen: Set[ScheduleEntry] = set()
+            added = moved = 0
+            unplaced = []
+            stopped_early = False
+            for number, (course, group, duration) in enumerate(pending, start=1):
+                slots = self.apply_soft_constraints_to_slots(
+                    self.slots_for_session(course.is_lab, duration), course, group.id
+                )
+                entry = self.try_place_session(course, group, duration, slots)
+                if entry:
+                    frozen.add(entry)
+                else:
+                    placed = self.place_with_eviction(course, group, duration, slots, frozen, rng)
+                    if placed:
+                        frozen.update(placed)
+                        moved += 1
+                    else:
+                        unplaced.append(f"{course.code} ({group.name}, {duration}min)")
+                        continue
+                added += 1
+                if progress and progress({
+                    "engine": "repair",
+                    "placed": number,
+                    "total": len(pending),
+                    "unplaced": len(unplaced),
+                    "elapsed": round(time.monotonic() - started, 3)
+                }):
+                    # Sessions not reached count as unplaced, so a stopped repair never passes as complete
+                    stopped_early = True
+                    unplaced.extend(f"{course.code} ({group.name}, {duration}min)"
+                                    for course, group, duration in pending[number:])
+                    break
+        
+        
+        # Entries still at their stored slot, resources and all
+        scheduled = set(self.schedule)
+        stable = sum(1 for entry in kept if entry in scheduled)
+        repair_stats = {
+            "original_entries": len(entries),
+            "kept": stable,
+            "reassigned": reassigned,
+            "dropped": dropped,
+            "added": added,
+            "moved": moved,
+            "unplaced": unplaced,
+            "stopped_early": stopped_early,
+            "stability": round(stable / len(entries), 3) if entries else 0.0,
+            "seed": seed,
+            "elapsed": round(time.monotonic() - started, 3)
+        }
+        print(f"[REPAIR] kept {stable}/{len(entries)} entries, reassigned {reassigned}, "
+              f"dropped {dropped}, added {added} (moving {moved}), unplaced {len(unplaced)}")
+        
+        if unplaced:
+            if stopped_early:
+                error = f"Repair was stopped with {len(unplaced)} sessions not placed."
+            else:
+                error = (f"Repair could not place {len(unplaced)} sessions: {', '.join(unplaced)}. "
+                         f"Run a full generation instead.")
+            return {
+                "success": False,
+                "error": error,
+                "stopped_early": stopped_early,
+                "attempts_made": 1,
+                "repair": repair_stats,
+                "instrumentation": self._record_run("repair", stats, started, False)
+            }
+        
+        with stats.phase("validate"):
+            validation_result = self.validate_schedule()
+        with stats.phase("score"):
+            score = self.calculate_schedule_score()
+        return {
+            "success": True,
+            "schedule": self.format_schedule_output(),
+            "score": score,
+            "validation": validation_result,
+            "statistics": self.get_schedule_statistics(),
+            "attempts_made": 1,
+            "repair": repair_stats,
+            "instrumentation": self._record_run("repair", stats, started, True),
+            "message": f"Repaired timetable: kept {stable} of {len(entries)} entries, score {score}."
+        }
+    
+    def resource_lookup(self) -> Tuple[Dict[str, Room], Dict[str, StudentGroup], Dict[str, Faculty]]:
+        """Build id -> object dicts for rooms, groups and faculty"""
+        return (
+            {room.id: room for room in self.rooms},
+            {group.id: group for group in self.groups},
+            {fac.id: fac for fac in self.faculty}
+        )
+    
+    def find_overlaps(self) -> List[Tuple[int, int]]:
+        """Find pairs of schedule indices that overlap on a shared room, faculty or group
+        
+        Entries are bucketed per resource and day, and each bucket is swept in
+        start order keeping only the sessions that are still running, so the
+        cost grows with the number of entries and overlaps instead of all pairs.
+        """
+        buckets: Dict[Tuple[str, str, str], List[int]] = {}
+        for i, entry in enumerate(self.schedule):
+            day = entry.time_slot.day
+            buckets.setdefault(("room", entry.room_id, day), []).append(i)
+            buckets.setdefault(("faculty", entry.faculty_id, day), []).append(i)
+            buckets.setdefault(("group", entry.group_id, day), []).append(i)
+        
+        pairs: Set[Tuple[int, int]] = set()
+        for indices in buckets.values():
+            if len(indices) < 2:
+                continue
+            indices.sort(key=lambda i: self.schedule[i].time_slot.start_min)
+            running: List[int] = []
+            for i in indices:
+                start = self.schedule[i].time_slot.start_min
+                running = [j for j in running if self.schedule[j].time_slot.end_min > start]
+                for j in running:
+                    pairs.add((min(i, j), max(i, j)))
+                running.append(i)
+        
+        # A pair sharing several resources is reported once, in schedule order
+        return sorted(pairs)
+    
     def validate_schedule(self) -> Dict[str, Any]:
         """Validate the generated schedule against all constraints"""
         errors = []
         warnings = []
+        rooms_by_id, groups_by_id, _ = self.resource_lookup()
+        course_names = {course.code: course.name for course in self.courses}
         
         # Check weekly hour requirements
         course_hours = {}
@@ -1262,22 +2340,18 @@ class AdvancedTimetableGenerator:
         
         for (course_code, day), entries in course_daily.items():
             if len(entries) > 2:  # Allow up to 2 sessions per course per day (theory + lab for same group)
-                course_name = next((c.name for c in self.courses if c.code == course_code), course_code)
+                course_name = course_names.get(course_code, course_code)
                 warnings.append(f"{course_name} has {len(entries)} sessions on {day} (should be spread across days)")
         
         # Check for overlaps
-        for i, entry1 in enumerate(self.schedule):
-            for entry2 in self.schedule[i+1:]:
-                if (entry1.time_slot.overlaps(entry2.time_slot) and 
-                    (entry1.room_id == entry2.room_id or 
-                     entry1.faculty_id == entry2.faculty_id or 
-                     entry1.group_id == entry2.group_id)):
-                    errors.append(f"Overlap detected: {entry1.course_code} and {entry2.course_code} on {entry1.time_slot}")
+        for i, j in self.find_overlaps():
+            entry1, entry2 = self.schedule[i], self.schedule[j]
+            errors.append(f"Overlap detected: {entry1.course_code} and {entry2.course_code} on {entry1.time_slot}")
         
         # Check room capacities
         for entry in self.schedule:
-            room = next(room for room in self.rooms if room.id == entry.room_id)
-            group = next(group for group in self.groups if group.id == entry.group_id)
+            room = rooms_by_id[entry.room_id]
+            group = groups_by_id[entry.group_id]
             if room.capacity < group.size:
                 errors.append(f"Room {room.name} (cap {room.capacity}) too small for {group.name} ({group.size} students)")
         
@@ -1290,11 +2364,12 @@ class AdvancedTimetableGenerator:
     def format_schedule_output(self) -> List[Dict[str, Any]]:
         """Format the schedule for output"""
         formatted = []
+        rooms_by_id, groups_by_id, faculty_by_id = self.resource_lookup()
         
         for entry in self.schedule:
-            room = next(room for room in self.rooms if room.id == entry.room_id)
-            group = next(group for group in self.groups if group.id == entry.group_id)
-            faculty = next(faculty for faculty in self.faculty if faculty.id == entry.faculty_id)
+            room = rooms_by_id[entry.room_id]
+            group = groups_by_id[entry.group_id]
+            faculty = faculty_by_id[entry.faculty_id]
             formatted.append({
                 "day": entry.time_slot.day,
                 "start_time": entry.time_slot.start_time,
@@ -1304,7 +2379,9 @@ class AdvancedTimetableGenerator:
                 "group": group.name,
                 "group_id": group.id,  # Ensure group_id is present and matches MongoDB _id
                 "room": room.name,
+                "room_id": room.id,
                 "faculty": faculty.name,
+                "faculty_id": faculty.id,
                 "is_lab": entry.is_lab,
                 "duration_minutes": entry.session_duration
             })
@@ -1333,3 +2410,7 @@ class AdvancedTimetableGenerator:
         stats["sessions_per_day"] = sessions_per_day
         
         return stats
+
+def _run_attempt_in_worker(generator: AdvancedTimetableGenerator, attempt: int, seed: int) -> Dict[str, Any]:
+    """Process-pool entry point: run one attempt on the worker's own generator copy"""
+    return generator.run_attempt(attempt, seed)
@@ -0,0 +1,379 @@
+# backend/app/services/timetable/cpsat_generator.py
+"""
+CP-SAT Timetable Generator
+Builds an OR-Tools CP-SAT model from the same courses, groups, rooms, faculty
+and scheduling rules as the advanced generator and solves it with a
+multi-worker search instead of randomized greedy restarts
+"""
+from __future__ import annotations
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+import time
+
+from ortools.sat.python import cp_model
+
+from .instrumentation import GenerationStats
+from .advanced_generator import (
+    AdvancedTimetableGenerator, CourseRequirement, StudentGroup, Room, Faculty,
+    ScheduleEntry, SchedulingRules, TimeSlot, ProgressCallback, slot_periods, t2min, merge_slots
+)
+
+# Each working day gets its own 24h span on a single time axis so that
+# intervals on different days can never overlap
+DAY_SPAN = 24 * 60
+
+@dataclass
+class Session:
+    """A single class session that the model must place"""
+    course: CourseRequirement
+    group: StudentGroup
+    duration: int
+    is_lab: bool
+    slots: List[TimeSlot]
+    rooms: List[Room]
+    faculty: List[Faculty]
+
+    @property
+    def periods(self) -> int:
+        """Number of periods counted against the daily cap (same as check_daily_constraints)"""
+        return slot_periods(self.slots[0]) if self.slots else 1
+
+class SolutionProgress(cp_model.CpSolverSolutionCallback):
+    """Reports each improving CP-SAT solution and stops the search on request"""
+
+    def __init__(self, progress: ProgressCallback):
+        super().__init__()
+        self.progress = progress
+        self.solutions = 0
+        self.stopped = False
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        stop = self.progress({
+            "engine": "cpsat",
+            "solution": self.solutions,
+            "objective": self.ObjectiveValue(),
+            "best_bound": self.BestObjectiveBound(),
+            "conflicts": self.NumConflicts(),
+            "elapsed": round(self.WallTime(), 3)
+        })
+        if stop:
+            self.stopped = True
+            self.StopSearch()
+
+class CPSATTimetableGenerator(AdvancedTimetableGenerator):
+    """Constraint-programming timetable generator using OR-Tools CP-SAT"""
+
+    def __init__(self, rules: SchedulingRules = None, time_limit_seconds: float = 30.0,
+                 num_workers: int = 8):
+        super().__init__(rules)
+        self.time_limit_seconds = time_limit_seconds
+        self.num_workers = num_workers
+
+    def input_fingerprint(self, **params) -> str:
+        return super().input_fingerprint(
+            time_limit_seconds=self.time_limit_seconds, num_workers=self.num_workers, **params
+        )
+
+    def build_sessions(self) -> List[Session]:
+        """Expand courses into the sessions the greedy generator would place"""
+        sessions = []
+        lab_slots = self.rules.get_lab_slots()
+        single_slots = self.rules.get_theory_slots()
+        double_slots = self.rules.get_double_period_slots()
+
+        # Labs are taught per subgroup
+        subgroups = [group for group in self.groups if group.is_subgroup]
+        for course in self.courses:
+            if not course.is_lab:
+                continue
+            for subgroup in subgroups:
+                sessions.append(Session(
+                    course=course,
+                    group=subgroup,
+                    duration=180,
+                    is_lab=True,
+                    slots=lab_slots,
+                    rooms=[room for room in self.rooms if room.can_accommodate(subgroup.size, True)],
+                    faculty=self.eligible_faculty(course.code)
+                ))
+
+        # Theory is taught to the main group
+        main_group = next((group for group in self.groups if not group.is_subgroup), None)
+        if main_group:
+            for course in self.courses:
+                if course.is_lab:
+                    continue
+                for session_duration in course.get_session_structure():
+                    sessions.append(Session(
+                        course=course,
+                        group=main_group,
+                        duration=session_duration,
+                        is_lab=False,
+                        slots=double_slots if session_duration == 100 else single_slots,
+                        rooms=[room for room in self.rooms if room.can_accommodate(main_group.size, False)],
+                        faculty=self.eligible_faculty(course.code)
+                    ))
+
+        return sessions
+
+    def slot_preference(self, course: CourseRequirement, slot: TimeSlot) -> int:
+        """Static part of the soft constraints used as the CP-SAT objective"""
+        score = 0
+
+        # Avoid early slots (08:00) for electives/minor
+        if course.elective_type and slot.start_min == t2min("08:00"):
+            score -= 15
+
+        # Prefer mid-day for Industrial Management
+        if course.code == "IND_MGMT":
+            if t2min("10:00") <= slot.start_min <= t2min("15:00"):
+                score += 10
+            else:
+                score -= 5
+
+        # Prefer afternoon labs (13:20-16:30)
+        if course.is_lab and t2min("13:20") <= slot.start_min <= t2min("16:30"):
+            score += 15
+        elif course.is_lab and slot.start_min < t2min("13:20"):
+            score -= 5
+
+        return score
+
+    def generate_timetable(self, program_id: str = None, semester: int = None,
+                           progress: Optional[ProgressCallback] = None,
+                           time_budget_ms: int = None) -> Dict[str, Any]:
+        """Build and solve the CP-SAT model, returning the best timetable found
+        
+        `progress` is called for every improving solution and may stop the
+        search early, keeping the best solution found so far.
+        `time_budget_ms` caps the whole call (model building included) below
+        the configured time limit.
+        """
+        started = time.monotonic()
+        stats = self.stats = GenerationStats()
+        # If no database data loaded, fall back to hardcoded setup
+        if not self.courses or not self.groups or not self.rooms or not self.faculty:
+            print("No database data loaded, using hardcoded setup...")
+            self.setup_cse_ai_ml_courses()
+            self.setup_groups_and_resources()
+
+        print("Starting CP-SAT timetable generation...")
+        print(f"📊 Using {len(self.courses)} courses, {len(self.rooms)} rooms, {len(self.faculty)} faculty")
+
+        with stats.phase("build_sessions"):
+            sessions = self.build_sessions()
+        stats.count("sessions", len(sessions))
+        for session in sessions:
+            if not session.rooms or not session.faculty or not session.slots:
+                stats.reject("no_resources" if session.slots else "no_slots")
+                return {
+                    "success": False,
+                    "error": f"No suitable {'room' if not session.rooms else 'faculty' if not session.faculty else 'time slot'} "
+                             f"for {session.course.code} ({session.group.name})",
+                    "attempts_made": 0,
+                    "instrumentation": self._record_run("cpsat", stats, started, False)
+                }
+
+        with stats.phase("build_model"):
+            model = cp_model.CpModel()
+            day_index = {day: i for i, day in enumerate(self.rules.WORKING_DAYS)}
+
+            slot_vars: List[List[cp_model.IntVar]] = []
+            room_vars: List[List[cp_model.IntVar]] = []
+            faculty_vars: List[List[cp_model.IntVar]] = []
+            room_intervals: Dict[str, List[cp_model.IntervalVar]] = {room.id: [] for room in self.rooms}
+            faculty_intervals: Dict[str, List[cp_model.IntervalVar]] = {fac.id: [] for fac in self.faculty}
+            group_intervals: Dict[str, List[cp_model.IntervalVar]] = {group.id: [] for group in self.groups}
+            objective_terms = []
+
+            for s, session in enumerate(sessions):
+                # Pick exactly one time slot
+                x = [model.NewBoolVar(f"x_{s}_{k}") for k in range(len(session.slots))]
+                model.AddExactlyOne(x)
+                slot_vars.append(x)
+
+                starts = [day_index[slot.day] * DAY_SPAN + slot.start_min for slot in session.slots]
+                start = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted(set(starts))), f"start_{s}")
+                model.Add(start == sum(value * var for value, var in zip(starts, x)))
+                group_intervals[session.group.id].append(
+                    model.NewFixedSizeIntervalVar(start, session.duration, f"group_iv_{s}")
+                )
+
+                # Pick exactly one room
+                y = [model.NewBoolVar(f"y_{s}_{r}") for r in range(len(session.rooms))]
+                model.AddExactlyOne(y)
+                room_vars.append(y)
+                for room, present in zip(session.rooms, y):
+                    room_intervals[room.id].append(
+                        model.NewOptionalFixedSizeIntervalVar(start, session.duration, present, f"room_iv_{s}_{room.id}")
+                    )
+
+                # Pick exactly one faculty member
+                z = [model.NewBoolVar(f"z_{s}_{f}") for f in range(len(session.faculty))]
+                model.AddExactlyOne(z)
+                faculty_vars.append(z)
+                for fac, present in zip(session.faculty, z):
+                    faculty_intervals[fac.id].append(
+                        model.NewOptionalFixedSizeIntervalVar(start, session.duration, present, f"fac_iv_{s}_{fac.id}")
+                    )
+
+                for slot, var in zip(session.slots, x):
+                    weight = self.slot_preference(session.course, slot)
+                    if weight:
+                        objective_terms.append(weight * var)
+
+            # Time reserved elsewhere (published timetables, other programs) is
+            # fixed. Reservations may overlap each other (clashing published
+            # timetables), which NoOverlap would reject outright, so each
+            # resource's reserved time is merged into disjoint intervals first
+            for intervals, reserved in ((room_intervals, self.reserved_rooms),
+                                        (faculty_intervals, self.reserved_faculty)):
+                for resource_id, slots in reserved.items():
+                    if resource_id not in intervals:
+                        continue
+                    for k, slot in enumerate(merge_slots(slots)):
+                        if slot.day in day_index:
+                            intervals[resource_id].append(model.NewIntervalVar(
+                                day_index[slot.day] * DAY_SPAN + slot.start_min, slot.duration,
+                                day_index[slot.day] * DAY_SPAN + slot.end_min, f"reserved_{resource_id}_{k}"
+                            ))
+
+            # No resource may be double booked
+            for intervals in room_intervals.values():
+                if len(intervals) > 1:
+                    model.AddNoOverlap(intervals)
+            for intervals in faculty_intervals.values():
+                if len(intervals) > 1:
+                    model.AddNoOverlap(intervals)
+            for intervals in group_intervals.values():
+                if len(intervals) > 1:
+                    model.AddNoOverlap(intervals)
+
+            # Daily constraints per group and day
+            for group in self.groups:
+                group_sessions = [s for s, session in enumerate(sessions) if session.group.id == group.id]
+                if not group_sessions:
+                    continue
+                for day in self.rules.WORKING_DAYS:
+                    on_day = {
+                        s: sum(var for slot, var in zip(sessions[s].slots, slot_vars[s]) if slot.day == day)
+                        for s in group_sessions
+                    }
+                    model.Add(sum(sessions[s].periods * on_day[s] for s in group_sessions)
+                              <= self.rules.ABSOLUTE_MAX_PERIODS_PER_DAY)
+
+                    lab_sessions = [s for s in group_sessions if sessions[s].is_lab]
+                    if lab_sessions:
+                        model.Add(sum(on_day[s] for s in lab_sessions) <= self.rules.MAX_LABS_PER_DAY_PER_GROUP)
+
+                    # Same course at most once per day for a group
+                    by_course: Dict[str, List[int]] = {}
+                    for s in group_sessions:
+                        by_course.setdefault(sessions[s].course.code, []).append(s)
+                    for course_sessions in by_course.values():
+                        if len(course_sessions) > 1:
+                            model.Add(sum(on_day[s] for s in course_sessions) <= 1)
+
+            if objective_terms:
+                model.Maximize(sum(objective_terms))
+            stats.count("model_variables", len(model.Proto().variables))
+            stats.count("model_constraints", len(model.Proto().constraints))
+
+        time_limit = float(self.time_limit_seconds)
+        if time_budget_ms:
+            remaining = time_budget_ms / 1000 - (time.monotonic() - started)
+            time_limit = max(0.05, min(time_limit, remaining))
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_search_workers = max(1, int(self.num_workers))
+        solution_progress = SolutionProgress(progress) if progress else None
+        with stats.phase("solve"):
+            status = solver.Solve(model, solution_progress)
+        if solution_progress:
+            stats.count("solutions", solution_progress.solutions)
+        stats.count("conflicts", solver.NumConflicts())
+        stats.count("branches", solver.NumBranches())
+
+        solver_stats = {
+            "status": solver.StatusName(status),
+            "objective": solver.ObjectiveValue() if objective_terms and status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+            "best_bound": solver.BestObjectiveBound() if objective_terms else None,
+            "wall_time": solver.WallTime(),
+            "num_conflicts": solver.NumConflicts(),
+            "num_branches": solver.NumBranches(),
+            "num_workers": solver.parameters.num_search_workers,
+            "time_limit_seconds": self.time_limit_seconds,
+            "num_sessions": len(sessions),
+            "stopped_early": bool(solution_progress and solution_progress.stopped)
+        }
+        search = {
+            "time_budget_ms": time_budget_ms,
+            # The time limit ended the search before it proved optimality or infeasibility
+            "deadline_reached": status not in (cp_model.OPTIMAL, cp_model.INFEASIBLE) and not solver_stats["stopped_early"],
+            "time_limit_seconds": time_limit,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "status": solver_stats["status"],
+            "best_bound": solver_stats["best_bound"]
+        }
+        print(f"CP-SAT finished: {solver_stats['status']} in {solver_stats['wall_time']:.2f}s "
+              f"(objective={solver_stats['objective']}, bound={solver_stats['best_bound']})")
+
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            if status == cp_model.INFEASIBLE:
+                error = "CP-SAT proved that no timetable satisfies all hard constraints. Please check constraints."
+            else:
+                error = f"CP-SAT found no feasible timetable within {self.time_limit_seconds}s. Try a longer time limit."
+            return {
+                "success": False,
+                "error": error,
+                "attempts_made": 1,
+                "solver": solver_stats,
+                "search": search,
+                "instrumentation": self._record_run("cpsat", stats, started, False)
+            }
+
+        # Read the solution back into schedule entries
+        with stats.phase("readback"):
+            self.initialize_occupancy_tracking()
+            self.schedule = []
+            for s, session in enumerate(sessions):
+                slot = next(slot for slot, var in zip(session.slots, slot_vars[s]) if solver.Value(var))
+                room = next(room for room, var in zip(session.rooms, room_vars[s]) if solver.Value(var))
+                fac = next(fac for fac, var in zip(session.faculty, faculty_vars[s]) if solver.Value(var))
+                self.place_entry(ScheduleEntry(
+                    course_code=session.course.code,
+                    course_name=session.course.name,
+                    group_id=session.group.id,
+                    faculty_id=fac.id,
+                    room_id=room.id,
+                    time_slot=slot,
+                    is_lab=session.is_lab,
+                    session_duration=session.duration
+                ))
+
+        with stats.phase("validate"):
+            validation_result = self.validate_schedule()
+        with stats.phase("score"):
+            score = self.calculate_schedule_score()
+        statistics = self.get_schedule_statistics()
+        with stats.phase("format"):
+            formatted_schedule = self.format_schedule_output()
+        stats.count("sessions_placed", len(self.schedule))
+
+        print(f"\n[SUCCESS] CP-SAT Generation Complete!")
+        print(f"Score: {score}, total sessions scheduled: {len(self.schedule)}")
+
+        return {
+            "success": True,
+            "schedule": formatted_schedule,
+            "score": score,
+            "validation": validation_result,
+            "statistics": statistics,
+            "attempts_made": 1,
+            "solver": solver_stats,
+            "search": search,
+            "instrumentation": self._record_run("cpsat", stats, started, True),
+            "message": f"CP-SAT generated timetable with score {score} ({solver_stats['status'].lower()} solution)."
+        }
@@ -1,9 +1,14 @@
-from typing import Dict, Any, List, Optional
-import pandas as pd
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator, IO
+import asyncio
+import csv
+import re
+from tempfile import SpooledTemporaryFile
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 import json
-from io import BytesIO
+from io import BytesIO, StringIO
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -13,167 +18,413 @@ from app.db.mongodb import db
 from bson import ObjectId
 import datetime
 
+# Collection -> (entry field holding the reference, fields the export reads)
+LOOKUP_FIELDS = {
+    "courses": ("course_id", {"code": 1, "name": 1, "credits": 1}),
+    "faculty": ("faculty_id", {"name": 1, "department": 1}),
+    "rooms": ("room_id", {"number": 1, "name": 1, "type": 1, "capacity": 1}),
+    "student_groups": ("group_id", {"name": 1}),
+    "programs": (None, {"name": 1, "code": 1}),
+}
+
+class ExportLookup:
+    """Per-export cache of the documents timetable entries refer to
+    
+    References are resolved in batches with one `$in` query per collection;
+    ids already loaded (or being loaded by a concurrent caller) are not queried
+    again. Ids are compared as strings, so an entry holding a string id finds
+    a document whose _id is an ObjectId and vice versa.
+    """
+    
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Optional[Dict[str, Any]]]] = {name: {} for name in LOOKUP_FIELDS}
+        self._pending: Dict[str, Dict[str, asyncio.Task]] = {name: {} for name in LOOKUP_FIELDS}
+        self.queries = 0
+    
+    async def load_for(self, timetables: Iterable[Dict[str, Any]]):
+        """Load every program, course, faculty member, room and group the timetables refer to"""
+        refs: Dict[str, List[Any]] = {name: [] for name in LOOKUP_FIELDS}
+        for timetable in timetables:
+            refs["programs"].append(timetable.get("program_id"))
+            for entry in timetable.get("entries", []):
+                for collection, (field, _) in LOOKUP_FIELDS.items():
+                    if field:
+                        refs[collection].append(entry.get(field))
+        await self.load(refs)
+    
+    async def load(self, refs: Dict[str, Iterable[Any]]):
+        """Load the referenced ids of each collection that are not cached yet"""
+        waits = set()
+        for collection, values in refs.items():
+            new: Dict[str, Any] = {}
+            for value in values:
+                key = str(value) if value is not None else None
+                if key is None or key in self._docs[collection] or key in new:
+                    continue
+                if key in self._pending[collection]:
+                    waits.add(self._pending[collection][key])
+                else:
+                    new[key] = value
+            if new:
+                task = asyncio.ensure_future(self._fetch(collection, new))
+                for key in new:
+                    self._pending[collection][key] = task
+                waits.add(task)
+        if waits:
+            await asyncio.gather(*waits)
+    
+    async def _fetch(self, collection: str, refs: Dict[str, Any]):
+        ids = set(refs.values()) | {ObjectId(key) for key in refs if ObjectId.is_valid(key)}
+        self.queries += 1
+        try:
+            docs = await db.db[collection].find(
+                {"_id": {"$in": list(ids)}}, LOOKUP_FIELDS[collection][1]
+            ).to_list(length=None)
+            found = {str(doc["_id"]): doc for doc in docs}
+            for key in refs:
+                self._docs[collection][key] = found.get(key)
+        finally:
+            for key in refs:
+                self._pending[collection].pop(key, None)
+    
+    def get(self, collection: str, value: Any) -> Optional[Dict[str, Any]]:
+        """The loaded document for a reference, or None if it does not exist"""
+        return self._docs[collection].get(str(value)) if value is not None else None
+
+# Entry fields written to CSV, with their column headers
+CSV_COLUMNS = {
+    "day": "Day",
+    "start_time": "Start Time",
+    "end_time": "End Time",
+    "course_code": "Course Code",
+    "course_name": "Course Name",
+    "course_credits": "Credits",
+    "faculty_name": "Faculty",
+    "faculty_department": "Department",
+    "room_number": "Room",
+    "room_type": "Room Type",
+    "room_capacity": "Capacity",
+    "entry_type": "Type"
+}
+
+# Timetable fields the streaming exports read, and timetables fetched per cursor batch
+STREAM_PROJECTION = {
+    "program_id": 1, "semester": 1, "academic_year": 1, "created_at": 1,
+    "validation_status": 1, "optimization_score": 1, "entries": 1
+}
+STREAM_BATCH_SIZE = 16
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+async def _batches(cursor, size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Documents of an async cursor in lists of up to `size`"""
+    batch: List[Dict[str, Any]] = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _collect(chunks: AsyncIterator[str]) -> BytesIO:
+    """The text of a streaming export as one UTF-8 buffer, for callers that need a file"""
+    buffer = BytesIO()
+    async for chunk in chunks:
+        buffer.write(chunk.encode("utf-8"))
+    buffer.seek(0)
+    return buffer
+
+# Workbook sheets, with the entry fields of their columns after day and time
+EXCEL_VIEWS = {
+    "timetable": ("Timetable", {"course_code": "Course Code", "course_name": "Course Name", "course_credits": "Credits",
+                                "faculty_name": "Faculty", "faculty_department": "Department", "room_number": "Room",
+                                "room_type": "Room Type", "room_capacity": "Capacity", "entry_type": "Type"}),
+    "group": ("Group", {"course_code": "Course Code", "course_name": "Course Name", "faculty_name": "Faculty",
+                        "room_number": "Room", "program": "Program", "entry_type": "Type"}),
+    "faculty": ("Faculty", {"course_code": "Course Code", "course_name": "Course Name", "group_name": "Group",
+                            "room_number": "Room", "program": "Program", "entry_type": "Type"}),
+    "room": ("Room", {"course_code": "Course Code", "course_name": "Course Name", "group_name": "Group",
+                      "faculty_name": "Faculty", "program": "Program", "entry_type": "Type"}),
+}
+# Resource views -> (entry field with the resource id, export field with its
+# name, entry field with the name generated entries carry)
+RESOURCE_VIEWS = {
+    "group": ("group_id", "group_name", "group"),
+    "faculty": ("faculty_id", "faculty_name", "faculty"),
+    "room": ("room_id", "room_number", "room"),
+}
+EXCEL_MAX_COLUMN_WIDTH = 50
+EXCEL_SPOOL_BYTES = 8 * 1024 * 1024  # spooled workbooks larger than this go to a temp file
+EXCEL_SHEET_TITLE_CHARS = 31
+EXCEL_ENTRY_BATCH_SIZE = 500  # unwound entries per lookup round of a resource view
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_ORDER = {day: i for i, day in enumerate(DAYS)}
+
+def _excel_styles() -> List[NamedStyle]:
+    """Named styles shared by every cell of the workbook"""
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+    return [
+        NamedStyle(name="timetable_title", font=Font(bold=True, size=14)),
+        NamedStyle(name="timetable_header", font=Font(bold=True, color="FFFFFF"), border=border,
+                   fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid")),
+        NamedStyle(name="timetable_cell", border=border),
+    ]
+
+def _program_label(program_code: Any, semester: Any) -> str:
+    return f"{program_code} Sem {semester}"
+
+def _resource_pipeline(query: Dict[str, Any], view: str) -> List[Dict[str, Any]]:
+    """Aggregation unwinding the entries of the matching timetables, sorted by
+    resource of `view`, then day and start time"""
+    id_field, _, own_name = RESOURCE_VIEWS[view]
+    day = {"$toLower": {"$substrCP": [{"$toString": {"$ifNull": ["$_slot.day", ""]}}, 0, 3]}}
+    return [
+        {"$match": query},
+        {"$project": {"program_id": 1, "semester": 1, "entry": "$entries"}},
+        {"$unwind": "$entry"},
+        # Generated entries keep their time flat, stored ones under time_slot
+        {"$addFields": {"_slot": {"$ifNull": ["$entry.time_slot", "$entry"]}}},
+        {"$addFields": {
+            # Entries without a resource id are told apart by the name they carry
+            "_sheet": {"id": {"$toString": {"$ifNull": [f"$entry.{id_field}", ""]}},
+                       "name": {"$ifNull": [f"$entry.{own_name}", ""]}},
+            "_day": {"$let": {"vars": {"i": {"$indexOfArray": [[d.lower() for d in DAYS], day]}},
+                              "in": {"$cond": [{"$lt": ["$$i", 0]}, len(DAYS), "$$i"]}}},
+            "_start": {"$toString": {"$ifNull": ["$_slot.start_time", ""]}},
+        }},
+        {"$sort": {"_sheet.id": 1, "_sheet.name": 1, "_day": 1, "_start": 1}},
+        {"$project": {"program_id": 1, "semester": 1, "entry": 1, "_sheet": 1}},
+    ]
+
+class WorkbookSheets:
+    """A multi-sheet timetable workbook, written sheet by sheet by openpyxl's write-only writer
+    
+    Each sheet is appended as soon as its rows are known, so only the sheet
+    being written is held in memory: a timetable's own sheet when the
+    timetable is read, and a group, faculty or room sheet from a cursor sorted
+    by resource, day and start time.
+    """
+    
+    def __init__(self, views: Iterable[str]):
+        self.views = [view for view in EXCEL_VIEWS if view in set(views)]
+        if not self.views:
+            raise ValueError(f"Unknown workbook views: {', '.join(views)}")
+        self._workbook = Workbook(write_only=True)
+        for style in _excel_styles():
+            self._workbook.add_named_style(style)
+        self._used: set = set()
+    
+    def add_timetable(self, timetable_data: Dict[str, Any]):
+        """Write the sheet of one assembled timetable"""
+        entries = sorted(timetable_data["entries"], key=lambda entry: (
+            DAY_ORDER.get(str(entry["day"])[:3].title(), len(DAYS)), str(entry["start_time"])))
+        created = timetable_data.get("created_at")
+        self._write("timetable", _program_label(timetable_data["program_code"], timetable_data["semester"]),
+                    f"Timetable - {timetable_data['program_name']}", [
+                        f"Program: {timetable_data['program_code']}",
+                        f"Semester: {timetable_data['semester']}",
+                        f"Academic Year: {timetable_data['academic_year']}",
+                        f"Generated: {created.strftime('%Y-%m-%d %H:%M') if hasattr(created, 'strftime') else created}",
+                    ], entries)
+    
+    def add_resource(self, view: str, name: Any, entries: List[Dict[str, Any]]):
+        """Write the sheet of one group, faculty member or room
+        
+        `entries` are already sorted by day and time, and carry the "program"
+        of their timetable.
+        """
+        label = EXCEL_VIEWS[view][0]
+        self._write(view, f"{label} {name}", f"{label}: {name}", [], entries)
+    
+    def _write(self, view: str, sheet_name: str, title: str, details: List[str], entries: List[Dict[str, Any]]):
+        """Write a sheet: title, detail lines, then a header and a row per entry"""
+        columns = EXCEL_VIEWS[view][1]
+        headers = ["Day", "Time"] + list(columns.values())
+        rows = [[entry["day"], f"{entry['start_time']} - {entry['end_time']}"] +
+                [str(entry[field]).title() if field == "entry_type" else entry[field] for field in columns]
+                for entry in entries]
+        
+        ws = self._workbook.create_sheet(title=_sheet_title(sheet_name, self._used))
+        # The sheet's rows are all known, so columns fit their longest value
+        for i, header in enumerate(headers):
+            width = max([len(header)] + [len(str(row[i])) for row in rows])
+            ws.column_dimensions[get_column_letter(i + 1)].width = min(width + 2, EXCEL_MAX_COLUMN_WIDTH)
+        ws.merged_cells.add(f"A1:{get_column_letter(len(headers))}1")
+        ws.freeze_panes = f"A{len(details) + (5 if details else 4)}"
+        ws.append([_styled(ws, title, "timetable_title")])
+        ws.append([])
+        if details:
+            for line in details:
+                ws.append([line])
+            ws.append([])
+        ws.append([_styled(ws, header, "timetable_header") for header in headers])
+        for values in rows:
+            ws.append([_styled(ws, value, "timetable_cell") for value in values])
+    
+    def save(self, target):
+        """Write the workbook to a path or binary file"""
+        if not self._used:
+            self._workbook.create_sheet(title="Timetable").append(["No timetable entries"])
+        self._workbook.save(target)
+
+def _styled(ws, value: Any, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def _sheet_title(name: str, used: set) -> str:
+    """A unique, valid Excel sheet title for `name`"""
+    title = re.sub(r"[\\/*?:\[\]]", "_", name).strip("'") or "Sheet"
+    title = title[:EXCEL_SHEET_TITLE_CHARS]
+    candidate, n = title, 1
+    while candidate.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        candidate = title[:EXCEL_SHEET_TITLE_CHARS - len(suffix)] + suffix
+    used.add(candidate.lower())
+    return candidate
+
 class TimetableExporter:
     """Export timetable data to various formats (Excel, PDF, JSON, CSV)"""
     
     def __init__(self):
         self.styles = getSampleStyleSheet()
     
-    async def export_timetable(self, timetable_id: str, format_type: str = "excel") -> BytesIO:
-        """Export timetable in specified format"""
+    async def export_timetable(self, timetable_id: str, format_type: str = "excel") -> IO[bytes]:
+        """Export timetable in specified format
+        
+        Excel, JSON and CSV are produced by the same writers the streaming
+        endpoints use; only PDF assembles the timetable separately.
+        """
         try:
-            # Get timetable data
-            timetable = await self._get_timetable_data(timetable_id)
-            
-            if format_type.lower() == "excel":
-                return await self._export_to_excel(timetable)
-            elif format_type.lower() == "pdf":
-                return await self._export_to_pdf(timetable)
-            elif format_type.lower() == "json":
-                return await self._export_to_json(timetable)
-            elif format_type.lower() == "csv":
-                return await self._export_to_csv(timetable)
+            format_type = format_type.lower()
+            if format_type == "pdf":
+                return await self._export_to_pdf(await self._get_timetable_data(timetable_id))
+            
+            await self._require_timetables([timetable_id])
+            query = {"_id": ObjectId(timetable_id)}
+            if format_type == "excel":
+                return await self.export_workbook(query)
+            elif format_type == "json":
+                return await _collect(self.stream_json(query, single=True))
+            elif format_type == "csv":
+                return await _collect(self.stream_csv(query))
             else:
                 raise ValueError(f"Unsupported format: {format_type}")
                 
         except Exception as e:
             raise Exception(f"Export failed: {str(e)}")
     
-    async def _get_timetable_data(self, timetable_id: str) -> Dict[str, Any]:
-        """Get comprehensive timetable data with related documents"""
+    async def _require_timetables(self, timetable_ids: List[str]):
+        """Raise ValueError unless every timetable in `timetable_ids` exists"""
+        found = await db.db.timetables.find(
+            {"_id": {"$in": [ObjectId(timetable_id) for timetable_id in timetable_ids]}}, {"_id": 1}
+        ).to_list(length=None)
+        found_ids = {str(timetable["_id"]) for timetable in found}
+        missing = [timetable_id for timetable_id in timetable_ids if timetable_id not in found_ids]
+        if missing:
+            raise ValueError(f"Timetable not found: {', '.join(missing)}")
+    
+    async def _get_timetable_data(self, timetable_id: str, lookup: "ExportLookup" = None,
+                                  timetable: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Get comprehensive timetable data with related documents
+        
+        Referenced courses, faculty, rooms and the program are resolved through
+        `lookup` (one query per collection for ids it has not seen yet); pass
+        the same lookup, and the already fetched `timetable`, when assembling
+        several timetables of one export.
+        """
         try:
+            lookup = lookup or ExportLookup()
             # Get timetable
-            timetable = await db.db.timetables.find_one({"_id": ObjectId(timetable_id)})
+            if timetable is None:
+                timetable = await db.db.timetables.find_one({"_id": ObjectId(timetable_id)})
             if not timetable:
                 raise ValueError("Timetable not found")
             
-            # Get program data
-            program = await db.db.programs.find_one({"_id": timetable["program_id"]})
-            
-            # Get courses, faculty, and rooms for all entries
-            entries_with_details = []
-            for entry in timetable.get("entries", []):
-                # Get course
-                course = await db.db.courses.find_one({"_id": entry["course_id"]})
-                # Get faculty
-                faculty = await db.db.faculty.find_one({"_id": entry["faculty_id"]})
-                # Get room
-                room = await db.db.rooms.find_one({"_id": entry["room_id"]})
-                
-                entry_detail = {
-                    "course_code": course.get("code", "N/A") if course else "N/A",
-                    "course_name": course.get("name", "N/A") if course else "N/A",
-                    "course_credits": course.get("credits", 0) if course else 0,
-                    "faculty_name": faculty.get("name", "N/A") if faculty else "N/A",
-                    "faculty_department": faculty.get("department", "N/A") if faculty else "N/A",
-                    "room_number": room.get("number", "N/A") if room else "N/A",
-                    "room_type": room.get("type", "N/A") if room else "N/A",
-                    "room_capacity": room.get("capacity", 0) if room else 0,
-                    "day": entry["time_slot"]["day"],
-                    "start_time": entry["time_slot"]["start_time"],
-                    "end_time": entry["time_slot"]["end_time"],
-                    "duration": entry["time_slot"]["duration_minutes"],
-                    "entry_type": entry.get("entry_type", "lecture")
-                }
-                entries_with_details.append(entry_detail)
-            
-            return {
-                "timetable_id": str(timetable["_id"]),
-                "program_name": program.get("name", "N/A") if program else "N/A",
-                "program_code": program.get("code", "N/A") if program else "N/A",
-                "semester": timetable.get("semester", "N/A"),
-                "academic_year": timetable.get("academic_year", "N/A"),
-                "created_at": timetable.get("created_at", datetime.datetime.utcnow()),
-                "validation_status": timetable.get("validation_status", "pending"),
-                "optimization_score": timetable.get("optimization_score", 0),
-                "entries": entries_with_details
-            }
+            # Get program, courses, faculty and rooms for all entries at once
+            await lookup.load_for([timetable])
+            return self._assemble(timetable, lookup)
             
         except Exception as e:
             raise Exception(f"Failed to get timetable data: {str(e)}")
     
-    async def _export_to_excel(self, timetable_data: Dict[str, Any]) -> BytesIO:
-        """Export timetable to Excel format"""
+    def _assemble(self, timetable: Dict[str, Any], lookup: "ExportLookup") -> Dict[str, Any]:
+        """Timetable data with its references resolved from a loaded lookup"""
+        program = lookup.get("programs", timetable.get("program_id"))
+        return {
+            "timetable_id": str(timetable["_id"]),
+            "program_name": program.get("name", "N/A") if program else "N/A",
+            "program_code": program.get("code", "N/A") if program else "N/A",
+            "semester": timetable.get("semester", "N/A"),
+            "academic_year": timetable.get("academic_year", "N/A"),
+            "created_at": timetable.get("created_at", datetime.datetime.utcnow()),
+            "validation_status": timetable.get("validation_status", "pending"),
+            "optimization_score": timetable.get("optimization_score", 0),
+            "entries": [self._entry_detail(entry, lookup) for entry in timetable.get("entries", [])]
+        }
+    
+    def _entry_detail(self, entry: Dict[str, Any], lookup: "ExportLookup") -> Dict[str, Any]:
+        """Export row of an entry; generated entries keep their time flat and carry names of their own"""
+        course = lookup.get("courses", entry.get("course_id"))
+        faculty = lookup.get("faculty", entry.get("faculty_id"))
+        room = lookup.get("rooms", entry.get("room_id"))
+        group = lookup.get("student_groups", entry.get("group_id"))
+        time_slot = entry["time_slot"] if isinstance(entry.get("time_slot"), dict) else entry
+        return {
+            "course_code": course.get("code", "N/A") if course else entry.get("course_code", "N/A"),
+            "course_name": course.get("name", "N/A") if course else entry.get("course_name", "N/A"),
+            "course_credits": course.get("credits", 0) if course else 0,
+            "faculty_name": faculty.get("name", "N/A") if faculty else entry.get("faculty", "N/A"),
+            "faculty_department": faculty.get("department", "N/A") if faculty else "N/A",
+            "room_number": room.get("number", room.get("name", "N/A")) if room else entry.get("room", "N/A"),
+            "room_type": room.get("type", "N/A") if room else "N/A",
+            "room_capacity": room.get("capacity", 0) if room else 0,
+            "group_name": group.get("name", "N/A") if group else entry.get("group", "N/A"),
+            "group_id": str(entry.get("group_id") or ""),
+            "faculty_id": str(entry.get("faculty_id") or ""),
+            "room_id": str(entry.get("room_id") or ""),
+            "day": time_slot.get("day"),
+            "start_time": time_slot.get("start_time"),
+            "end_time": time_slot.get("end_time"),
+            "duration": time_slot.get("duration_minutes", entry.get("duration_minutes")),
+            "entry_type": entry.get("entry_type") or ("lab" if entry.get("is_lab") else "lecture")
+        }
+    
+    async def export_workbook(self, query: Dict[str, Any], views: Iterable[str] = ("timetable",)) -> IO[bytes]:
+        """Excel workbook of the matching timetables, as a file positioned at its start
+        
+        `views` picks the sheets: one per timetable, per group, per faculty
+        member and/or per room. Timetable sheets are written as the timetables
+        are read from a cursor; the sheets of each resource view come from an
+        aggregation sorted by the database. openpyxl's write-only writer sends
+        the rows straight to disk, styled through shared named styles, and the
+        workbook goes to a spooled temporary file that moves to disk once it
+        outgrows EXCEL_SPOOL_BYTES.
+        """
+        sheets = WorkbookSheets(views)
+        loop = asyncio.get_running_loop()
+        target = SpooledTemporaryFile(max_size=EXCEL_SPOOL_BYTES)
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Timetable"
-            
-            # Header styles
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # Title
-            ws.merge_cells('A1:K1')
-            ws['A1'] = f"Timetable - {timetable_data['program_name']}"
-            ws['A1'].font = Font(bold=True, size=16)
-            
-            # Metadata
-            ws['A3'] = f"Program: {timetable_data['program_code']}"
-            ws['A4'] = f"Semester: {timetable_data['semester']}"
-            ws['A5'] = f"Academic Year: {timetable_data['academic_year']}"
-            ws['A6'] = f"Generated: {timetable_data['created_at'].strftime('%Y-%m-%d %H:%M')}"
-            
-            # Headers
-            headers = [
-                "Day", "Time", "Course Code", "Course Name", "Credits",
-                "Faculty", "Department", "Room", "Room Type", "Capacity", "Type"
-            ]
-            
-            row = 8
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.border = border
-            
-            # Data rows
-            for entry in timetable_data["entries"]:
-                row += 1
-                data = [
-                    entry["day"],
-                    f"{entry['start_time']} - {entry['end_time']}",
-                    entry["course_code"],
-                    entry["course_name"],
-                    entry["course_credits"],
-                    entry["faculty_name"],
-                    entry["faculty_department"],
-                    entry["room_number"],
-                    entry["room_type"],
-                    entry["room_capacity"],
-                    entry["entry_type"].title()
-                ]
-                
-                for col, value in enumerate(data, 1):
-                    cell = ws.cell(row=row, column=col, value=value)
-                    cell.border = border
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"Excel export failed: {str(e)}")
+            # Writing sheets is CPU-bound, keep it off the event loop
+            if "timetable" in sheets.views:
+                async for timetable_data in self._stream_timetables(query):
+                    await loop.run_in_executor(None, sheets.add_timetable, timetable_data)
+            for view in sheets.views:
+                if view in RESOURCE_VIEWS:
+                    async for name, entries in self._stream_resource_sheets(query, view):
+                        await loop.run_in_executor(None, sheets.add_resource, view, name, entries)
+            await loop.run_in_executor(None, sheets.save, target)
+        except Exception:
+            target.close()
+            raise
+        target.seek(0)
+        return target
     
     async def _export_to_pdf(self, timetable_data: Dict[str, Any]) -> BytesIO:
         """Export timetable to PDF format"""
@@ -261,123 +512,107 @@ class TimetableExporter:
         except Exception as e:
             raise Exception(f"PDF export failed: {str(e)}")
     
-    async def _export_to_json(self, timetable_data: Dict[str, Any]) -> BytesIO:
-        """Export timetable to JSON format"""
-        try:
-            # Convert datetime to string for JSON serialization
-            export_data = timetable_data.copy()
-            export_data["created_at"] = export_data["created_at"].isoformat()
-            export_data["exported_at"] = datetime.datetime.utcnow().isoformat()
-            
-            json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
-            buffer = BytesIO(json_str.encode('utf-8'))
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"JSON export failed: {str(e)}")
+    async def _stream_timetables(self, query: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Timetables matching `query`, assembled one at a time from a cursor
+        
+        Only one cursor batch of timetables is held at once, and its references
+        are loaded together (one query per collection per batch); the lookup cache
+        grows with the distinct courses, faculty and rooms, not with the number
+        of timetables.
+        """
+        lookup = ExportLookup()
+        cursor = db.db.timetables.find(query, STREAM_PROJECTION).batch_size(STREAM_BATCH_SIZE)
+        async for batch in _batches(cursor, STREAM_BATCH_SIZE):
+            # One lookup round per batch, not per timetable
+            await lookup.load_for(batch)
+            for timetable in batch:
+                yield self._assemble(timetable, lookup)
     
-    async def _export_to_csv(self, timetable_data: Dict[str, Any]) -> BytesIO:
-        """Export timetable to CSV format"""
-        try:
-            # Create DataFrame
-            df = pd.DataFrame(timetable_data["entries"])
-            
-            # Reorder and rename columns
-            column_mapping = {
-                "day": "Day",
-                "start_time": "Start Time",
-                "end_time": "End Time",
-                "course_code": "Course Code",
-                "course_name": "Course Name",
-                "course_credits": "Credits",
-                "faculty_name": "Faculty",
-                "faculty_department": "Department",
-                "room_number": "Room",
-                "room_type": "Room Type",
-                "room_capacity": "Capacity",
-                "entry_type": "Type"
-            }
-            
-            df = df.rename(columns=column_mapping)
-            df = df[list(column_mapping.values())]
-            
-            # Convert to CSV
-            buffer = BytesIO()
-            df.to_csv(buffer, index=False, encoding='utf-8')
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"CSV export failed: {str(e)}")
+    async def _stream_resource_sheets(self, query: Dict[str, Any], view: str) -> AsyncIterator[tuple]:
+        """(name, entries) of every group, faculty member or room of `view` in
+        the matching timetables, with the entries sorted by day and time
+        
+        The database unwinds and sorts the entries (on disk if need be), so
+        only one resource's entries and one batch of the cursor are held at once.
+        """
+        _, name_field, _ = RESOURCE_VIEWS[view]
+        lookup = ExportLookup()
+        cursor = db.db.timetables.aggregate(_resource_pipeline(query, view), allowDiskUse=True,
+                                            batchSize=EXCEL_ENTRY_BATCH_SIZE)
+        sheet, entries = None, []
+        async for batch in _batches(cursor, EXCEL_ENTRY_BATCH_SIZE):
+            await lookup.load_for({"program_id": row.get("program_id"), "entries": [row["entry"]]} for row in batch)
+            for row in batch:
+                if row["_sheet"] != sheet and entries:
+                    yield entries[0][name_field], entries
+                    entries = []
+                sheet = row["_sheet"]
+                program = lookup.get("programs", row.get("program_id"))
+                entries.append({**self._entry_detail(row["entry"], lookup),
+                                "program": _program_label(program.get("code", "N/A") if program else "N/A",
+                                                          row.get("semester", "N/A"))})
+        if entries:
+            yield entries[0][name_field], entries
     
-    async def export_multiple_timetables(self, timetable_ids: List[str], format_type: str = "excel") -> BytesIO:
+    async def stream_csv(self, query: Dict[str, Any], per_timetable: bool = False) -> AsyncIterator[str]:
+        """Yield the entries of the matching timetables as CSV text, a timetable at a time
+        
+        With `per_timetable` every row starts with the timetable's program,
+        semester and id, for exports of several timetables.
+        """
+        text = StringIO()
+        writer = csv.writer(text)
+        
+        def flush() -> str:
+            chunk = text.getvalue()
+            text.seek(0)
+            text.truncate()
+            return chunk
+        
+        leading = ["Program", "Semester", "Timetable ID"] if per_timetable else []
+        writer.writerow(leading + list(CSV_COLUMNS.values()))
+        yield flush()
+        async for timetable_data in self._stream_timetables(query):
+            prefix = ([timetable_data["program_code"], timetable_data["semester"], timetable_data["timetable_id"]]
+                      if per_timetable else [])
+            for entry in timetable_data["entries"]:
+                writer.writerow(prefix + [entry[field] for field in CSV_COLUMNS])
+            yield flush()
+    
+    async def stream_json(self, query: Dict[str, Any], single: bool = False) -> AsyncIterator[str]:
+        """Yield the matching timetables as JSON fragments, a timetable at a time
+        
+        Several timetables are written as {"exported_at", "timetables": [...],
+        "total_timetables"}; with `single` the one timetable is written on its
+        own with an "exported_at" field.
+        """
+        exported_at = datetime.datetime.utcnow().isoformat()
+        if single:
+            async for timetable_data in self._stream_timetables(query):
+                yield json.dumps({**timetable_data, "exported_at": exported_at},
+                                 ensure_ascii=False, default=_json_default)
+                break
+            return
+        
+        yield f'{{"exported_at": {json.dumps(exported_at)}, "timetables": ['
+        total = 0
+        async for timetable_data in self._stream_timetables(query):
+            yield ("," if total else "") + json.dumps(timetable_data, ensure_ascii=False, default=_json_default)
+            total += 1
+        yield f'], "total_timetables": {total}}}'
+    
+    async def export_multiple_timetables(self, timetable_ids: List[str], format_type: str = "excel") -> IO[bytes]:
         """Export multiple timetables in a single file"""
         try:
-            if format_type.lower() == "excel":
-                return await self._export_multiple_to_excel(timetable_ids)
-            elif format_type.lower() == "json":
-                return await self._export_multiple_to_json(timetable_ids)
+            format_type = format_type.lower()
+            query = {"_id": {"$in": [ObjectId(timetable_id) for timetable_id in timetable_ids]}}
+            await self._require_timetables(timetable_ids)
+            if format_type == "excel":
+                return await self.export_workbook(query)
+            elif format_type == "json":
+                return await _collect(self.stream_json(query))
             else:
                 raise ValueError(f"Multiple export not supported for format: {format_type}")
                 
         except Exception as e:
             raise Exception(f"Multiple export failed: {str(e)}")
-    
-    async def _export_multiple_to_excel(self, timetable_ids: List[str]) -> BytesIO:
-        """Export multiple timetables to Excel with separate sheets"""
-        try:
-            wb = Workbook()
-            wb.remove(wb.active)  # Remove default sheet
-            
-            for i, timetable_id in enumerate(timetable_ids):
-                timetable_data = await self._get_timetable_data(timetable_id)
-                
-                # Create sheet
-                ws = wb.create_sheet(title=f"Timetable_{i+1}")
-                
-                # Add data (simplified version of single export)
-                ws['A1'] = f"{timetable_data['program_name']} - Sem {timetable_data['semester']}"
-                
-                headers = ["Day", "Time", "Course", "Faculty", "Room"]
-                for col, header in enumerate(headers, 1):
-                    ws.cell(row=3, column=col, value=header)
-                
-                for row, entry in enumerate(timetable_data["entries"], 4):
-                    ws.cell(row=row, column=1, value=entry["day"])
-                    ws.cell(row=row, column=2, value=f"{entry['start_time']}-{entry['end_time']}")
-                    ws.cell(row=row, column=3, value=f"{entry['course_code']} - {entry['course_name']}")
-                    ws.cell(row=row, column=4, value=entry["faculty_name"])
-                    ws.cell(row=row, column=5, value=entry["room_number"])
-            
-            buffer = BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"Multiple Excel export failed: {str(e)}")
-    
-    async def _export_multiple_to_json(self, timetable_ids: List[str]) -> BytesIO:
-        """Export multiple timetables to JSON format"""
-        try:
-            all_timetables = []
-            
-            for timetable_id in timetable_ids:
-                timetable_data = await self._get_timetable_data(timetable_id)
-                timetable_data["created_at"] = timetable_data["created_at"].isoformat()
-                all_timetables.append(timetable_data)
-            
-            export_data = {
-                "exported_at": datetime.datetime.utcnow().isoformat(),
-                "total_timetables": len(all_timetables),
-                "timetables": all_timetables
-            }
-            
-            json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
-            buffer = BytesIO(json_str.encode('utf-8'))
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"Multiple JSON export failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,279 @@
+# backend/app/services/timetable/fitness.py
+"""
+Vectorized fitness evaluation for the genetic timetable generator
+Schedules are encoded as parallel integer arrays (group, faculty, room, day,
+start/end minutes) so the hard and soft constraints can be scored with
+sort-and-sweep and bincount kernels instead of Python loops over entry pairs
+"""
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+
+from .advanced_generator import ScheduleEntry, SchedulingRules, t2min
+
+HEAVY_COURSES = ["OS_THEORY", "OOP_THEORY", "ML_THEORY"]
+
+# Minutes of the day fit in 11 bits, so (bucket << MINUTE_BITS) + minute keeps
+# every bucket's intervals in its own contiguous range of one sorted array
+MINUTE_BITS = 11
+
+AFTERNOON_LAB_START = t2min("13:20")
+AFTERNOON_LAB_END = t2min("16:30")
+
+@dataclass(frozen=True)
+class ScheduleArrays:
+    """Array-backed encoding of a schedule, one element per entry
+
+    The arrays are read-only so encodings can be shared between individuals;
+    ScheduleEncoder.update copies a field only when its values change.
+    """
+    group: np.ndarray
+    faculty: np.ndarray
+    room: np.ndarray
+    course: np.ndarray
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    is_lab: np.ndarray
+
+    def __post_init__(self):
+        for name in self.__dataclass_fields__:
+            getattr(self, name).setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+class ScheduleEncoder:
+    """Assigns dense integer codes to ids and encodes schedules as arrays"""
+
+    def __init__(self, rules: SchedulingRules = None):
+        self.rules = rules or SchedulingRules()
+        self.day_codes: Dict[str, int] = {day: i for i, day in enumerate(self.rules.WORKING_DAYS)}
+        self.group_codes: Dict[str, int] = {}
+        self.faculty_codes: Dict[str, int] = {}
+        self.room_codes: Dict[str, int] = {}
+        self.course_codes: Dict[str, int] = {code: i for i, code in enumerate(HEAVY_COURSES)}
+
+    @staticmethod
+    def _code(codes: Dict[str, int], key: str) -> int:
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+        return code
+
+    def encode(self, schedule: List[ScheduleEntry]) -> ScheduleArrays:
+        """Encode a list of schedule entries as integer arrays"""
+        code = self._code
+        return ScheduleArrays(
+            group=np.array([code(self.group_codes, e.group_id) for e in schedule], dtype=np.int64),
+            faculty=np.array([code(self.faculty_codes, e.faculty_id) for e in schedule], dtype=np.int64),
+            room=np.array([code(self.room_codes, e.room_id) for e in schedule], dtype=np.int64),
+            course=np.array([code(self.course_codes, e.course_code) for e in schedule], dtype=np.int64),
+            day=np.array([code(self.day_codes, e.time_slot.day) for e in schedule], dtype=np.int64),
+            start=np.array([e.time_slot.start_min for e in schedule], dtype=np.int64),
+            end=np.array([e.time_slot.end_min for e in schedule], dtype=np.int64),
+            is_lab=np.array([e.is_lab for e in schedule], dtype=bool)
+        )
+
+    def update(self, arrays: ScheduleArrays, indices: List[int],
+               entries: List[ScheduleEntry]) -> ScheduleArrays:
+        """Return arrays with the entries at `indices` re-encoded
+
+        Fields whose values did not change are shared with `arrays` rather
+        than copied.
+        """
+        changes = self.encode(entries)
+        fields = {}
+        for name in ScheduleArrays.__dataclass_fields__:
+            current, values = getattr(arrays, name), getattr(changes, name)
+            if np.array_equal(current[indices], values):
+                fields[name] = current
+            else:
+                fields[name] = current.copy()
+                fields[name][indices] = values
+        return ScheduleArrays(**fields)
+
+def count_overlapping_pairs(bucket: np.ndarray, start: np.ndarray, end: np.ndarray) -> int:
+    """Count pairs of intervals in the same bucket that overlap in time
+
+    Sorts the intervals by (bucket, start) and, for each interval, counts the
+    later-starting intervals of its bucket that begin before it ends.
+    """
+    if len(start) < 2:
+        return 0
+    base = bucket << MINUTE_BITS
+    starts = base + start
+    order = np.argsort(starts, kind="stable")
+    sorted_starts = starts[order]
+    ends = (base + end)[order]
+    began_before_end = np.searchsorted(sorted_starts, ends, side="left")
+    return int((began_before_end - np.arange(1, len(starts) + 1)).clip(min=0).sum())
+
+def count_clashes(arrays: ScheduleArrays) -> int:
+    """Count pairs of overlapping entries that share a group, faculty or room"""
+    if len(arrays) < 2:
+        return 0
+    n_days = int(arrays.day.max()) + 1
+    n_faculty = int(arrays.faculty.max()) + 1
+    n_rooms = int(arrays.room.max()) + 1
+
+    # Inclusion-exclusion over the three resources counts each clashing pair
+    # once however many resources it shares
+    def pairs(bucket: np.ndarray) -> int:
+        return count_overlapping_pairs(bucket * n_days + arrays.day, arrays.start, arrays.end)
+
+    group_faculty = arrays.group * n_faculty + arrays.faculty
+    group_room = arrays.group * n_rooms + arrays.room
+    faculty_room = arrays.faculty * n_rooms + arrays.room
+    return (pairs(arrays.group) + pairs(arrays.faculty) + pairs(arrays.room)
+            - pairs(group_faculty) - pairs(group_room) - pairs(faculty_room)
+            + pairs(group_faculty * n_rooms + arrays.room))
+
+def count_cap_violations(arrays: ScheduleArrays, rules: SchedulingRules) -> int:
+    """Count sessions and labs over the daily caps of each group"""
+    if not len(arrays):
+        return 0
+    group_day = arrays.group * (int(arrays.day.max()) + 1) + arrays.day
+    sessions_per_day = np.bincount(group_day)
+    labs_per_day = np.bincount(group_day, weights=arrays.is_lab)
+    return (int((sessions_per_day - rules.ABSOLUTE_MAX_PERIODS_PER_DAY).clip(min=0).sum())
+            + int((labs_per_day - rules.MAX_LABS_PER_DAY_PER_GROUP).clip(min=0).sum()))
+
+def count_hard_violations(arrays: ScheduleArrays, rules: SchedulingRules) -> int:
+    """Resource clashes plus daily period/lab cap overruns"""
+    return count_clashes(arrays) + count_cap_violations(arrays, rules)
+
+def soft_constraint_score(arrays: ScheduleArrays) -> int:
+    """Score soft constraints: afternoon labs, daily load, gaps and heavy course spread"""
+    score = 0
+
+    # Spread heavy courses across days (they hold the first course codes, and
+    # a course that is missing from the schedule counts as zero days)
+    n_days = int(arrays.day.max()) + 1 if len(arrays) else 1
+    heavy = arrays.course < len(HEAVY_COURSES)
+    course_days = np.unique(arrays.course[heavy] * n_days + arrays.day[heavy]) // n_days
+    days_per_course = np.bincount(course_days, minlength=len(HEAVY_COURSES))
+    score += (15 * int((days_per_course >= 3).sum())
+              + 8 * int((days_per_course == 2).sum())
+              - 10 * int((days_per_course < 2).sum()))
+
+    if not len(arrays):
+        return score
+
+    # Prefer afternoon labs
+    afternoon = (arrays.start >= AFTERNOON_LAB_START) & (arrays.start <= AFTERNOON_LAB_END)
+    score += 15 * int((arrays.is_lab & afternoon).sum()) - 5 * int((arrays.is_lab & ~afternoon).sum())
+
+    # Prefer optimal daily load (7-9 periods)
+    group_day = arrays.group * n_days + arrays.day
+    order = np.lexsort((arrays.start, group_day))
+    sorted_group_day = group_day[order]
+    daily_counts = np.bincount(sorted_group_day)
+    daily_counts = daily_counts[daily_counts > 0]
+    score += (10 * int(((daily_counts >= 7) & (daily_counts <= 9)).sum())
+              + 5 * int((daily_counts < 7).sum())
+              - 10 * int((daily_counts > 9).sum()))
+
+    # Minimize gaps between consecutive sessions of a group's day
+    same_bucket = sorted_group_day[1:] == sorted_group_day[:-1]
+    gaps = (arrays.start[order][1:] - arrays.end[order][:-1])[same_bucket]
+    score += 5 * int((gaps <= 10).sum()) - 3 * int((gaps > 60).sum())
+
+    return score
+
+def daily_load_score(sessions: int) -> int:
+    """Score one group's day by its number of sessions (7-9 preferred)"""
+    if 7 <= sessions <= 9:
+        return 10
+    return 5 if sessions < 7 else -10
+
+def course_spread_score(days: int) -> int:
+    """Score a heavy course by the number of days it is taught on"""
+    if days >= 3:
+        return 15
+    return 8 if days == 2 else -10
+
+@dataclass(frozen=True)
+class FitnessComponents:
+    """Cached parts of an individual's fitness, kept separate for delta updates"""
+    clashes: int
+    cap_violations: int
+    soft_score: int
+
+    @property
+    def violations(self) -> int:
+        return self.clashes + self.cap_violations
+
+    @property
+    def fitness(self) -> int:
+        return max(0, 1000 + self.soft_score - self.violations * 100)
+
+def evaluate(arrays: ScheduleArrays, rules: SchedulingRules) -> FitnessComponents:
+    """Score a whole schedule"""
+    return FitnessComponents(
+        clashes=count_clashes(arrays),
+        cap_violations=count_cap_violations(arrays, rules),
+        soft_score=soft_constraint_score(arrays)
+    )
+
+def _local_components(arrays: ScheduleArrays, changed: List[int], buckets: Set[Tuple[int, int]],
+                      heavy_courses: Set[int], rules: SchedulingRules) -> Tuple[int, int, int]:
+    """Fitness terms that depend on the changed entries, their group/day buckets and courses"""
+    # Clashing pairs with at least one changed entry; a pair of two changed
+    # entries is seen from both sides, so count in halves
+    is_changed = np.zeros(len(arrays), dtype=bool)
+    is_changed[changed] = True
+    half_clashes = 0
+    for k in changed:
+        clash = ((arrays.day == arrays.day[k])
+                 & (arrays.start < arrays.end[k]) & (arrays.end > arrays.start[k])
+                 & ((arrays.group == arrays.group[k]) | (arrays.faculty == arrays.faculty[k])
+                    | (arrays.room == arrays.room[k])))
+        clash[k] = False
+        half_clashes += 2 * int((clash & ~is_changed).sum()) + int((clash & is_changed).sum())
+
+    cap_violations = 0
+    soft_score = 0
+    for group, day in buckets:
+        members = np.flatnonzero((arrays.group == group) & (arrays.day == day))
+        if not len(members):
+            continue
+        labs = int(arrays.is_lab[members].sum())
+        cap_violations += (max(0, len(members) - rules.ABSOLUTE_MAX_PERIODS_PER_DAY)
+                           + max(0, labs - rules.MAX_LABS_PER_DAY_PER_GROUP))
+        soft_score += daily_load_score(len(members))
+        ordered = members[np.argsort(arrays.start[members], kind="stable")]
+        gaps = arrays.start[ordered][1:] - arrays.end[ordered][:-1]
+        soft_score += 5 * int((gaps <= 10).sum()) - 3 * int((gaps > 60).sum())
+
+    labs = arrays.is_lab[changed]
+    afternoon = (arrays.start[changed] >= AFTERNOON_LAB_START) & (arrays.start[changed] <= AFTERNOON_LAB_END)
+    soft_score += 15 * int((labs & afternoon).sum()) - 5 * int((labs & ~afternoon).sum())
+
+    for course in heavy_courses:
+        soft_score += course_spread_score(len(np.unique(arrays.day[arrays.course == course])))
+
+    return half_clashes // 2, cap_violations, soft_score
+
+def evaluate_delta(components: FitnessComponents, before: ScheduleArrays, after: ScheduleArrays,
+                   changed: List[int], rules: SchedulingRules) -> FitnessComponents:
+    """Update cached components after the entries at `changed` were modified
+
+    Only the clashes involving the changed entries, the group/day buckets
+    they left or joined and their heavy courses are rescored; every other
+    term of the fitness is unaffected by the change.
+    """
+    if not changed:
+        return components
+    buckets = {(int(arrays.group[i]), int(arrays.day[i])) for arrays in (before, after) for i in changed}
+    heavy_courses = {int(arrays.course[i]) for arrays in (before, after) for i in changed
+                     if arrays.course[i] < len(HEAVY_COURSES)}
+    old = _local_components(before, changed, buckets, heavy_courses, rules)
+    new = _local_components(after, changed, buckets, heavy_courses, rules)
+    return FitnessComponents(
+        clashes=components.clashes + new[0] - old[0],
+        cap_violations=components.cap_violations + new[1] - old[1],
+        soft_score=components.soft_score + new[2] - old[2]
+    )
@@ -0,0 +1,496 @@
+# backend/app/services/timetable/generation.py
+"""
+Timetable generation runs shared by the HTTP endpoints
+Builds the requested engine, loads its data, runs it off the event loop with
+an optional progress callback and stores the result on the timetable
+"""
+from __future__ import annotations
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from bson import ObjectId
+import asyncio
+import functools
+import json
+import logging
+import threading
+
+from app.core.config import settings
+from app.db.mongodb import db
+from .advanced_generator import AdvancedTimetableGenerator, ProgressCallback, load_published_bookings
+from .cpsat_generator import CPSATTimetableGenerator
+from .institution import InstitutionScheduler, ProgramProblem
+from .parallel import default_worker_count, run_in_thread, worker_count
+from .result_cache import result_cache
+from app.services.genetic_algorithm.genetic_timetable_generator import GeneticTimetableGenerator
+
+logger = logging.getLogger(__name__)
+
+GENERATION_METHODS = ("advanced", "cpsat")
+GENERATION_MODES = ("generate", "repair")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def generation_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool that runs the synchronous engines
+
+    Generation gets its own pool so long runs cannot starve the event loop's
+    default executor used by the rest of the app.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.GENERATION_WORKERS),
+                thread_name_prefix="timetable-generation"
+            )
+        return _executor
+
+def shutdown_generation_executor():
+    """Stop the generation thread pool (called on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class GenerationError(Exception):
+    """A generation run failed in a way that should be reported to the client"""
+
+    def __init__(self, detail: str, status_code: int = 500):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+def build_generator(method: str, opts: Dict[str, Any]):
+    """Create the engine for `method` and the keyword arguments for its generate_timetable"""
+    time_budget_ms = int(opts["time_budget_ms"]) if opts.get("time_budget_ms") else None
+    if method == "cpsat":
+        # Use the OR-Tools CP-SAT model with a bounded multi-worker search
+        generator = CPSATTimetableGenerator(
+            time_limit_seconds=float(opts.get("time_limit_seconds", 30)),
+            num_workers=int(opts.get("num_workers", 8))
+        )
+        return generator, {"time_budget_ms": time_budget_ms}
+    if method == "advanced":
+        # Use AdvancedTimetableGenerator, with its attempts spread over a process pool
+        attempts = int(opts.get("attempts", 15))
+        return AdvancedTimetableGenerator(), {
+            "attempts": attempts,
+            "workers": worker_count(opts.get("workers"), attempts),
+            "seed": int(opts["seed"]) if opts.get("seed") is not None else None,
+            "time_budget_ms": time_budget_ms,
+            "improve_iterations": int(opts.get("improve_iterations", 1000))
+        }
+    raise GenerationError(f"Unsupported generation method: {method}", status_code=400)
+
+def check_generation_options(opts: Dict[str, Any], existing: Dict[str, Any]):
+    """Reject unsupported methods and modes before any work starts"""
+    method = opts.get("method", "advanced")
+    if method not in GENERATION_METHODS:
+        raise GenerationError(f"Unsupported generation method: {method}", status_code=400)
+    mode = opts.get("mode", "generate")
+    if mode not in GENERATION_MODES:
+        raise GenerationError(f"Unsupported generation mode: {mode}", status_code=400)
+    if mode == "repair" and not existing.get("entries"):
+        raise GenerationError("Timetable has no entries to repair, generate it first", status_code=400)
+
+def faculty_day_violations(entries: list, faculty_max_per_day: int) -> list:
+    """List faculty members that teach more periods on a day than allowed"""
+    faculty_periods_by_day = {}  # {faculty_id: {day: count}}
+    for entry in entries:
+        faculty_id = entry.get("faculty_id") or entry.get("faculty")
+        day = entry.get("day") or (entry.get("time_slot", {}).get("day") if isinstance(entry.get("time_slot"), dict) else None)
+
+        if faculty_id and day:
+            if faculty_id not in faculty_periods_by_day:
+                faculty_periods_by_day[faculty_id] = {}
+            if day not in faculty_periods_by_day[faculty_id]:
+                faculty_periods_by_day[faculty_id][day] = 0
+            faculty_periods_by_day[faculty_id][day] += 1
+
+    violations = []
+    for faculty_id, days_dict in faculty_periods_by_day.items():
+        for day, count in days_dict.items():
+            if count > faculty_max_per_day:
+                violations.append(f"Faculty {faculty_id} has {count} periods on {day} (max: {faculty_max_per_day})")
+    return violations
+
+def _stopped_early(result: Dict[str, Any]) -> bool:
+    return bool(result.get("stopped_early", result.get("solver", {}).get("stopped_early", False)))
+
+def _cacheable(result: Dict[str, Any]) -> bool:
+    """Only complete runs are cached; stopped or deadline-cut results depend on timing"""
+    return (result.get("success", False) and not _stopped_early(result) and
+            not result.get("search", {}).get("deadline_reached", False))
+
+async def generate_for_timetable(timetable_id: str, existing: Dict[str, Any], opts: Dict[str, Any],
+                                 progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Generate entries for an existing timetable document and save them on it
+
+    With `mode="repair"` the stored entries are repaired against the current
+    data instead of being regenerated from scratch.
+    """
+    check_generation_options(opts, existing)
+    method = opts.get("method", "advanced")
+    mode = opts.get("mode", "generate")
+    semester = existing.get("semester")
+    program_id = str(existing.get("program_id")) if existing.get("program_id") else None
+
+    # Get academic setup (user-provided data from frontend)
+    academic_setup = opts.get("academic_setup", {})
+    user_courses = academic_setup.get("courses", [])
+    user_faculty = academic_setup.get("faculty", [])
+    logger.info(f"🔄 Generation request - User courses count: {len(user_courses)}, Faculty count: {len(user_faculty)}")
+
+    generator, engine_kwargs = build_generator(method, opts)
+
+    # If user provided data, use it; otherwise load from database
+    if user_courses and len(user_courses) > 0:
+        logger.info(f"📥 Using user-provided data: {len(user_courses)} courses")
+    else:
+        logger.info("📥 Using database data (no user courses provided)")
+    await generator.load_from_database_with_setup(program_id, semester, academic_setup)
+    if opts.get("respect_published", True):
+        # Rooms and faculty used by the other published timetables are not free
+        await generator.reserve_published_timetables([existing.get("_id")], existing.get("academic_year"))
+
+    # Identical inputs, rules, engine parameters and seed give the cached result
+    # (a complete run does not depend on the time budget, so it is not part of the key)
+    use_cache = opts.get("use_cache", True) and mode == "generate"
+    cache_key = generator.input_fingerprint(
+        **{name: value for name, value in engine_kwargs.items() if name != "time_budget_ms"}
+    ) if use_cache else None
+    result = await result_cache.get(cache_key) if use_cache else None
+    cached = result is not None
+
+    if mode == "repair":
+        # Keep the stored entries that are still valid and re-place only the rest
+        result = await run_in_thread(
+            generation_executor(), functools.partial(
+                generator.repair_timetable, existing.get("entries", []),
+                seed=engine_kwargs.get("seed"),
+                unavailable_faculty=opts.get("unavailable_faculty", []),
+                progress=progress
+            )
+        )
+        if not result.get("success"):
+            logger.error(f"Repair failed: {result.get('error')}")
+            raise GenerationError(result.get("error", "Repair failed"), status_code=409)
+    elif not cached:
+        # Run the synchronous generation in the generation pool to avoid blocking event loop
+        result = await run_in_thread(
+            generation_executor(), functools.partial(generator.generate_timetable, program_id, semester,
+                                    progress=progress, **engine_kwargs)
+        )
+        if use_cache and _cacheable(result):
+            await result_cache.put(cache_key, result)
+    else:
+        logger.info(f"♻️ Using cached {method} result {cache_key[:12]}")
+
+    if not result.get("success"):
+        logger.error(f"{method.capitalize()} generator failed: {result.get('error')}")
+        raise GenerationError(result.get("error", "Generation failed"))
+
+    return await save_generation_result(timetable_id, existing, method, result, cached)
+
+async def save_generation_result(timetable_id: str, existing: Dict[str, Any], method: str,
+                                 result: Dict[str, Any], cached: bool = False) -> Dict[str, Any]:
+    """Store a successful engine result on the timetable and build the response"""
+    # Save generated entries into timetable document
+    entries = result.get("schedule", [])
+
+    # Validate faculty max periods per day constraint
+    faculty_max_per_day = 1  # Default to 1, can be overridden by metadata
+    if "metadata" in existing and isinstance(existing["metadata"], dict):
+        constraints = existing["metadata"].get("constraints", {})
+        faculty_max_per_day = constraints.get("faculty_max_periods_per_day", 1)
+
+    violations = faculty_day_violations(entries, faculty_max_per_day)
+    if violations:
+        logger.warning(f"⚠️ Faculty constraint violations detected: {violations}")
+        print(f"⚠️ Faculty constraint violations: {violations}")
+
+    update_doc = {
+        "entries": entries,
+        "is_draft": False,
+        "generated_at": datetime.utcnow(),
+        "generation_method": method,
+        "validation_status": "generated",
+        "optimization_score": result.get("score"),
+        "metadata": {
+            "generation_attempts": result.get("attempts_made"),
+            "statistics": result.get("statistics"),
+            "validation": result.get("validation"),
+            "constraint_violations": violations if violations else []
+        }
+    }
+    if "solver" in result:
+        update_doc["metadata"]["solver"] = result["solver"]
+    if "repair" in result:
+        update_doc["metadata"]["repair"] = result["repair"]
+    if "search" in result:
+        update_doc["metadata"]["search"] = result["search"]
+    if result.get("improvement"):
+        update_doc["metadata"]["improvement"] = result["improvement"]
+
+    await db.db.timetables.update_one({"_id": ObjectId(timetable_id)}, {"$set": update_doc})
+
+    return {
+        "message": "Timetable generated successfully",
+        "timetable_id": timetable_id,
+        "status": "generated",
+        "entries": entries,
+        "score": result.get("score"),
+        "solver": result.get("solver"),
+        "repair": result.get("repair"),
+        "search": result.get("search"),
+        "improvement": result.get("improvement"),
+        "instrumentation": result.get("instrumentation"),
+        "stopped_early": _stopped_early(result),
+        "cached": cached
+    }
+
+async def generate_for_institution(timetables: List[Dict[str, Any]], opts: Dict[str, Any],
+                                   progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Generate several timetables together over the shared rooms and faculty
+
+    Each timetable's program and semester is loaded as in generate_for_timetable
+    (`academic_setups` may hold an academic setup per timetable id), the
+    programs are scheduled jointly by department with the advanced engine and
+    every successful timetable is saved. Programs that could not be placed
+    around the others are reported and left unchanged.
+    """
+    method = opts.get("method", "advanced")
+    if method != "advanced":
+        raise GenerationError("Institution-wide generation supports only the advanced method", status_code=400)
+    if not timetables:
+        raise GenerationError("No timetables to generate", status_code=400)
+
+    program_ids = list({existing["program_id"] for existing in timetables if existing.get("program_id")})
+    programs = await db.db.programs.find(
+        {"_id": {"$in": [ObjectId(str(program_id)) for program_id in program_ids]}},
+        {"department": 1}
+    ).to_list(length=None)
+    departments = {str(program["_id"]): program.get("department") or "Unassigned" for program in programs}
+
+    # Published timetables outside the run are read once and reserved in every program
+    published = []
+    if opts.get("respect_published", True):
+        years = {existing.get("academic_year") for existing in timetables}
+        published = await load_published_bookings([existing["_id"] for existing in timetables],
+                                                  years.pop() if len(years) == 1 else None)
+
+    academic_setups = opts.get("academic_setups", {})
+    problems = []
+    engine_kwargs: Dict[str, Any] = {}
+    for existing in timetables:
+        timetable_id = str(existing["_id"])
+        program_id = str(existing.get("program_id")) if existing.get("program_id") else None
+        generator, engine_kwargs = build_generator(method, opts)
+        await generator.load_from_database_with_setup(program_id, existing.get("semester"),
+                                                      academic_setups.get(timetable_id))
+        for room_id, faculty_id, time_slot in published:
+            generator.reserve(room_id, faculty_id, time_slot)
+        problems.append(ProgramProblem(timetable_id, departments.get(program_id, "Unassigned"), generator))
+
+    joint = await run_in_thread(
+        generation_executor(), functools.partial(InstitutionScheduler(problems).schedule,
+                                                 progress=progress, **engine_kwargs)
+    )
+
+    by_id = {str(existing["_id"]): existing for existing in timetables}
+    problem_departments = {problem.key: problem.department for problem in problems}
+    responses = []
+    for timetable_id in joint["order"]:
+        result = joint["results"].get(timetable_id)
+        if result and result.get("success"):
+            response = await save_generation_result(timetable_id, by_id[timetable_id], method, result)
+            response.pop("entries")
+            response["entries_count"] = len(result.get("schedule", []))
+        else:
+            response = {
+                "timetable_id": timetable_id,
+                "status": "failed",
+                "error": result.get("error") if result else "Not scheduled, the run was stopped"
+            }
+        response["department"] = problem_departments[timetable_id]
+        responses.append(response)
+
+    return {
+        "message": f"Generated {len(joint['scheduled'])} of {len(timetables)} timetables together",
+        "success": joint["success"],
+        "timetables": responses,
+        "departments": joint["departments"],
+        "cross_program_clashes": joint["cross_program_clashes"],
+        "seed": joint["seed"],
+        "search": joint["search"]
+    }
+
+async def generate_genetic_timetable(params: Dict[str, Any], user_id: str,
+                                     progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Run the DB-driven genetic algorithm and insert the result as a new timetable
+
+    `params` holds the fields of a GeneticTimetableRequest. Rooms and faculty
+    booked by other published timetables count as conflicts unless
+    `respect_published` is false.
+    """
+    # Initialize genetic algorithm generator
+    generator = GeneticTimetableGenerator()
+    
+    # Set custom parameters if provided
+    if params["population_size"]:
+        generator.population_size = params["population_size"]
+    if params["generations"]:
+        generator.generations = params["generations"]
+    if params["mutation_rate"]:
+        generator.mutation_rate = params["mutation_rate"]
+    if params["crossover_rate"]:
+        generator.crossover_rate = params["crossover_rate"]
+    generator.islands = params.get("islands") or default_worker_count()
+    generator.migration_interval = params.get("migration_interval", generator.migration_interval)
+    generator.migrants = params.get("migrants", generator.migrants)
+    
+    # Set custom time rules if provided
+    if params.get("time_rules"):
+        generator.time_rules.update(params["time_rules"])
+
+    if params.get("respect_published", True):
+        # Rooms and faculty used by other published timetables are not free;
+        # earlier runs for this program and semester are superseded, not reserved
+        earlier = await db.db.timetables.find(
+            {"program_id": ObjectId(params["program_id"]), "semester": params["semester"]}, {"_id": 1}
+        ).to_list(length=None)
+        generator.reservations = await load_published_bookings(
+            [timetable["_id"] for timetable in earlier], params["academic_year"]
+        )
+    
+    # Generate timetable using genetic algorithm
+    result = await generator.generate_timetable(
+        program_id=params["program_id"],
+        semester=params["semester"],
+        academic_year=params["academic_year"],
+        progress=progress,
+        executor=generation_executor(),
+        seed=params.get("seed"),
+        cache=result_cache if params.get("use_cache", True) else None,
+        time_budget_ms=params.get("time_budget_ms")
+    )
+    
+    logger.info(f"Genetic algorithm result: {result.keys()}")
+    logger.info(f"Timetable entries count: {len(result.get('timetable_entries', []))}")
+    print(f"DEBUG: Genetic algorithm result keys: {result.keys()}")
+    print(f"DEBUG: Timetable entries count: {len(result.get('timetable_entries', []))}")
+    print(f"DEBUG: First few entries: {result.get('timetable_entries', [])[:2]}")
+    
+    if not result["success"]:
+        raise GenerationError("Failed to generate timetable using genetic algorithm")
+    
+    # Save the generated timetable to database
+    timetable_doc = {
+        "title": params["title"],
+        "program_id": ObjectId(params["program_id"]),
+        "semester": params["semester"],
+        "academic_year": params["academic_year"],
+        "entries": result["timetable_entries"],
+        "is_draft": False,
+        "created_by": ObjectId(user_id),
+        "created_at": datetime.utcnow(),
+        "generated_at": datetime.utcnow(),
+        "generation_method": "genetic_algorithm",
+        "validation_status": "generated",
+        "optimization_score": result["best_fitness_score"],
+        "metadata": {
+            "genetic_algorithm_stats": {
+                "generations_completed": result["generations_completed"],
+                "population_size": generator.population_size,
+                "mutation_rate": generator.mutation_rate,
+                "crossover_rate": generator.crossover_rate,
+                "fitness_history": result["fitness_history"],
+                "final_fitness_score": result["best_fitness_score"],
+                "total_classes_scheduled": result["total_classes_scheduled"],
+                "conflicts_detected": len(result["conflicts"]),
+                "data_summary": result["data_collected"],
+                "islands": result["islands"]
+            },
+            "time_slots_generated": result["time_slots_generated"],
+            "conflicts": result["conflicts"]
+        }
+    }
+    
+    # Insert timetable into database
+    insert_result = await db.db.timetables.insert_one(timetable_doc)
+    timetable_id = str(insert_result.inserted_id)
+    
+    logger.info(f"Genetic algorithm timetable generated successfully with ID: {timetable_id}")
+    
+    # Create response with entries included for frontend display
+    response_data = {
+        "success": True,
+        "message": "Timetable generated successfully using genetic algorithm",
+        "timetable_id": timetable_id,
+        "generation_stats": {
+            "generations_completed": result["generations_completed"],
+            "population_size": generator.population_size,
+            "mutation_rate": generator.mutation_rate,
+            "crossover_rate": generator.crossover_rate,
+            "total_classes_scheduled": result["total_classes_scheduled"],
+            "time_slots_generated": result["time_slots_generated"],
+            "islands": result["islands"],
+            "search": result["search"],
+            "instrumentation": result.get("instrumentation")
+        },
+        "data_summary": {
+            **result["data_collected"],
+            "total_entries": result["total_classes_scheduled"]
+        },
+        "conflicts": result["conflicts"],
+        "fitness_score": result["best_fitness_score"],
+        "entries": result["timetable_entries"],  # Include entries for frontend display
+        "cached": result.get("cached", False)
+    }
+    
+    return response_data
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def progress_event_stream(run: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """Run a generation and yield its progress as server-sent events
+
+    Emits `progress` events while the engine runs, then one `result` event
+    with the final response (or an `error` event). If the client disconnects
+    the engine is asked to stop, and the run still finishes in the background
+    with the best result found so far.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def on_progress(event: Dict[str, Any]) -> bool:
+        # Called from the engine's thread
+        loop.call_soon_threadsafe(queue.put_nowait, ("progress", event))
+        return stop.is_set()
+
+    async def execute():
+        try:
+            await queue.put(("result", await run(on_progress)))
+        except GenerationError as e:
+            await queue.put(("error", {"detail": e.detail, "status_code": e.status_code}))
+        except Exception as e:
+            logger.exception("Error during streamed timetable generation")
+            await queue.put(("error", {"detail": f"Internal server error: {str(e)}", "status_code": 500}))
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(execute())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield _sse(*item)
+    finally:
+        if not task.done():
+            stop.set()
@@ -286,6 +286,12 @@ class TimetableGenerator:
 
         faculty_raw = await db.db.faculty.find({}).to_list(length=None)
 
+        return self._prepare(program, courses_raw, groups_raw, rooms_raw, constraints_raw, faculty_raw)
+
+    def _prepare(self, program: Dict[str, Any], courses_raw: List[Dict[str, Any]], groups_raw: List[Dict[str, Any]],
+                 rooms_raw: List[Dict[str, Any]], constraints_raw: List[Dict[str, Any]],
+                 faculty_raw: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Turn the loaded documents into the specs and indexes the rules-based scheduler uses"""
         courses = [CourseSpec.from_doc(c) for c in courses_raw]
         rooms = [RoomSpec.from_doc(r) for r in rooms_raw]
         groups = [GroupSpec.from_doc(g) for g in groups_raw]
@@ -408,9 +414,8 @@ class TimetableGenerator:
                 "message": "Failed to generate timetable"
             }
     
-    async def _generate_advanced_timetable(self, program_id: str, semester: int, academic_year: str, created_by: str) -> Dict[str, Any]:
-        """Advanced constraint-based generation (fallback method)."""
-        data = await self._load(program_id, semester)
+    def _schedule_rules(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Place labs and then theory sessions with the rules_v1 greedy passes (no database access)"""
         rules: Rules = data["rules"]
 
         # occupancy calendars
@@ -564,6 +569,15 @@ class TimetableGenerator:
                         print(f"   Days tried: {rules.days}")
                         raise Exception(f"Unable to place session for course {c.code} for group {g.name}")
 
+        return entries
+
+    async def _generate_advanced_timetable(self, program_id: str, semester: int, academic_year: str, created_by: str) -> Dict[str, Any]:
+        """Advanced constraint-based generation (fallback method)."""
+        data = await self._load(program_id, semester)
+        rules: Rules = data["rules"]
+
+        entries = self._schedule_rules(data)
+
         timetable_doc = {
             "title": f"AI Timetable S{semester}",
             "program_id": ObjectId(program_id),
@@ -1,149 +1,95 @@
 from __future__ import annotations
 from typing import Dict, List, Any, Optional, Tuple, Set
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 import random
 import math
-from copy import deepcopy
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import time
 
 # Import from the existing advanced generator
 from .advanced_generator import (
     AdvancedTimetableGenerator, TimeSlot, CourseRequirement, 
-    StudentGroup, Room, Faculty, ScheduleEntry, SchedulingRules,
+    StudentGroup, Room, Faculty, ScheduleEntry, SchedulingRules, ProgressCallback,
     t2min, min2t, DAY_NAMES
 )
+from .instrumentation import GenerationStats, metrics
+from .parallel import get_process_pool, discard_process_pool, worker_count
+from .fitness import ScheduleArrays, ScheduleEncoder, FitnessComponents, evaluate, evaluate_delta
+
+DEFAULT_ENCODER = ScheduleEncoder()
 
 @dataclass
 class Individual:
-    """Represents a single timetable solution in the genetic algorithm"""
-    schedule: List[ScheduleEntry]
+    """Represents a single timetable solution in the genetic algorithm
+    
+    Individuals are immutable: the schedule is a tuple of frozen entries and
+    the encoded arrays are read-only, so offspring share every gene they did
+    not change with their parents instead of copying it.
+    """
+    schedule: Tuple[ScheduleEntry, ...]
     fitness: float = 0.0
     constraint_violations: int = 0
+    encoder: ScheduleEncoder = field(default=DEFAULT_ENCODER, repr=False, compare=False)
+    arrays: Optional[ScheduleArrays] = field(default=None, repr=False, compare=False)
+    components: Optional[FitnessComponents] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
-        """Calculate fitness after initialization"""
-        if not hasattr(self, '_fitness_calculated'):
+        """Calculate fitness after initialization unless it was carried over"""
+        self.schedule = tuple(self.schedule)
+        if self.components is None:
             self.calculate_fitness()
-            self._fitness_calculated = True
+        else:
+            self._set_components(self.components)
     
     def calculate_fitness(self):
         """Calculate fitness score for this individual"""
-        # Start with base score
-        score = 1000
-        violations = 0
-        
-        # Hard constraint violations (heavily penalized)
-        violations += self._check_hard_constraints()
-        
-        # Soft constraint scoring
-        score += self._calculate_soft_constraint_score()
-        
-        # Apply penalty for constraint violations
-        score -= violations * 100
-        
-        self.fitness = max(0, score)  # Ensure non-negative fitness
-        self.constraint_violations = violations
+        self.arrays = self.encoder.encode(self.schedule)
+        self._set_components(evaluate(self.arrays, self.encoder.rules))
     
-    def _check_hard_constraints(self) -> int:
-        """Check hard constraints and return violation count"""
-        violations = 0
-        
-        # Check for overlapping sessions
-        for i, entry1 in enumerate(self.schedule):
-            for j, entry2 in enumerate(self.schedule[i+1:], i+1):
-                # Same group, faculty, or room at same time
-                if entry1.time_slot.overlaps(entry2.time_slot):
-                    if (entry1.group_id == entry2.group_id or 
-                        entry1.faculty_id == entry2.faculty_id or 
-                        entry1.room_id == entry2.room_id):
-                        violations += 1
-        
-        # Check daily constraints
-        daily_sessions = {}
-        for entry in self.schedule:
-            key = (entry.group_id, entry.time_slot.day)
-            if key not in daily_sessions:
-                daily_sessions[key] = []
-            daily_sessions[key].append(entry)
-        
-        for (group_id, day), sessions in daily_sessions.items():
-            # Max periods per day
-            if len(sessions) > SchedulingRules.ABSOLUTE_MAX_PERIODS_PER_DAY:
-                violations += len(sessions) - SchedulingRules.ABSOLUTE_MAX_PERIODS_PER_DAY
-            
-            # Max labs per day
-            lab_count = sum(1 for s in sessions if s.is_lab)
-            if lab_count > SchedulingRules.MAX_LABS_PER_DAY_PER_GROUP:
-                violations += lab_count - SchedulingRules.MAX_LABS_PER_DAY_PER_GROUP
-        
-        return violations
+    def with_changes(self, changes: Dict[int, ScheduleEntry]) -> "Individual":
+        """Return a new individual with the entries at the given indices replaced
+        
+        Only the changed entries are re-encoded and rescored; everything else
+        is shared with this individual.
+        """
+        if not changes:
+            return self
+        changed = sorted(changes)
+        schedule = list(self.schedule)
+        for index, entry in changes.items():
+            schedule[index] = entry
+        arrays = self.encoder.update(self.arrays, changed, [changes[i] for i in changed])
+        return Individual(
+            schedule=tuple(schedule),
+            encoder=self.encoder,
+            arrays=arrays,
+            components=evaluate_delta(self.components, self.arrays, arrays, changed, self.encoder.rules)
+        )
     
-    def _calculate_soft_constraint_score(self) -> int:
-        """Calculate score based on soft constraints"""
-        score = 0
-        
-        # Group sessions by day and group
-        daily_sessions = {}
-        for entry in self.schedule:
-            key = (entry.group_id, entry.time_slot.day)
-            if key not in daily_sessions:
-                daily_sessions[key] = []
-            daily_sessions[key].append(entry)
-        
-        # Prefer afternoon labs
-        for entry in self.schedule:
-            if entry.is_lab:
-                if t2min("13:20") <= entry.time_slot.start_min <= t2min("16:30"):
-                    score += 15
-                else:
-                    score -= 5
-        
-        # Prefer optimal daily load (7-9 periods)
-        for sessions in daily_sessions.values():
-            daily_count = len(sessions)
-            if 7 <= daily_count <= 9:
-                score += 10
-            elif daily_count < 7:
-                score += 5
-            else:
-                score -= 10
-        
-        # Minimize gaps between sessions
-        for sessions in daily_sessions.values():
-            if len(sessions) > 1:
-                sorted_sessions = sorted(sessions, key=lambda x: x.time_slot.start_min)
-                for i in range(len(sorted_sessions) - 1):
-                    gap = sorted_sessions[i+1].time_slot.start_min - sorted_sessions[i].time_slot.end_min
-                    if gap <= 10:  # Consecutive
-                        score += 5
-                    elif gap > 60:  # Large gap
-                        score -= 3
-        
-        # Spread heavy courses across days
-        heavy_courses = ["OS_THEORY", "OOP_THEORY", "ML_THEORY"]
-        for course in heavy_courses:
-            course_days = set()
-            for entry in self.schedule:
-                if entry.course_code == course:
-                    course_days.add(entry.time_slot.day)
-            
-            if len(course_days) >= 3:
-                score += 15
-            elif len(course_days) == 2:
-                score += 8
-            else:
-                score -= 10
-        
-        return score
+    def _set_components(self, components: FitnessComponents):
+        # Base score of 1000 plus soft constraints, minus 100 per hard
+        # constraint violation, floored at zero
+        self.components = components
+        self.fitness = components.fitness
+        self.constraint_violations = components.violations
+
+@dataclass(frozen=True)
+class GeneticProblem:
+    """Read-only problem definition that is pickled to worker processes"""
+    courses: Tuple[CourseRequirement, ...]
+    groups: Tuple[StudentGroup, ...]
+    rooms: Tuple[Room, ...]
+    faculty: Tuple[Faculty, ...]
+    rules: SchedulingRules
 
 class GeneticTimetableGenerator(AdvancedTimetableGenerator):
     """Enhanced timetable generator using genetic algorithm"""
     
     def __init__(self, population_size: int = 50, generations: int = 100, 
                  mutation_rate: float = 0.1, crossover_rate: float = 0.8,
-                 elite_size: int = 5, tournament_size: int = 5):
-        super().__init__()
+                 elite_size: int = 5, tournament_size: int = 5, workers: Optional[int] = None,
+                 rules: SchedulingRules = None):
+        super().__init__(rules)
         
         # Genetic algorithm parameters
         self.population_size = population_size
@@ -152,6 +98,10 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
         self.crossover_rate = crossover_rate
         self.elite_size = elite_size
         self.tournament_size = tournament_size
+        self.workers = workers  # processes used to seed the population (None = all cores)
+        
+        # Integer encoding shared by every individual's fitness evaluation
+        self.encoder = ScheduleEncoder(self.rules)
         
         # Evolution tracking
         self.generation_stats = []
@@ -163,15 +113,40 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
         self._double_period_slots = None
     
     def _get_available_slots(self):
-        """Cache available slots for efficiency"""
+        """Take the slot lists from the rules' shared time grid"""
         if self._theory_slots is None:
-            rules = SchedulingRules()
-            self._theory_slots = rules.get_theory_slots()
-            self._lab_slots = rules.get_lab_slots()
-            self._double_period_slots = rules.get_double_period_slots()
+            grid = self.rules.time_grid()
+            self._theory_slots = grid.theory
+            self._lab_slots = grid.lab
+            self._double_period_slots = grid.double
+    
+    def problem(self) -> GeneticProblem:
+        """Snapshot the loaded courses, groups, rooms, faculty and rules"""
+        return GeneticProblem(
+            courses=tuple(self.courses),
+            groups=tuple(self.groups),
+            rooms=tuple(self.rooms),
+            faculty=tuple(self.faculty),
+            rules=self.rules
+        )
+    
+    @classmethod
+    def from_problem(cls, problem: GeneticProblem, **kwargs) -> "GeneticTimetableGenerator":
+        """Create a generator with its own occupancy state for a problem"""
+        generator = cls(rules=problem.rules, **kwargs)
+        generator.courses = list(problem.courses)
+        generator.groups = list(problem.groups)
+        generator.rooms = list(problem.rooms)
+        generator.faculty = list(problem.faculty)
+        generator.initialize_occupancy_tracking()
+        return generator
     
     def create_random_individual(self) -> Individual:
         """Create a random valid individual"""
+        return Individual(schedule=self.create_random_schedule(), encoder=self.encoder)
+    
+    def create_random_schedule(self) -> List[ScheduleEntry]:
+        """Greedily place all required sessions in random order and slots"""
         self._get_available_slots()
         
         # Reset state
@@ -205,13 +180,13 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
             if len(session_info) == 3:  # Lab session
                 course, group, is_lab = session_info
                 duration = course.lab_duration
-                available_slots = self._lab_slots.copy()
+                available_slots = list(self._lab_slots)
             else:  # Theory session
                 course, group, is_lab, duration = session_info
                 if duration == 100:  # Double period
-                    available_slots = self._double_period_slots.copy()
+                    available_slots = list(self._double_period_slots)
                 else:
-                    available_slots = self._theory_slots.copy()
+                    available_slots = list(self._theory_slots)
             
             # Shuffle slots for randomness
             random.shuffle(available_slots)
@@ -259,28 +234,46 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
             # If we couldn't schedule this session, continue with others
             # The fitness function will penalize incomplete schedules
         
-        return Individual(schedule=schedule)
+        return schedule
+    
+    def create_random_schedules(self, count: int) -> List[List[ScheduleEntry]]:
+        """Create several random schedules one after another"""
+        schedules = []
+        for _ in range(count):
+            try:
+                schedules.append(self.create_random_schedule())
+            except Exception as e:
+                print(f"Error creating individual: {e}")
+                # Use an empty schedule as a fallback individual
+                schedules.append([])
+        return schedules
     
     def create_initial_population(self) -> List[Individual]:
         """Create initial population of random individuals"""
         print(f"Creating initial population of {self.population_size} individuals...")
-        population = []
-        
-        # Use threading for faster population creation
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(self.create_random_individual) 
-                      for _ in range(self.population_size)]
-            
-            for future in as_completed(futures):
-                try:
-                    individual = future.result()
-                    population.append(individual)
-                except Exception as e:
-                    print(f"Error creating individual: {e}")
-                    # Create a simple fallback individual
-                    population.append(Individual(schedule=[]))
-        
-        return population
+        workers = worker_count(self.workers, self.population_size)
+        schedules = None
+        
+        if workers > 1:
+            # Each worker builds its share of the population on its own
+            # generator, so occupancy state is never shared between individuals
+            problem = self.problem()
+            seed = random.randrange(2**32)
+            shares = [len(range(i, self.population_size, workers)) for i in range(workers)]
+            pool = get_process_pool()
+            try:
+                futures = [pool.submit(_create_schedules_in_worker, problem, share, seed + i)
+                           for i, share in enumerate(shares)]
+                schedules = [schedule for future in futures for schedule in future.result()]
+            except BrokenProcessPool as e:
+                print(f"[WARNING] Process pool failed ({e}), creating population in-process")
+                discard_process_pool(pool)
+        
+        if schedules is None:
+            schedules = self.create_random_schedules(self.population_size)
+        
+        # Fitness is evaluated here so every individual uses this generator's encoder
+        return [Individual(schedule=schedule, encoder=self.encoder) for schedule in schedules]
     
     def tournament_selection(self, population: List[Individual]) -> Individual:
         """Select individual using tournament selection"""
@@ -290,7 +283,8 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
     def crossover(self, parent1: Individual, parent2: Individual) -> Tuple[Individual, Individual]:
         """Create offspring using order crossover"""
         if random.random() > self.crossover_rate:
-            return deepcopy(parent1), deepcopy(parent2)
+            # Individuals are immutable, so the parents can be passed on as-is
+            return parent1, parent2
         
         # Combine schedules from both parents
         all_sessions = parent1.schedule + parent2.schedule
@@ -305,12 +299,13 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
                 seen.add(key)
                 unique_sessions.append(session)
         
+        self.stats.count("crossovers")
         # Split into two offspring
         mid = len(unique_sessions) // 2
         random.shuffle(unique_sessions)
         
-        offspring1 = Individual(schedule=unique_sessions[:mid])
-        offspring2 = Individual(schedule=unique_sessions[mid:])
+        offspring1 = Individual(schedule=unique_sessions[:mid], encoder=self.encoder)
+        offspring2 = Individual(schedule=unique_sessions[mid:], encoder=self.encoder)
         
         return offspring1, offspring2
     
@@ -319,18 +314,18 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
         if random.random() > self.mutation_rate:
             return individual
         
-        mutated = deepcopy(individual)
-        
-        if not mutated.schedule:
-            return mutated
+        if not individual.schedule:
+            return individual
         
         # Choose mutation type
         mutation_type = random.choice(['time_change', 'resource_change', 'swap_sessions'])
+        self.stats.count(f"mutations_{mutation_type}")
+        changes = {}
         
-        if mutation_type == 'time_change' and mutated.schedule:
+        if mutation_type == 'time_change':
             # Change time slot of a random session
-            session_idx = random.randint(0, len(mutated.schedule) - 1)
-            session = mutated.schedule[session_idx]
+            session_idx = random.randint(0, len(individual.schedule) - 1)
+            session = individual.schedule[session_idx]
             
             # Get appropriate slots
             if session.is_lab:
@@ -348,30 +343,27 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
                     end_min=new_slot.start_min + session.session_duration
                 )
             
-            mutated.schedule[session_idx].time_slot = new_slot
+            changes[session_idx] = replace(session, time_slot=new_slot)
         
-        elif mutation_type == 'resource_change' and mutated.schedule:
+        elif mutation_type == 'resource_change':
             # Change faculty or room of a random session
-            session_idx = random.randint(0, len(mutated.schedule) - 1)
-            session = mutated.schedule[session_idx]
+            session_idx = random.randint(0, len(individual.schedule) - 1)
+            session = individual.schedule[session_idx]
             
             # Try to change faculty
             new_faculty = self.find_suitable_faculty(session.course_code)
             if new_faculty and new_faculty != session.faculty_id:
-                mutated.schedule[session_idx].faculty_id = new_faculty
+                changes[session_idx] = replace(session, faculty_id=new_faculty)
         
-        elif mutation_type == 'swap_sessions' and len(mutated.schedule) >= 2:
+        elif mutation_type == 'swap_sessions' and len(individual.schedule) >= 2:
             # Swap time slots of two random sessions
-            idx1, idx2 = random.sample(range(len(mutated.schedule)), 2)
-            session1, session2 = mutated.schedule[idx1], mutated.schedule[idx2]
-            
-            # Swap time slots
-            mutated.schedule[idx1].time_slot, mutated.schedule[idx2].time_slot = \
-                session2.time_slot, session1.time_slot
+            idx1, idx2 = random.sample(range(len(individual.schedule)), 2)
+            session1, session2 = individual.schedule[idx1], individual.schedule[idx2]
+            changes[idx1] = replace(session1, time_slot=session2.time_slot)
+            changes[idx2] = replace(session2, time_slot=session1.time_slot)
         
-        # Recalculate fitness
-        mutated.calculate_fitness()
-        return mutated
+        # Offspring shares the untouched genes and only rescores what changed
+        return individual.with_changes(changes)
     
     def evolve_population(self, population: List[Individual]) -> List[Individual]:
         """Evolve population for one generation"""
@@ -399,23 +391,39 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
         # Trim to exact population size
         return new_population[:self.population_size]
     
-    def generate_timetable_genetic(self) -> Dict[str, Any]:
-        """Generate timetable using genetic algorithm"""
+    def generate_timetable_genetic(self, progress: Optional[ProgressCallback] = None,
+                                   time_budget_ms: int = None) -> Dict[str, Any]:
+        """Generate timetable using genetic algorithm
+        
+        `progress` is called after every generation and may stop the run early.
+        With `time_budget_ms` evolution stops after the generation that runs
+        past the budget and the best individual so far is returned.
+        """
         print("[INFO] Starting Genetic Algorithm Timetable Generation...")
         start_time = time.time()
-        
-        # Setup
-        self.setup_cse_ai_ml_courses()
-        self.setup_groups_and_resources()
+        deadline = start_time + time_budget_ms / 1000 if time_budget_ms else None
+        deadline_reached = False
+        stats = self.stats = GenerationStats()
+        
+        # Setup (fall back to the hardcoded program if nothing was loaded)
+        if not self.courses or not self.groups or not self.rooms or not self.faculty:
+            self.setup_cse_ai_ml_courses()
+            self.setup_groups_and_resources()
         self._get_available_slots()
         
         # Create initial population
-        population = self.create_initial_population()
+        with stats.phase("initial_population"):
+            population = self.create_initial_population()
+        stats.count("individuals", len(population))
+        stopped_early = False
         
         # Evolution loop
         for generation in range(self.generations):
             # Evolve
-            population = self.evolve_population(population)
+            with stats.phase("evolution"):
+                population = self.evolve_population(population)
+            stats.count("generations")
+            stats.count("individuals", len(population) - self.elite_size)
             
             # Track statistics
             best_fitness = max(ind.fitness for ind in population)
@@ -432,23 +440,50 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
             # Update best individual
             current_best = max(population, key=lambda x: x.fitness)
             if self.best_individual is None or current_best.fitness > self.best_individual.fitness:
-                self.best_individual = deepcopy(current_best)
+                self.best_individual = current_best
             
             # Progress reporting
             if generation % 10 == 0 or generation == self.generations - 1:
                 print(f"Generation {generation}: Best Fitness = {best_fitness:.2f}, "
                       f"Avg Fitness = {avg_fitness:.2f}, Violations = {best_violations}")
             
+            if progress and progress({
+                "engine": "genetic",
+                "generation": generation + 1,
+                "total": self.generations,
+                "best_fitness": best_fitness,
+                "avg_fitness": avg_fitness,
+                "violations": best_violations,
+                "elapsed": round(time.time() - start_time, 3)
+            }):
+                print(f"Stopped on request at generation {generation}")
+                stopped_early = True
+                break
+            
             # Early stopping if perfect solution found
             if best_violations == 0 and best_fitness > 1500:
                 print(f"Perfect solution found at generation {generation}!")
                 break
+            
+            if deadline is not None and time.time() >= deadline and generation < self.generations - 1:
+                print(f"Time budget of {time_budget_ms}ms used up at generation {generation}")
+                deadline_reached = True
+                break
         
         end_time = time.time()
+        success = bool(self.best_individual and self.best_individual.schedule)
+        metrics.record_run("genetic", stats, end_time - start_time, success)
+        search = {
+            "time_budget_ms": time_budget_ms,
+            "deadline_reached": deadline_reached,
+            "elapsed_ms": round((end_time - start_time) * 1000),
+            "completed": len(self.generation_stats),
+            "planned": self.generations
+        }
         
         # Prepare results
-        if self.best_individual and self.best_individual.schedule:
-            self.schedule = self.best_individual.schedule
+        if success:
+            self.schedule = list(self.best_individual.schedule)
             formatted_schedule = self.format_schedule_output()
             validation_result = self.validate_schedule()
             statistics = self.get_schedule_statistics()
@@ -468,6 +503,9 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
                 "statistics": statistics,
                 "generation_stats": self.generation_stats,
                 "generations_run": len(self.generation_stats),
+                "stopped_early": stopped_early,
+                "search": search,
+                "instrumentation": stats.as_dict(),
                 "time_taken": end_time - start_time,
                 "message": f"Genetic algorithm generated timetable with fitness {self.best_individual.fitness:.2f}"
             }
@@ -476,9 +514,19 @@ class GeneticTimetableGenerator(AdvancedTimetableGenerator):
                 "success": False,
                 "error": "Genetic algorithm failed to generate a valid timetable",
                 "generation_stats": self.generation_stats,
+                "search": search,
+                "instrumentation": stats.as_dict(),
                 "time_taken": end_time - start_time
             }
     
-    def generate_timetable(self) -> Dict[str, Any]:
+    def generate_timetable(self, program_id: str = None, semester: int = None,
+                           progress: Optional[ProgressCallback] = None,
+                           time_budget_ms: int = None) -> Dict[str, Any]:
         """Override the main generation method to use genetic algorithm"""
-        return self.generate_timetable_genetic()
\ No newline at end of file
+        return self.generate_timetable_genetic(progress, time_budget_ms)
+
+def _create_schedules_in_worker(problem: GeneticProblem, count: int, seed: int) -> List[List[ScheduleEntry]]:
+    """Process-pool entry point: build random schedules on a worker-local generator"""
+    random.seed(seed)
+    generator = GeneticTimetableGenerator.from_problem(problem)
+    return generator.create_random_schedules(count)
@@ -0,0 +1,158 @@
+# backend/app/services/timetable/institution.py
+"""
+Institution-wide scheduling of several programs over shared rooms and faculty
+The run is decomposed by department: departments are taken largest first and
+their programs one at a time with the advanced generator, and the room and
+faculty bookings of every finished program are reserved for the programs
+after it, so the joint result has no clashes between programs
+"""
+from __future__ import annotations
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass
+import random
+import time
+
+from .advanced_generator import AdvancedTimetableGenerator, ScheduleEntry, ProgressCallback
+
+@dataclass
+class ProgramProblem:
+    """One program and semester of an institution-wide run, with its data loaded"""
+    key: str                # caller's id for the run, e.g. the timetable id
+    department: str
+    generator: AdvancedTimetableGenerator
+
+    def demand(self) -> int:
+        """Minutes of sessions the program needs per week (labs once per subgroup)"""
+        subgroups = max(1, sum(1 for group in self.generator.groups if group.is_subgroup))
+        return sum(sum(course.get_session_structure()) * (subgroups if course.is_lab else 1)
+                   for course in self.generator.courses)
+
+def find_cross_program_clashes(schedules: Dict[str, List[ScheduleEntry]]) -> List[Dict[str, Any]]:
+    """Overlapping bookings of one room or faculty member by different programs"""
+    buckets: Dict[Tuple[str, str, str], List[Tuple[int, int, str]]] = {}
+    for key, entries in schedules.items():
+        for entry in entries:
+            slot = entry.time_slot
+            buckets.setdefault(("room", entry.room_id, slot.day), []).append((slot.start_min, slot.end_min, key))
+            buckets.setdefault(("faculty", entry.faculty_id, slot.day), []).append((slot.start_min, slot.end_min, key))
+
+    clashes = []
+    for (kind, resource_id, day), bookings in buckets.items():
+        if len({key for _, _, key in bookings}) < 2:
+            continue
+        bookings.sort()
+        running: List[Tuple[int, int, str]] = []
+        for start, end, key in bookings:
+            running = [booking for booking in running if booking[1] > start]
+            for other_start, _, other_key in running:
+                if other_key != key:
+                    clashes.append({
+                        "resource": kind,
+                        "resource_id": resource_id,
+                        "day": day,
+                        "start_min": start,
+                        "programs": sorted([key, other_key])
+                    })
+            running.append((start, end, key))
+    return clashes
+
+class InstitutionScheduler:
+    """Schedules several programs together over the shared room and faculty pool"""
+
+    def __init__(self, problems: List[ProgramProblem]):
+        self.problems = problems
+
+    def departments(self) -> List[Tuple[str, List[ProgramProblem]]]:
+        """Departments in scheduling order, each with its programs in order
+
+        The departments and, within one, the programs needing the most
+        session time go first, while the shared pool is still open.
+        """
+        by_department: Dict[str, List[ProgramProblem]] = {}
+        for problem in self.problems:
+            by_department.setdefault(problem.department, []).append(problem)
+        for programs in by_department.values():
+            programs.sort(key=lambda problem: -problem.demand())
+        return sorted(by_department.items(),
+                      key=lambda item: (-sum(problem.demand() for problem in item[1]), item[0]))
+
+    def schedule(self, attempts: int = 15, workers: int = None, seed: int = None,
+                 improve_iterations: int = 1000, time_budget_ms: int = None,
+                 progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Generate every program in department order over the shared resources
+
+        Each program runs the advanced generator with the bookings of the
+        programs before it reserved, on top of any reservations it already
+        has (e.g. published timetables). Program i uses seed + i * attempts,
+        so a fixed seed reproduces the run. `time_budget_ms` is shared out
+        evenly over the programs still to go. A program that fails leaves the
+        pool as it was and the run continues with the next one; `progress`
+        events carry the program's key and may stop the remaining programs.
+        """
+        started = time.monotonic()
+        deadline = started + time_budget_ms / 1000 if time_budget_ms else None
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        departments = self.departments()
+        order = [problem for _, programs in departments for problem in programs]
+
+        booked: List[ScheduleEntry] = []
+        schedules: Dict[str, List[ScheduleEntry]] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        stop_requested = False
+        for i, problem in enumerate(order):
+            if stop_requested:
+                break
+            generator = problem.generator
+            generator.reserve_resources(booked)
+            budget = None
+            if deadline is not None:
+                budget = max(1, int((deadline - time.monotonic()) * 1000 / (len(order) - i)))
+
+            def report(event: Dict[str, Any], problem=problem, index=i) -> bool:
+                nonlocal stop_requested
+                if progress is not None and progress({**event, "program": problem.key,
+                                                      "department": problem.department,
+                                                      "program_index": index + 1, "programs": len(order)}):
+                    stop_requested = True
+                return stop_requested
+
+            print(f"\n=== [{i + 1}/{len(order)}] {problem.department}: {problem.key} "
+                  f"({len(booked)} shared bookings reserved) ===")
+            result = generator.generate_timetable(
+                attempts=attempts, workers=workers, seed=seed + i * max(1, int(attempts)),
+                progress=report, time_budget_ms=budget, improve_iterations=improve_iterations
+            )
+            results[problem.key] = result
+            if result["success"]:
+                schedules[problem.key] = list(generator.schedule)
+                booked.extend(generator.schedule)
+
+        clashes = find_cross_program_clashes(schedules)
+        scheduled = [problem.key for problem in order if results.get(problem.key, {}).get("success")]
+        print(f"[INSTITUTION] Scheduled {len(scheduled)}/{len(order)} programs, "
+              f"{len(booked)} sessions, {len(clashes)} cross-program clashes")
+        return {
+            "success": len(scheduled) == len(order) and not clashes,
+            "order": [problem.key for problem in order],
+            "departments": [
+                {
+                    "department": department,
+                    "programs": [problem.key for problem in programs],
+                    "demand_minutes": sum(problem.demand() for problem in programs)
+                }
+                for department, programs in departments
+            ],
+            "results": results,
+            "scheduled": scheduled,
+            "cross_program_clashes": clashes,
+            "seed": seed,
+            "search": {
+                "time_budget_ms": time_budget_ms,
+                "deadline_reached": any(result.get("search", {}).get("deadline_reached") for result in results.values()),
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+                "completed": len(results),
+                "planned": len(order),
+                "stopped_early": stop_requested
+            }
+        }
@@ -0,0 +1,165 @@
+# backend/app/services/timetable/instrumentation.py
+"""
+Instrumentation for the timetable generators
+Engines count hot-path events and time their phases in a GenerationStats
+instead of printing per candidate; finished runs are added to the process-wide
+metrics registry, which renders them in the Prometheus text format
+"""
+from __future__ import annotations
+from typing import Dict, Any, Union, Tuple, List
+from contextlib import contextmanager
+import threading
+import time
+
+from .result_cache import result_cache
+
+class GenerationStats:
+    """Counters, rejection causes and phase timings collected during a run"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.rejections: Dict[str, int] = {}
+        self.phase_seconds: Dict[str, float] = {}
+        self.phase_calls: Dict[str, int] = {}
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reject(self, cause: str):
+        """Record a candidate slot rejected for `cause`"""
+        self.rejections[cause] = self.rejections.get(cause, 0) + 1
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one call of phase `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - started
+            self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+
+    def merge(self, other: Union["GenerationStats", Dict[str, Any]]):
+        """Add another run's stats (or their as_dict() form, e.g. from a worker process)"""
+        if isinstance(other, dict):
+            other = GenerationStats.from_dict(other)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for cause, amount in other.rejections.items():
+            self.rejections[cause] = self.rejections.get(cause, 0) + amount
+        for name, seconds in other.phase_seconds.items():
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+            self.phase_calls[name] = self.phase_calls.get(name, 0) + other.phase_calls.get(name, 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "counters": dict(self.counters),
+            "rejections": dict(self.rejections),
+            "phases": {
+                name: {"seconds": round(seconds, 6), "calls": self.phase_calls.get(name, 0)}
+                for name, seconds in self.phase_seconds.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GenerationStats":
+        stats = cls()
+        stats.counters = dict(data.get("counters", {}))
+        stats.rejections = dict(data.get("rejections", {}))
+        for name, phase in data.get("phases", {}).items():
+            stats.phase_seconds[name] = phase["seconds"]
+            stats.phase_calls[name] = phase["calls"]
+        return stats
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    """Process-wide totals of every generation run, per engine"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[Tuple[str, str], int] = {}
+        self._durations: Dict[str, List[float]] = {}  # engine -> [seconds, runs]
+        self._stats: Dict[str, GenerationStats] = {}
+
+    def record_run(self, engine: str, stats: GenerationStats, seconds: float, success: bool):
+        """Add a finished run to the totals"""
+        with self._lock:
+            key = (engine, "success" if success else "failure")
+            self._runs[key] = self._runs.get(key, 0) + 1
+            duration = self._durations.setdefault(engine, [0.0, 0])
+            duration[0] += seconds
+            duration[1] += 1
+            self._stats.setdefault(engine, GenerationStats()).merge(stats)
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self._durations.clear()
+            self._stats.clear()
+
+    def render(self) -> str:
+        """All totals in the Prometheus text exposition format"""
+        with self._lock:
+            runs = dict(self._runs)
+            durations = {engine: list(value) for engine, value in self._durations.items()}
+            stats = {engine: GenerationStats.from_dict(value.as_dict()) for engine, value in self._stats.items()}
+        cache = result_cache.stats()
+
+        lines = [
+            "# HELP timetable_generation_runs_total Generation runs by engine and outcome",
+            "# TYPE timetable_generation_runs_total counter"
+        ]
+        for (engine, outcome), count in sorted(runs.items()):
+            lines.append(f"timetable_generation_runs_total{_labels(engine=engine, outcome=outcome)} {count}")
+
+        lines += [
+            "# HELP timetable_generation_duration_seconds Wall-clock time of generation runs",
+            "# TYPE timetable_generation_duration_seconds summary"
+        ]
+        for engine, (seconds, count) in sorted(durations.items()):
+            lines.append(f"timetable_generation_duration_seconds_sum{_labels(engine=engine)} {seconds:.6f}")
+            lines.append(f"timetable_generation_duration_seconds_count{_labels(engine=engine)} {count}")
+
+        lines += [
+            "# HELP timetable_generation_events_total Hot-path events counted by the generators",
+            "# TYPE timetable_generation_events_total counter"
+        ]
+        for engine, engine_stats in sorted(stats.items()):
+            for name, count in sorted(engine_stats.counters.items()):
+                lines.append(f"timetable_generation_events_total{_labels(engine=engine, event=name)} {count}")
+
+        lines += [
+            "# HELP timetable_generation_rejections_total Candidate slots rejected, by cause",
+            "# TYPE timetable_generation_rejections_total counter"
+        ]
+        for engine, engine_stats in sorted(stats.items()):
+            for cause, count in sorted(engine_stats.rejections.items()):
+                lines.append(f"timetable_generation_rejections_total{_labels(engine=engine, cause=cause)} {count}")
+
+        lines += [
+            "# HELP timetable_generation_phase_seconds Time spent in each generation phase",
+            "# TYPE timetable_generation_phase_seconds summary"
+        ]
+        for engine, engine_stats in sorted(stats.items()):
+            for name, seconds in sorted(engine_stats.phase_seconds.items()):
+                labels = _labels(engine=engine, phase=name)
+                lines.append(f"timetable_generation_phase_seconds_sum{labels} {seconds:.6f}")
+                lines.append(f"timetable_generation_phase_seconds_count{labels} {engine_stats.phase_calls.get(name, 0)}")
+
+        lines += [
+            "# HELP timetable_generation_cache_lookups_total Result cache lookups by outcome",
+            "# TYPE timetable_generation_cache_lookups_total counter",
+            f'timetable_generation_cache_lookups_total{{outcome="hit"}} {cache["hits"]}',
+            f'timetable_generation_cache_lookups_total{{outcome="miss"}} {cache["misses"]}',
+            "# HELP timetable_generation_cache_entries Results held in the in-process cache",
+            "# TYPE timetable_generation_cache_entries gauge",
+            f"timetable_generation_cache_entries {cache['entries']}"
+        ]
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
@@ -0,0 +1,224 @@
+# backend/app/services/timetable/jobs.py
+"""
+Background timetable generation jobs
+Jobs are stored in the `generation_jobs` collection so clients can keep
+polling them after a page reload; at most GENERATION_WORKERS run at a time
+and the rest wait in the queue
+"""
+from __future__ import annotations
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from datetime import datetime
+from bson import ObjectId
+import asyncio
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.db.mongodb import db
+from .advanced_generator import ProgressCallback
+from .generation import GenerationError
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# Progress events can arrive many times per second; the job document is
+# updated at most this often (the last event is always saved at the end)
+PROGRESS_SAVE_INTERVAL = 1.0
+
+JobRun = Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+
+def serialize_job(job: Dict[str, Any], include_result: bool = False) -> Dict[str, Any]:
+    """Convert a job document into a JSON-friendly response"""
+    data = {
+        "job_id": str(job["_id"]),
+        "kind": job.get("kind"),
+        "status": job.get("status"),
+        "timetable_id": job.get("timetable_id"),
+        "progress": job.get("progress"),
+        "error": job.get("error"),
+        "created_by": str(job.get("created_by")) if job.get("created_by") else None,
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+    if include_result:
+        data["result"] = job.get("result")
+    return data
+
+class GenerationJobManager:
+    """Queues generation runs as background jobs and tracks them in MongoDB"""
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stop_flags: Dict[str, threading.Event] = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    async def submit(self, kind: str, params: Dict[str, Any], user_id: str, run: JobRun,
+                     timetable_id: Optional[str] = None) -> Dict[str, Any]:
+        """Store a queued job and start it in the background, returning the job document"""
+        job = {
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "timetable_id": timetable_id,
+            "params": params,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "created_by": ObjectId(user_id),
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None
+        }
+        insert_result = await db.db.generation_jobs.insert_one(job)
+        job["_id"] = insert_result.inserted_id
+        job_id = str(insert_result.inserted_id)
+
+        self._stop_flags[job_id] = threading.Event()
+        self._tasks[job_id] = asyncio.create_task(self._execute(job_id, run))
+        logger.info(f"Queued {kind} generation job {job_id}")
+        return job
+
+    async def get_job(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Load a job document, or None if the id is unknown"""
+        if not ObjectId.is_valid(job_id):
+            return None
+        projection = None if include_result else {"result": 0}
+        return await db.db.generation_jobs.find_one({"_id": ObjectId(job_id)}, projection)
+
+    async def list_jobs(self, user_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally only those created by one user"""
+        query = {"created_by": ObjectId(user_id)} if user_id else {}
+        cursor = db.db.generation_jobs.find(query, {"result": 0, "params": 0}).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it had already finished
+
+        A running engine is told to stop at its next progress report and its
+        result is discarded; the job keeps its slot until the engine's thread
+        has returned, so the next queued job never shares the thread pool with it.
+        """
+        update_result = await db.db.generation_jobs.update_one(
+            {"_id": ObjectId(job_id), "status": {"$in": list(ACTIVE_STATUSES)}},
+            {"$set": {"status": JOB_CANCELLED, "finished_at": datetime.utcnow()}}
+        )
+        stop = self._stop_flags.get(job_id)
+        if stop is not None:
+            stop.set()
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return update_result.modified_count == 1
+
+    async def recover_interrupted_jobs(self):
+        """Fail jobs left queued or running by a previous server process"""
+        try:
+            update_result = await db.db.generation_jobs.update_many(
+                {"status": {"$in": list(ACTIVE_STATUSES)}},
+                {"$set": {
+                    "status": JOB_FAILED,
+                    "error": {"detail": "Interrupted by a server restart", "status_code": 503},
+                    "finished_at": datetime.utcnow()
+                }}
+            )
+            if update_result.modified_count:
+                logger.warning(f"Marked {update_result.modified_count} interrupted generation jobs as failed")
+        except Exception as e:
+            logger.warning(f"Could not recover generation jobs: {e}")
+
+    async def shutdown(self):
+        """Stop every job still running in this process"""
+        for stop in self._stop_flags.values():
+            stop.set()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _execute(self, job_id: str, run: JobRun):
+        stop = self._stop_flags[job_id]
+        state = {"latest": None}
+        try:
+            async with self._semaphore():
+                started = await self._transition(job_id, JOB_QUEUED, {
+                    "status": JOB_RUNNING,
+                    "started_at": datetime.utcnow()
+                })
+                if not started:
+                    return  # Cancelled while queued
+
+                try:
+                    result = await run(self._progress_callback(job_id, stop, state))
+                except GenerationError as e:
+                    await self._finish(job_id, JOB_FAILED, state, error={"detail": e.detail, "status_code": e.status_code})
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.exception(f"Generation job {job_id} failed")
+                    await self._finish(job_id, JOB_FAILED, state, error={"detail": f"Internal server error: {str(e)}", "status_code": 500})
+                else:
+                    await self._finish(job_id, JOB_COMPLETED, state, result=result)
+        except asyncio.CancelledError:
+            # cancel() has already recorded the job; after a shutdown the next
+            # startup marks it as interrupted
+            logger.info(f"Generation job {job_id} cancelled")
+        finally:
+            self._tasks.pop(job_id, None)
+            self._stop_flags.pop(job_id, None)
+
+    def _progress_callback(self, job_id: str, stop: threading.Event, state: Dict[str, Any]) -> ProgressCallback:
+        loop = asyncio.get_running_loop()
+        last_saved = [0.0]
+
+        def on_progress(event: Dict[str, Any]) -> bool:
+            # Called from the engine's thread
+            state["latest"] = event
+            now = time.monotonic()
+            if now - last_saved[0] >= PROGRESS_SAVE_INTERVAL:
+                last_saved[0] = now
+                asyncio.run_coroutine_threadsafe(self._save_progress(job_id, event, stop), loop)
+            return stop.is_set()
+
+        return on_progress
+
+    async def _save_progress(self, job_id: str, event: Dict[str, Any], stop: threading.Event):
+        saved = await self._transition(job_id, JOB_RUNNING, {"progress": event})
+        if not saved:
+            # Cancelled through another server process
+            stop.set()
+
+    async def _finish(self, job_id: str, status: str, state: Dict[str, Any],
+                      result: Dict[str, Any] = None, error: Dict[str, Any] = None):
+        await self._transition(job_id, JOB_RUNNING, {
+            "status": status,
+            "progress": state["latest"],
+            "result": result,
+            "error": error,
+            "finished_at": datetime.utcnow()
+        })
+        logger.info(f"Generation job {job_id} {status}")
+
+    async def _transition(self, job_id: str, expected_status: str, fields: Dict[str, Any]) -> bool:
+        """Update the job only if it is still in `expected_status` (so a cancel always wins)"""
+        update_result = await db.db.generation_jobs.update_one(
+            {"_id": ObjectId(job_id), "status": expected_status},
+            {"$set": fields}
+        )
+        return update_result.matched_count == 1
+
+job_manager = GenerationJobManager(settings.GENERATION_WORKERS)
@@ -0,0 +1,95 @@
+# backend/app/services/timetable/parallel.py
+"""
+Shared process pool for CPU-bound timetable generation work
+One pool with a worker per CPU core is created lazily, reused across requests
+and shut down with the app; a request's `workers` only limits how many of its
+tasks run on the pool at once
+"""
+from __future__ import annotations
+from typing import Any, Callable, List, Optional, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import multiprocessing
+import os
+import threading
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def default_worker_count() -> int:
+    """Number of worker processes to use when the caller does not specify one"""
+    return os.cpu_count() or 1
+
+def worker_count(requested: Optional[int], tasks: int) -> int:
+    """Workers for a run of `tasks` tasks: the requested number (every core by
+    default), but never more than the CPU count or the number of tasks"""
+    return max(1, min(int(requested or default_worker_count()), default_worker_count(), tasks))
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool (one worker per CPU core)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" keeps workers independent of the server's threads and
+            # open database connections, and behaves the same on every OS
+            _pool = ProcessPoolExecutor(
+                max_workers=default_worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def discard_process_pool(pool: Optional[ProcessPoolExecutor] = None):
+    """Drop a pool that broke so the next request starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if pool is None or pool is _pool:
+            pool, _pool = _pool, None
+        else:
+            pool = None  # already replaced by a fresh pool
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def map_bounded(pool: ProcessPoolExecutor, function: Callable[..., Any],
+                calls: Sequence[tuple], limit: int) -> List[Any]:
+    """Results of function(*args) for every args in `calls`, in order, with at
+    most `limit` of them submitted to the pool at any time"""
+    results: List[Any] = [None] * len(calls)
+    queued = iter(enumerate(calls))
+    running = {}
+
+    def submit_next():
+        item = next(queued, None)
+        if item is not None:
+            running[pool.submit(function, *item[1])] = item[0]
+
+    for _ in range(max(1, limit)):
+        submit_next()
+    while running:
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            results[running.pop(future)] = future.result()
+            submit_next()
+    return results
+
+async def run_in_thread(executor: Executor, function: Callable[[], Any]) -> Any:
+    """Await function() on an executor thread
+    
+    A running thread cannot be interrupted, so when the awaiting task is
+    cancelled the cancellation is only raised once the call has returned (the
+    engines stop at their next progress report). Whatever the task holds, such
+    as a generation job's slot, stays held until the thread is free again.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, function)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                pass
+        raise
+
+def shutdown_process_pools():
+    """Shut down the shared pool (called on application shutdown)"""
+    discard_process_pool()
@@ -0,0 +1,140 @@
+# backend/app/services/timetable/result_cache.py
+"""
+Content-addressed cache for generation results
+Results are keyed by a fingerprint of everything that determines a run (the
+loaded courses, groups, rooms, faculty, rules, engine parameters and seed),
+kept in an in-process LRU and optionally mirrored to a MongoDB collection
+"""
+from __future__ import annotations
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from dataclasses import is_dataclass, asdict
+from datetime import datetime
+import copy
+import hashlib
+import json
+import logging
+import threading
+
+from app.core.config import settings
+from app.db.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+def canonical(value: Any) -> Any:
+    """Convert a value into plain JSON data with a stable ordering"""
+    if is_dataclass(value) and not isinstance(value, type):
+        return canonical(asdict(value))
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonical(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True, default=str))
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)  # ObjectId, datetime, enums
+
+def fingerprint(*parts: Any) -> str:
+    """SHA-256 of the canonical JSON form of `parts`"""
+    payload = json.dumps(canonical(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Size-bounded LRU of generation results, optionally backed by MongoDB
+
+    Lookups check memory first and then the collection (when configured);
+    cache failures are logged and treated as misses so they never break a run.
+    """
+
+    def __init__(self, max_entries: int = 64, collection: Optional[str] = None):
+        self.max_entries = max(0, max_entries)
+        self.collection = collection
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for `key`, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+        if result is None and self.collection:
+            result = await self._load(key)
+            if result is not None:
+                self._remember(key, result)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(result)
+
+    async def put(self, key: str, result: Dict[str, Any]):
+        """Store a result under `key`, evicting the least recently used entries"""
+        if not self.enabled:
+            return
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        if self.collection:
+            await self._store(key, result)
+
+    def clear(self):
+        """Drop every in-memory entry (the collection is left untouched)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "collection": self.collection
+            }
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            collection = db.db[self.collection]
+            doc = await collection.find_one_and_update(
+                {"_id": key}, {"$set": {"last_used": datetime.utcnow()}}, projection={"result": 1}
+            )
+            return doc["result"] if doc else None
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed: {e}")
+            return None
+
+    async def _store(self, key: str, result: Dict[str, Any]):
+        try:
+            collection = db.db[self.collection]
+            now = datetime.utcnow()
+            await collection.replace_one(
+                {"_id": key},
+                {"result": result, "created_at": now, "last_used": now},
+                upsert=True
+            )
+            # Evict least recently used documents beyond the size bound
+            excess = await collection.count_documents({}) - self.max_entries
+            if excess > 0:
+                stale = await collection.find({}, {"_id": 1}).sort("last_used", 1).limit(excess).to_list(length=excess)
+                await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+        except Exception as e:
+            logger.warning(f"Result cache store failed: {e}")
+
+result_cache = ResultCache(settings.GENERATION_CACHE_SIZE, settings.GENERATION_CACHE_COLLECTION)
@@ -0,0 +1,233 @@
+# backend/benchmarks/instances.py
+"""
+Synthetic timetabling instances for the benchmarks
+An InstanceSpec describes the size and shape of a problem (courses, groups,
+subgroups, rooms, faculty, lab ratio and tightness); generate_instance turns
+it into the same objects the generators load from MongoDB, so every engine
+can be run offline on identical, reproducible data
+"""
+from __future__ import annotations
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, asdict, replace
+import copy
+import math
+import random
+
+from bson import ObjectId
+
+from app.services.timetable.advanced_generator import (
+    CourseRequirement, StudentGroup, Room, Faculty, SchedulingRules
+)
+
+DEPARTMENTS = ["CSE", "ECE", "MECH", "CIVIL", "EEE"]
+
+@dataclass(frozen=True)
+class InstanceSpec:
+    """Size and shape of a synthetic instance"""
+    name: str = "custom"
+    courses: int = 8
+    groups: int = 1             # main (lecture) groups
+    subgroups: int = 2          # lab subgroups per main group
+    rooms: int = 4              # lecture rooms
+    lab_rooms: Optional[int] = None  # defaults to a share of the rooms by lab ratio
+    faculty: int = 5
+    lab_ratio: float = 0.25     # share of the courses that are labs
+    tightness: float = 0.6      # share of a group's weekly periods its course load fills
+    group_size: int = 60
+    seed: int = 0
+
+PRESETS: Dict[str, InstanceSpec] = {
+    "small": InstanceSpec(name="small", courses=6, subgroups=2, rooms=3, faculty=4, tightness=0.45),
+    "medium": InstanceSpec(name="medium", courses=9, subgroups=2, rooms=4, faculty=5, tightness=0.6),
+    "large": InstanceSpec(name="large", courses=12, groups=2, subgroups=3, rooms=6, faculty=8, tightness=0.7),
+    "tight": InstanceSpec(name="tight", courses=10, subgroups=3, rooms=2, lab_rooms=1, faculty=4, tightness=0.8),
+}
+
+@dataclass
+class SyntheticInstance:
+    """A generated instance in the advanced generator's model"""
+    spec: InstanceSpec
+    courses: List[CourseRequirement]
+    groups: List[StudentGroup]
+    rooms: List[Room]
+    faculty: List[Faculty]
+
+    def load_into(self, generator):
+        """Give an AdvancedTimetableGenerator (or subclass) its own copy of the instance"""
+        generator.courses = copy.deepcopy(self.courses)
+        generator.groups = copy.deepcopy(self.groups)
+        generator.rooms = copy.deepcopy(self.rooms)
+        generator.faculty = copy.deepcopy(self.faculty)
+        return generator
+
+    def island_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Keyword arguments for the test-mode island GeneticTimetableGenerator"""
+        theory = [course.code for course in self.courses if not course.is_lab]
+        labs = [course.code for course in self.courses if course.is_lab]
+        return {
+            "courses": [
+                {
+                    "id": course.code,
+                    "code": course.code,
+                    "name": course.name,
+                    "hours_per_week": course.hours_per_week,
+                    "course_type": "lab" if course.is_lab else "theory"
+                }
+                for course in self.courses
+            ],
+            "faculties": [
+                {"id": fac.id, "name": fac.name, "max_hours_per_week": 16, "subjects": list(fac.subjects)}
+                for fac in self.faculty
+            ],
+            "rooms": [
+                {"id": room.id, "name": room.name, "capacity": room.capacity,
+                 "room_type": "lab" if room.is_lab else "classroom"}
+                for room in self.rooms
+            ],
+            "student_groups": [
+                {"id": group.id, "name": group.name, "course_ids": labs if group.is_subgroup else theory}
+                for group in self.groups
+            ]
+        }
+
+    def documents(self) -> Dict[str, Any]:
+        """MongoDB-shaped documents for TimetableGenerator (courses, groups, rooms, faculty)"""
+        ids: Dict[str, ObjectId] = {}
+
+        def object_id(key: str) -> ObjectId:
+            if key not in ids:
+                ids[key] = ObjectId(f"{len(ids) + 1:024x}")
+            return ids[key]
+
+        courses = [
+            {
+                "_id": object_id(course.code),
+                "code": course.code,
+                "name": course.name,
+                "type": "Practical" if course.is_lab else "Theory",
+                "hours_per_week": course.hours_per_week,
+                "min_per_session": course.lab_duration if course.is_lab else course.theory_duration,
+                "is_lab": course.is_lab,
+                "is_active": True
+            }
+            for course in self.courses
+        ]
+        theory = [object_id(course.code) for course in self.courses if not course.is_lab]
+        labs = [object_id(course.code) for course in self.courses if course.is_lab]
+        names = {course.code: course.name for course in self.courses}
+        return {
+            "program": {"_id": object_id("program"), "name": f"Synthetic {self.spec.name}", "code": "SYN"},
+            "courses": courses,
+            "groups": [
+                {
+                    "_id": object_id(group.id),
+                    "name": group.name,
+                    "type": "Lab Group" if group.is_subgroup else "Regular Class",
+                    "student_count": group.size,
+                    "course_ids": labs if group.is_subgroup else theory
+                }
+                for group in self.groups
+            ],
+            "rooms": [
+                {
+                    "_id": object_id(room.id),
+                    "name": room.name,
+                    "room_type": "Lab" if room.is_lab else "Classroom",
+                    "capacity": room.capacity,
+                    "is_lab": room.is_lab,
+                    "has_projector": True,
+                    "is_active": True
+                }
+                for room in self.rooms
+            ],
+            "faculty": [
+                {
+                    "_id": object_id(fac.id),
+                    "name": fac.name,
+                    "designation": "Professor",
+                    "specialization": [names[code] for code in fac.subjects]
+                }
+                for fac in self.faculty
+            ],
+            "constraints": []
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        labs = sum(1 for course in self.courses if course.is_lab)
+        return {
+            **asdict(self.spec),
+            "theory_courses": len(self.courses) - labs,
+            "lab_courses": labs,
+            "theory_hours": sum(course.hours_per_week for course in self.courses if not course.is_lab),
+            "lecture_rooms": sum(1 for room in self.rooms if not room.is_lab),
+            "lab_room_count": sum(1 for room in self.rooms if room.is_lab),
+            "group_count": len(self.groups)
+        }
+
+def generate_instance(spec: InstanceSpec, rules: SchedulingRules = None) -> SyntheticInstance:
+    """Build a reproducible instance from `spec` (the same spec always gives the same instance)"""
+    rules = rules or SchedulingRules()
+    rng = random.Random(spec.seed)
+
+    lab_count = min(spec.courses, round(spec.courses * spec.lab_ratio))
+    theory_count = spec.courses - lab_count
+
+    # Split the theory load the tightness asks for (after the labs, which
+    # take a 180-minute block each) over the theory courses
+    weekly_periods = len(rules.get_theory_slots())
+    lab_periods = lab_count * math.ceil(180 / rules.PERIOD_DURATION)
+    theory_periods = max(theory_count, round(spec.tightness * weekly_periods) - lab_periods)
+    # A course meets at most once a day, so even in double periods it can
+    # take only two periods per working day
+    max_share = 2 * len(rules.WORKING_DAYS)
+    shares = [1] * theory_count
+    for _ in range(theory_periods - theory_count):
+        open_courses = [i for i, share in enumerate(shares) if share < max_share]
+        if not open_courses:
+            break
+        shares[rng.choice(open_courses)] += 1
+
+    courses: List[CourseRequirement] = []
+    for i in range(spec.courses):
+        dept = DEPARTMENTS[i % len(DEPARTMENTS)]
+        code = f"{dept}{101 + i}"
+        if i < theory_count:
+            # hours_per_week is in 60-minute hours, sessions are 50-minute periods
+            hours = math.ceil(shares[i] * rules.PERIOD_DURATION / 60)
+            # Double periods once single ones would need more than one a day
+            double = hours * 60 // rules.PERIOD_DURATION > len(rules.WORKING_DAYS)
+            courses.append(CourseRequirement(code, f"{code} Theory", hours, False, double))
+        else:
+            courses.append(CourseRequirement(code, f"{code} Lab", 3, True, False))
+
+    groups: List[StudentGroup] = []
+    subgroup_size = math.ceil(spec.group_size / max(1, spec.subgroups))
+    for g in range(spec.groups):
+        group_id = f"G{g + 1}"
+        groups.append(StudentGroup(group_id, f"Group {g + 1}", spec.group_size))
+        for k in range(spec.subgroups):
+            groups.append(StudentGroup(f"{group_id}S{k + 1}", f"Group {g + 1}-{k + 1}", subgroup_size, True, group_id))
+
+    lab_rooms = spec.lab_rooms
+    if lab_rooms is None:
+        lab_rooms = max(1, math.ceil(spec.rooms * spec.lab_ratio)) if lab_count else 0
+    rooms = [Room(f"R{i + 1:02d}", f"Room {i + 1}", spec.group_size + rng.randint(0, 20), False)
+             for i in range(spec.rooms)]
+    rooms += [Room(f"L{i + 1:02d}", f"Lab {i + 1}", subgroup_size + rng.randint(0, 10), True)
+              for i in range(lab_rooms)]
+
+    # Every course gets one faculty member round-robin, and half of them a second one
+    subjects: List[List[str]] = [[] for _ in range(max(1, spec.faculty))]
+    for i, course in enumerate(courses):
+        subjects[i % len(subjects)].append(course.code)
+        if len(subjects) > 1 and rng.random() < 0.5:
+            other = rng.choice([f for f in range(len(subjects)) if f != i % len(subjects)])
+            subjects[other].append(course.code)
+    faculty = [Faculty(f"F{i + 1:03d}", f"Faculty {i + 1}", codes) for i, codes in enumerate(subjects)]
+
+    return SyntheticInstance(spec, courses, groups, rooms, faculty)
+
+def preset(name: str, seed: int = None) -> InstanceSpec:
+    """A named preset, optionally with another seed"""
+    spec = PRESETS[name]
+    return spec if seed is None else replace(spec, seed=seed)
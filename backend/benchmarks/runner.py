@@ -0,0 +1,293 @@
+# backend/benchmarks/runner.py
+"""
+Offline benchmark runner for the timetable generators
+Runs each engine on synthetic instances without a server or database and
+records runtime, peak memory, score and clashes to JSON, optionally comparing
+the results against a stored baseline
+
+Usage (from backend/):
+    python -m benchmarks.runner --instances small medium --repeat 3 --output results.json
+    python -m benchmarks.runner --baseline benchmarks/baselines/default.json
+    python -m benchmarks.runner --save-baseline benchmarks/baselines/default.json
+"""
+from __future__ import annotations
+from typing import Dict, List, Any, Callable, Iterable, Tuple
+from datetime import datetime
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.services.timetable.advanced_generator import AdvancedTimetableGenerator, t2min
+from app.services.timetable.cpsat_generator import CPSATTimetableGenerator
+from app.services.timetable.genetic_generator import GeneticTimetableGenerator
+from app.services.timetable.generator import TimetableGenerator
+from app.services.genetic_algorithm.genetic_timetable_generator import (
+    GeneticTimetableGenerator as IslandGeneticTimetableGenerator
+)
+from .instances import SyntheticInstance, PRESETS, generate_instance, preset
+
+# Engine parameters are kept small enough for a laptop run; every engine is
+# single-worker so runtimes are comparable and tracemalloc sees all allocations
+ENGINE_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "advanced": {"attempts": 10, "improve_iterations": 1000},
+    "cpsat": {"time_limit_seconds": 5.0},
+    "genetic": {"population_size": 30, "generations": 40},
+    "genetic_islands": {"population_size": 30, "generations": 60, "islands": 2},
+    "timetable_simple": {},
+    "timetable_rules": {},
+}
+
+# Relative slowdown (and absolute noise floor) tolerated before a run counts as a regression
+RUNTIME_TOLERANCE = 0.25
+RUNTIME_NOISE_SECONDS = 0.05
+
+Booking = Tuple[str, str, str, int, int]  # (kind, resource id, day, start_min, end_min)
+
+def count_clashes(bookings: Iterable[Booking]) -> int:
+    """Pairs of overlapping bookings of the same group, room or faculty member"""
+    by_resource: Dict[Tuple[str, str, str], List[Tuple[int, int]]] = {}
+    for kind, resource_id, day, start, end in bookings:
+        by_resource.setdefault((kind, resource_id, day), []).append((start, end))
+    clashes = 0
+    for spans in by_resource.values():
+        spans.sort()
+        for i, (start, end) in enumerate(spans):
+            for other_start, _ in spans[i + 1:]:
+                if other_start >= end:
+                    break
+                clashes += 1
+    return clashes
+
+def _bookings(group_id, room_id, faculty_id, day, start, end) -> List[Booking]:
+    return [("group", str(group_id), day, start, end),
+            ("room", str(room_id), day, start, end),
+            ("faculty", str(faculty_id), day, start, end)]
+
+def _schedule_outcome(generator: AdvancedTimetableGenerator, result: Dict[str, Any], score_key: str) -> Dict[str, Any]:
+    bookings = [booking for entry in generator.schedule if result.get("success")
+                for booking in _bookings(entry.group_id, entry.room_id, entry.faculty_id,
+                                         entry.time_slot.day, entry.time_slot.start_min, entry.time_slot.end_min)]
+    return {
+        "success": bool(result.get("success")),
+        "score": result.get(score_key),
+        "sessions": len(generator.schedule) if result.get("success") else 0,
+        "clashes": count_clashes(bookings),
+        "error": result.get("error")
+    }
+
+def run_advanced(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    generator = instance.load_into(AdvancedTimetableGenerator())
+    result = generator.generate_timetable(attempts=settings["attempts"], workers=1, seed=seed,
+                                          improve_iterations=settings["improve_iterations"])
+    return _schedule_outcome(generator, result, "score")
+
+def run_cpsat(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    generator = instance.load_into(CPSATTimetableGenerator(time_limit_seconds=settings["time_limit_seconds"], num_workers=1))
+    result = generator.generate_timetable()
+    return _schedule_outcome(generator, result, "score")
+
+def run_genetic(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    random.seed(seed)
+    generator = instance.load_into(GeneticTimetableGenerator(
+        population_size=settings["population_size"], generations=settings["generations"], workers=1
+    ))
+    result = generator.generate_timetable()
+    return _schedule_outcome(generator, result, "fitness")
+
+def run_genetic_islands(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    generator = IslandGeneticTimetableGenerator(
+        population_size=settings["population_size"], generations=settings["generations"],
+        islands=settings["islands"], workers=1, test_mode=True, **instance.island_data()
+    )
+    result = asyncio.run(generator.generate_timetable(seed=seed))
+    entries = result["timetable_entries"]
+    bookings = [booking for entry in entries
+                for booking in _bookings(entry["group_id"], entry["room_id"], entry["faculty_id"],
+                                         entry["day"], t2min(entry["start_time"]), t2min(entry["end_time"]))]
+    return {
+        "success": bool(result.get("success")),
+        "score": result.get("best_fitness_score"),
+        "sessions": len(entries),
+        "clashes": count_clashes(bookings),
+        "error": None
+    }
+
+def _timetable_outcome(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    bookings = [booking for entry in entries
+                for booking in _bookings(entry["group_id"], entry["room_id"], entry["faculty_id"],
+                                         entry["time_slot"]["day"], t2min(entry["time_slot"]["start_time"]),
+                                         t2min(entry["time_slot"]["end_time"]))]
+    return {"success": True, "score": None, "sessions": len(entries), "clashes": count_clashes(bookings), "error": None}
+
+def run_timetable_simple(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    docs = instance.documents()
+    entries = TimetableGenerator()._generate_simple_entries({
+        "courses": docs["courses"], "groups": docs["groups"], "rooms": docs["rooms"], "faculty": docs["faculty"]
+    })
+    return _timetable_outcome(entries)
+
+def run_timetable_rules(instance: SyntheticInstance, seed: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    docs = instance.documents()
+    generator = TimetableGenerator(use_simple_mode=False)
+    data = generator._prepare(docs["program"], docs["courses"], docs["groups"], docs["rooms"],
+                              docs["constraints"], docs["faculty"])
+    try:
+        entries = generator._schedule_rules(data)
+    except Exception as e:
+        return {"success": False, "score": None, "sessions": 0, "clashes": 0, "error": str(e)}
+    return _timetable_outcome(entries)
+
+ENGINES: Dict[str, Callable[[SyntheticInstance, int, Dict[str, Any]], Dict[str, Any]]] = {
+    "advanced": run_advanced,
+    "cpsat": run_cpsat,
+    "genetic": run_genetic,
+    "genetic_islands": run_genetic_islands,
+    "timetable_simple": run_timetable_simple,
+    "timetable_rules": run_timetable_rules,
+}
+
+def _call(run: Callable[[], Dict[str, Any]], verbose: bool) -> Dict[str, Any]:
+    if verbose:
+        return run()
+    # The engines print their progress; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run()
+
+def benchmark(engine: str, instance: SyntheticInstance, repeat: int = 3, seed: int = 0,
+              measure_memory: bool = True, verbose: bool = False) -> Dict[str, Any]:
+    """Time `repeat` runs of an engine on an instance, plus one traced run for peak memory"""
+    run_engine = ENGINES[engine]
+    settings = ENGINE_SETTINGS[engine]
+    timings = []
+    outcome: Dict[str, Any] = {}
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        outcome = _call(lambda: run_engine(instance, seed, settings), verbose)
+        timings.append(time.perf_counter() - started)
+
+    peak_memory_kb = None
+    if measure_memory:
+        # Tracing slows the engines down, so memory gets a run of its own
+        tracemalloc.start()
+        try:
+            _call(lambda: run_engine(instance, seed, settings), verbose)
+            peak_memory_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "engine": engine,
+        "instance": instance.spec.name,
+        "seed": seed,
+        "settings": settings,
+        "seconds": [round(t, 4) for t in timings],
+        "seconds_median": round(statistics.median(timings), 4),
+        "seconds_min": round(min(timings), 4),
+        "peak_memory_kb": peak_memory_kb,
+        **outcome
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            tolerance: float = RUNTIME_TOLERANCE) -> List[Dict[str, Any]]:
+    """Compare results with a baseline, returning one row per (engine, instance) found in both"""
+    previous = {(row["engine"], row["instance"]): row for row in baseline.get("results", [])}
+    rows = []
+    for row in results:
+        before = previous.get((row["engine"], row["instance"]))
+        if before is None:
+            continue
+        problems = []
+        if row["seconds_median"] > before["seconds_median"] * (1 + tolerance) + RUNTIME_NOISE_SECONDS:
+            problems.append("slower")
+        if before.get("success") and not row.get("success"):
+            problems.append("failed")
+        if before.get("score") is not None and row.get("score") is not None and row["score"] < before["score"]:
+            problems.append("lower score")
+        if row.get("clashes", 0) > before.get("clashes", 0):
+            problems.append("more clashes")
+        if (before.get("peak_memory_kb") and row.get("peak_memory_kb") and
+                row["peak_memory_kb"] > before["peak_memory_kb"] * (1 + tolerance)):
+            problems.append("more memory")
+        rows.append({
+            "engine": row["engine"],
+            "instance": row["instance"],
+            "seconds": (before["seconds_median"], row["seconds_median"]),
+            "speedup": round(before["seconds_median"] / row["seconds_median"], 2) if row["seconds_median"] else None,
+            "score": (before.get("score"), row.get("score")),
+            "peak_memory_kb": (before.get("peak_memory_kb"), row.get("peak_memory_kb")),
+            "regressions": problems
+        })
+    return rows
+
+def _print_results(results: List[Dict[str, Any]]):
+    print(f"{'engine':<18}{'instance':<10}{'median s':>10}{'peak KiB':>11}{'score':>10}{'sessions':>10}{'clashes':>9}  ok")
+    for row in results:
+        score = "-" if row.get("score") is None else f"{row['score']:.0f}"
+        memory = "-" if row.get("peak_memory_kb") is None else f"{row['peak_memory_kb']:.0f}"
+        print(f"{row['engine']:<18}{row['instance']:<10}{row['seconds_median']:>10.3f}{memory:>11}"
+              f"{score:>10}{row['sessions']:>10}{row['clashes']:>9}  {'yes' if row['success'] else 'no'}")
+
+def _print_comparison(rows: List[Dict[str, Any]]):
+    print(f"\n{'engine':<18}{'instance':<10}{'baseline s':>11}{'now s':>9}{'speedup':>9}  regressions")
+    for row in rows:
+        before, now = row["seconds"]
+        print(f"{row['engine']:<18}{row['instance']:<10}{before:>11.3f}{now:>9.3f}{row['speedup'] or 0:>9.2f}  "
+              f"{', '.join(row['regressions']) or '-'}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the timetable generators on synthetic instances")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument("--instances", nargs="+", choices=sorted(PRESETS), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per engine and instance")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the instances and the engines")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with this results file; exits with 1 on regressions")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=RUNTIME_TOLERANCE, help="Allowed relative slowdown")
+    parser.add_argument("--verbose", action="store_true", help="Show the engines' own output")
+    args = parser.parse_args(argv)
+
+    results = []
+    instances = []
+    for name in args.instances:
+        instance = generate_instance(preset(name, args.seed))
+        instances.append(instance.summary())
+        for engine in args.engines:
+            print(f"Running {engine} on {name}...", file=sys.stderr)
+            results.append(benchmark(engine, instance, args.repeat, args.seed, not args.no_memory, args.verbose))
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "instances": instances,
+        "results": results
+    }
+    _print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        _print_comparison(rows)
+        if any(row["regressions"] for row in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
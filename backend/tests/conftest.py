@@ -0,0 +1,17 @@
+# backend/tests/conftest.py
+"""
+Offline tests for the timetable engines and exporter
+They need no server or MongoDB; the settings the app requires get
+placeholder values when no .env provides them. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "timetable_tests")
+os.environ.setdefault("SECRET_KEY", "tests")
@@ -0,0 +1,115 @@
+# backend/tests/test_export_stream.py
+"""Streaming exports against an in-memory stand-in for the database"""
+import asyncio
+import json
+
+import openpyxl
+
+from bson import ObjectId
+
+from app.db.mongodb import db
+from app.services.timetable.exporter import DAY_ORDER, STREAM_BATCH_SIZE, TimetableExporter, _collect
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class _Collection:
+    def __init__(self, docs, calls):
+        self.docs = docs
+        self.calls = calls
+
+    def find(self, query, projection=None):
+        self.calls.append(query)
+        ids = query.get("_id", {}).get("$in") if isinstance(query.get("_id"), dict) else None
+        return _Cursor([doc for doc in self.docs if ids is None or doc["_id"] in ids])
+
+    def aggregate(self, pipeline, **options):
+        """The unwound entries a resource view's pipeline yields, in its sort order"""
+        self.calls.append(pipeline)
+        assert options.get("allowDiskUse")
+        sheet = next(stage["$addFields"]["_sheet"] for stage in pipeline if "_sheet" in stage.get("$addFields", {}))
+        id_field = sheet["id"]["$toString"]["$ifNull"][0][len("$entry."):]
+        name_field = sheet["name"]["$ifNull"][0][len("$entry."):]
+        rows = [{
+            "program_id": doc["program_id"], "semester": doc["semester"], "entry": entry,
+            "_sheet": {"id": str(entry.get(id_field) or ""), "name": entry.get(name_field) or ""},
+        } for doc in self.docs for entry in doc["entries"]]
+        return _Cursor(sorted(rows, key=lambda row: (
+            row["_sheet"]["id"], row["_sheet"]["name"],
+            DAY_ORDER[row["entry"]["time_slot"]["day"]], row["entry"]["time_slot"]["start_time"])))
+
+class _Database:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        return self.collections[name]
+
+def _database(timetables: int, calls):
+    courses = [{"_id": ObjectId(), "code": f"C{i}", "name": f"Course {i}", "credits": 3} for i in range(60)]
+    faculty = [{"_id": ObjectId(), "name": f"F{i}", "department": "CSE"} for i in range(60)]
+    rooms = [{"_id": ObjectId(), "number": f"R{i}", "type": "lecture", "capacity": 60} for i in range(60)]
+    groups = [{"_id": ObjectId(), "name": f"G{i}"} for i in range(60)]
+    programs = [{"_id": ObjectId(), "name": "B.Tech", "code": "CSE"}]
+    # Every timetable refers to documents no earlier timetable used
+    docs = [{
+        "_id": ObjectId(), "program_id": programs[0]["_id"], "semester": n % 8 + 1,
+        "entries": [{
+            "course_id": courses[n]["_id"], "faculty_id": faculty[n]["_id"],
+            "room_id": rooms[n]["_id"], "group_id": groups[n]["_id"],
+            "time_slot": {"day": "Mon", "start_time": "09:00", "end_time": "09:50", "duration_minutes": 50},
+        }],
+    } for n in range(timetables)]
+    collections = {"courses": courses, "faculty": faculty, "rooms": rooms,
+                   "student_groups": groups, "programs": programs, "timetables": docs}
+    return _Database({name: _Collection(items, calls) for name, items in collections.items()})
+
+def test_references_are_loaded_once_per_cursor_batch(monkeypatch):
+    calls = []
+    timetables = STREAM_BATCH_SIZE + 4
+    monkeypatch.setattr(db, "db", _database(timetables, calls))
+
+    output = asyncio.run(_collect(TimetableExporter().stream_json({})))
+    exported = json.loads(output.getvalue())
+
+    assert exported["total_timetables"] == timetables
+    assert {entry["course_code"] for timetable in exported["timetables"] for entry in timetable["entries"]} == {
+        f"C{n}" for n in range(timetables)
+    }
+    # The timetables cursor, then one query per collection for each of the two
+    # batches (the shared program is already cached for the second)
+    assert len(calls) == 1 + 5 + 4
+
+def test_resource_sheets_come_from_the_sorted_aggregation(monkeypatch):
+    calls = []
+    database = _database(2, calls)
+    rooms = database["rooms"].docs
+    timetables = database["timetables"].docs
+    # Both timetables use room R0, on different days
+    for timetable, day in zip(timetables, ["Wed", "Mon"]):
+        timetable["entries"][0]["room_id"] = rooms[0]["_id"]
+        timetable["entries"][0]["time_slot"]["day"] = day
+    monkeypatch.setattr(db, "db", database)
+
+    workbook = openpyxl.load_workbook(asyncio.run(TimetableExporter().export_workbook({}, ["room"])))
+
+    assert workbook.sheetnames == ["Room R0"]
+    assert [row[0] for row in workbook["Room R0"].iter_rows(min_row=4, values_only=True)] == ["Mon", "Wed"]
+    assert [row[6] for row in workbook["Room R0"].iter_rows(min_row=4, values_only=True)] == ["CSE Sem 2", "CSE Sem 1"]
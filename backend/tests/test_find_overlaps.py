@@ -0,0 +1,57 @@
+# backend/tests/test_find_overlaps.py
+"""The sweep-line find_overlaps against the plain pairwise check"""
+import random
+
+from app.services.timetable.advanced_generator import AdvancedTimetableGenerator, ScheduleEntry, TimeSlot
+from benchmarks.instances import generate_instance, preset
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+def _pairwise_overlaps(schedule):
+    pairs = []
+    for i, a in enumerate(schedule):
+        for j in range(i + 1, len(schedule)):
+            b = schedule[j]
+            shared = a.room_id == b.room_id or a.faculty_id == b.faculty_id or a.group_id == b.group_id
+            if shared and a.time_slot.overlaps(b.time_slot):
+                pairs.append((i, j))
+    return pairs
+
+def _random_generator(rng: random.Random, entries: int) -> AdvancedTimetableGenerator:
+    generator = generate_instance(preset("medium")).load_into(AdvancedTimetableGenerator())
+    generator.schedule = []
+    for _ in range(entries):
+        course = rng.choice(generator.courses)
+        start = rng.randrange(480, 1000, 10)
+        duration = rng.choice([50, 100, 180])
+        generator.schedule.append(ScheduleEntry(
+            course.code, course.name, rng.choice(generator.groups).id, rng.choice(generator.faculty).id,
+            rng.choice(generator.rooms).id, TimeSlot(rng.choice(DAYS), start, start + duration),
+            duration == 180, duration
+        ))
+    return generator
+
+def test_matches_pairwise_check_on_random_schedules():
+    rng = random.Random(10)
+    for entries in [0, 1, 2, 5, 20, 80, 150] * 20:
+        generator = _random_generator(rng, entries)
+        assert generator.find_overlaps() == _pairwise_overlaps(generator.schedule)
+
+def test_touching_sessions_do_not_overlap():
+    generator = _random_generator(random.Random(0), 0)
+    course = generator.courses[0]
+    generator.schedule = [
+        ScheduleEntry(course.code, course.name, "G1", "F001", "R01", TimeSlot("Mon", 540, 590), False, 50),
+        ScheduleEntry(course.code, course.name, "G1", "F001", "R01", TimeSlot("Mon", 590, 640), False, 50),
+        ScheduleEntry(course.code, course.name, "G1", "F001", "R01", TimeSlot("Tue", 540, 590), False, 50),
+    ]
+    assert generator.find_overlaps() == []
+
+def test_pair_sharing_several_resources_is_reported_once():
+    generator = _random_generator(random.Random(0), 0)
+    course = generator.courses[0]
+    generator.schedule = [
+        ScheduleEntry(course.code, course.name, "G1", "F001", "R01", TimeSlot("Mon", 540, 640), False, 100),
+        ScheduleEntry(course.code, course.name, "G1", "F001", "R01", TimeSlot("Mon", 590, 640), False, 50),
+    ]
+    assert generator.find_overlaps() == [(0, 1)]
@@ -0,0 +1,73 @@
+# backend/tests/test_generation_jobs.py
+"""Background generation jobs against an in-memory stand-in for the database"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.db.mongodb import db
+from app.services.timetable.jobs import JOB_CANCELLED, GenerationJobManager
+from app.services.timetable.parallel import run_in_thread
+
+class _Jobs:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        doc_id = ObjectId()
+        self.docs[doc_id] = dict(doc, _id=doc_id)
+        return SimpleNamespace(inserted_id=doc_id)
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        status = query.get("status")
+        matched = doc is not None and (status is None or doc["status"] in (
+            status["$in"] if isinstance(status, dict) else [status]))
+        if matched:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=int(matched), modified_count=int(matched))
+
+def test_cancelled_job_keeps_its_slot_until_the_engine_thread_returns(monkeypatch):
+    jobs = _Jobs()
+    monkeypatch.setattr(db, "db", SimpleNamespace(generation_jobs=jobs))
+    executor = ThreadPoolExecutor(max_workers=2)
+    engine_running, engine_release = threading.Event(), threading.Event()
+
+    def engine(progress):
+        engine_running.set()
+        # A stopped engine still finishes its current step before returning
+        engine_release.wait(5)
+        progress({"step": 1})
+        return {"success": True}
+
+    async def scenario():
+        started = asyncio.Event()
+        manager = GenerationJobManager(max_concurrent=1)
+
+        async def first(progress):
+            return await run_in_thread(executor, lambda: engine(progress))
+
+        async def second(progress):
+            started.set()
+            return {"success": True}
+
+        user = str(ObjectId())
+        job = await manager.submit("advanced", {}, user, first)
+        await asyncio.get_running_loop().run_in_executor(None, engine_running.wait, 5)
+        await manager.submit("advanced", {}, user, second)
+        assert await manager.cancel(str(job["_id"]))
+        await asyncio.sleep(0.05)
+        started_while_engine_ran = started.is_set()
+
+        engine_release.set()
+        await asyncio.wait_for(started.wait(), 5)
+        return job, started_while_engine_ran
+
+    job, started_while_engine_ran = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert not started_while_engine_ran
+    assert jobs.docs[job["_id"]]["status"] == JOB_CANCELLED
+    assert jobs.docs[job["_id"]]["result"] is None
@@ -0,0 +1,54 @@
+# backend/tests/test_occupancy_calendar.py
+"""Booking and unbooking in the bitmask OccupancyCalendar"""
+from app.services.timetable.advanced_generator import OccupancyCalendar, TimeSlot
+
+def test_book_marks_only_the_slot_busy():
+    calendar = OccupancyCalendar(["R1"])
+    calendar.book("R1", TimeSlot("Mon", 540, 590))
+
+    assert not calendar.is_free("R1", TimeSlot("Mon", 560, 600))
+    assert calendar.is_free("R1", TimeSlot("Mon", 590, 640))
+    assert calendar.is_free("R1", TimeSlot("Tue", 540, 590))
+    assert calendar["R1"] == [TimeSlot("Mon", 540, 590)]
+
+def test_unbook_frees_the_slot():
+    calendar = OccupancyCalendar(["R1"])
+    slot = TimeSlot("Mon", 540, 590)
+    calendar.book("R1", slot)
+    calendar.unbook("R1", slot)
+
+    assert calendar.is_free("R1", slot)
+    assert calendar["R1"] == []
+
+def test_unbook_keeps_overlapping_reservations():
+    calendar = OccupancyCalendar(["R1"])
+    reserved = TimeSlot("Mon", 540, 720)
+    session = TimeSlot("Mon", 590, 640)
+    calendar.reserve("R1", reserved)
+    calendar.book("R1", session)
+    calendar.unbook("R1", session)
+
+    assert not calendar.is_free("R1", session)
+    assert not calendar.is_free("R1", TimeSlot("Mon", 700, 750))
+    assert calendar.is_free("R1", TimeSlot("Mon", 720, 770))
+    assert calendar["R1"] == [reserved]
+
+def test_booked_counts_sessions_and_reservations():
+    calendar = OccupancyCalendar(["F1"])
+    calendar.reserve("F1", TimeSlot("Mon", 540, 590))
+    calendar.book("F1", TimeSlot("Tue", 540, 590))
+    calendar.book("F1", TimeSlot("Tue", 540, 590))
+    assert calendar.booked("F1") == 3
+    calendar.unbook("F1", TimeSlot("Tue", 540, 590))
+    assert calendar.booked("F1") == 2
+
+def test_unbook_of_a_duplicate_booking_keeps_the_other():
+    calendar = OccupancyCalendar(["F1"])
+    slot = TimeSlot("Wed", 600, 650)
+    calendar.book("F1", slot)
+    calendar.book("F1", slot)
+    calendar.unbook("F1", slot)
+
+    assert not calendar.is_free("F1", slot)
+    calendar.unbook("F1", slot)
+    assert calendar.is_free("F1", slot)
@@ -0,0 +1,47 @@
+from app.services.timetable import parallel
+from app.services.timetable.parallel import map_bounded, worker_count
+
+
+class _Future:
+    def __init__(self, value):
+        self.value = value
+
+    def done(self):
+        return True
+
+    def result(self):
+        return self.value
+
+
+class _Pool:
+    """Runs calls inline and records how many were outstanding at once"""
+    def __init__(self):
+        self.outstanding = 0
+        self.peak = 0
+
+    def submit(self, function, *args):
+        self.outstanding += 1
+        self.peak = max(self.peak, self.outstanding)
+        return _Future(function(*args))
+
+
+def test_worker_count_is_capped_by_cpus_and_tasks(monkeypatch):
+    monkeypatch.setattr(parallel, "default_worker_count", lambda: 4)
+    assert worker_count(None, 15) == 4
+    assert worker_count(64, 15) == 4
+    assert worker_count(8, 3) == 3
+    assert worker_count(2, 15) == 2
+    assert worker_count(0, 0) == 1
+
+
+def test_map_bounded_limits_futures_in_flight(monkeypatch):
+    pool = _Pool()
+
+    def wait(running, return_when):
+        pool.outstanding -= len(running)
+        return set(running), set()
+
+    monkeypatch.setattr(parallel, "wait", wait)
+    results = map_bounded(pool, pow, [(n, 2) for n in range(10)], 3)
+    assert results == [n * n for n in range(10)]
+    assert pool.peak <= 3
@@ -0,0 +1,75 @@
+# backend/tests/test_repair.py
+"""Outcomes of AdvancedTimetableGenerator.repair_timetable"""
+import contextlib
+import copy
+import io
+
+import pytest
+
+from app.services.timetable.advanced_generator import AdvancedTimetableGenerator
+from benchmarks.instances import generate_instance, preset
+
+INSTANCE = generate_instance(preset("medium"))
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+def _generator() -> AdvancedTimetableGenerator:
+    return INSTANCE.load_into(AdvancedTimetableGenerator())
+
+@pytest.fixture(scope="module")
+def entries():
+    result = _quiet(_generator().generate_timetable, attempts=5, workers=1, seed=3, improve_iterations=0)
+    assert result["success"]
+    return result["schedule"]
+
+def _repair(generator, entries, **kwargs):
+    return _quiet(generator.repair_timetable, copy.deepcopy(entries), seed=1, **kwargs)
+
+def test_unchanged_data_keeps_every_entry(entries):
+    generator = _generator()
+    result = _repair(generator, entries)
+
+    assert result["success"]
+    assert result["repair"]["kept"] == len(entries)
+    assert result["repair"]["reassigned"] == result["repair"]["added"] == 0
+    assert generator.find_overlaps() == []
+
+def test_faculty_matched_by_course_name_is_kept(entries):
+    generator = _generator()
+    names = {course.code: course.name for course in generator.courses}
+    for fac in generator.faculty:
+        fac.subjects = [names[code] for code in fac.subjects]
+    result = _repair(generator, entries)
+
+    assert result["success"]
+    assert result["repair"]["kept"] == len(entries)
+    assert result["repair"]["reassigned"] == 0
+
+def test_unavailable_faculty_is_replaced_without_clashes(entries):
+    generator = _generator()
+    busiest = max({entry["faculty_id"] for entry in entries},
+                  key=lambda fid: sum(entry["faculty_id"] == fid for entry in entries))
+    result = _repair(generator, entries, unavailable_faculty=[busiest])
+
+    if result["success"]:
+        assert all(entry["faculty_id"] != busiest for entry in result["schedule"])
+        assert generator.find_overlaps() == []
+    assert result["repair"]["kept"] < len(entries)
+
+def test_stopped_repair_is_not_a_success(entries):
+    generator = _generator()
+    generator.courses[0].hours_per_week += 3   # leaves sessions to place after the kept entries
+    events = []
+
+    def stop(event):
+        events.append(event)
+        return True
+
+    result = _repair(generator, entries, progress=stop)
+
+    assert len(events) == 1 and events[0]["total"] > 1
+    assert not result["success"]
+    assert result["stopped_early"] and result["repair"]["stopped_early"]
+    assert len(result["repair"]["unplaced"]) == events[0]["total"] - events[0]["placed"]
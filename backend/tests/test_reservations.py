@@ -0,0 +1,131 @@
+# backend/tests/test_reservations.py
+"""Rooms and faculty reserved by other timetables, in every engine"""
+import asyncio
+import contextlib
+import io
+from dataclasses import replace
+
+from app.services.genetic_algorithm.genetic_timetable_generator import (
+    Chromosome, GeneticTimetableGenerator, TimetableGene
+)
+from app.db.mongodb import db
+from app.services.timetable.advanced_generator import (
+    AdvancedTimetableGenerator, TimeSlot, merge_slots, min2t, stored_entry_slot
+)
+from app.services.timetable.cpsat_generator import CPSATTimetableGenerator
+from app.services.timetable.institution import find_cross_program_clashes
+from benchmarks.instances import generate_instance, preset
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+def _instance(seed: int):
+    return generate_instance(replace(preset("small", seed=seed), rooms=3, lab_rooms=2, faculty=5))
+
+def _published():
+    generator = _instance(0).load_into(AdvancedTimetableGenerator())
+    assert _quiet(generator.generate_timetable, attempts=3, workers=1, seed=1, improve_iterations=0)["success"]
+    return list(generator.schedule)
+
+def _clashes(published, generator):
+    return find_cross_program_clashes({"published": published, "new": list(generator.schedule)})
+
+def test_merge_slots_gives_disjoint_slots_per_day():
+    slots = [
+        TimeSlot("Mon", 540, 590), TimeSlot("Mon", 540, 590),   # identical
+        TimeSlot("Mon", 560, 640),                               # overlapping
+        TimeSlot("Mon", 640, 690),                               # touching
+        TimeSlot("Mon", 800, 850), TimeSlot("Tue", 540, 590),
+    ]
+    assert merge_slots(slots) == [TimeSlot("Mon", 540, 690), TimeSlot("Mon", 800, 850), TimeSlot("Tue", 540, 590)]
+    assert merge_slots([]) == []
+
+def test_advanced_generator_avoids_reserved_resources():
+    published = _published()
+    generator = _instance(1).load_into(AdvancedTimetableGenerator())
+    generator.reserve_resources(published)
+    result = _quiet(generator.generate_timetable, attempts=3, workers=1, seed=2, improve_iterations=200)
+
+    assert result["success"]
+    assert _clashes(published, generator) == []
+
+def test_reserved_bookings_count_towards_resource_load():
+    generator = _instance(1).load_into(AdvancedTimetableGenerator())
+    room, fac = generator.rooms[0], generator.faculty[0]
+    generator.reserve(room.id, fac.id, TimeSlot("Mon", 540, 590))
+    generator.reserve(room.id, fac.id, TimeSlot("Tue", 540, 590))
+    generator.initialize_occupancy_tracking()
+    index = generator.get_resource_index()
+
+    assert index.room_load[room.id] == 2
+    assert index.faculty_load[fac.id] == 2
+
+def test_cpsat_solves_with_clashing_reservations():
+    published = _published()
+    generator = _instance(1).load_into(CPSATTimetableGenerator(time_limit_seconds=10, num_workers=1))
+    # The same bookings twice plus one overlapping them, as clashing published timetables give
+    generator.reserve_resources(published)
+    generator.reserve_resources(published)
+    first = published[0]
+    generator.reserve(first.room_id, first.faculty_id,
+                      TimeSlot(first.time_slot.day, first.time_slot.start_min + 10, first.time_slot.end_min + 10))
+    result = _quiet(generator.generate_timetable)
+
+    assert result["success"]
+    assert _clashes(published, generator) == []
+
+def test_genetic_reserved_slots_are_conflicts():
+    instance = _instance(1)
+    generator = GeneticTimetableGenerator(test_mode=True, **instance.island_data())
+    generator.generate_time_slots()
+    data = instance.island_data()
+    slot = generator.time_slots[0]
+    gene = TimetableGene(data["courses"][0]["id"], data["faculties"][0]["id"], data["rooms"][0]["id"],
+                         data["student_groups"][0]["id"], slot, "theory")
+    chromosome = Chromosome(genes=[gene])
+    assert generator._check_conflicts(chromosome) == []
+    free_fitness = generator.calculate_fitness(chromosome)
+    unreserved_key = generator.input_fingerprint(seed=1)
+
+    reserved = TimeSlot(slot.day[:3].title(), 540, 720)   # covers the first morning slot
+    generator = GeneticTimetableGenerator(test_mode=True, reservations=[(gene.room_id, gene.faculty_id, reserved)],
+                                          **instance.island_data())
+    generator.generate_time_slots()
+
+    assert len(generator._check_conflicts(chromosome)) == 2
+    assert generator.calculate_fitness(chromosome) < free_fitness
+    assert generator.input_fingerprint(seed=1) != unreserved_key
+    assert "reservations" in generator.island_settings()
+
+class _Timetables:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class _Database:
+    def __init__(self, timetables):
+        self.timetables = _Timetables(timetables)
+
+def test_weekend_bookings_of_published_timetables_are_reserved(monkeypatch):
+    assert stored_entry_slot({"day": "Saturday", "start_time": "09:00", "end_time": "09:50"}) == TimeSlot("Sat", 540, 590)
+    assert stored_entry_slot({"time_slot": {"day": "Sun", "start_time": "09:00", "end_time": "09:50"}}) == TimeSlot("Sun", 540, 590)
+
+    generator = _instance(1).load_into(AdvancedTimetableGenerator())
+    generator.rules.WORKING_DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+    room, fac = generator.rooms[0], generator.faculty[0]
+    saturday = TimeSlot("Sat", 540, 590)
+    monkeypatch.setattr(db, "db", _Database([{"entries": [{
+        "room_id": room.id, "faculty_id": fac.id,
+        "time_slot": {"day": "Saturday", "start_time": min2t(saturday.start_min), "end_time": min2t(saturday.end_min)},
+    }]}]))
+
+    assert _quiet(asyncio.run, generator.reserve_published_timetables()) == 1
+    generator.initialize_occupancy_tracking()
+    assert not generator.room_occupancy.is_free(room.id, saturday)
+    assert not generator.faculty_occupancy.is_free(fac.id, saturday)
@@ -0,0 +1,91 @@
+# backend/tests/test_workbook_sheets.py
+"""Sheets of the write-only Excel export"""
+import datetime
+import io
+
+import openpyxl
+import pytest
+
+from app.services.timetable.exporter import WorkbookSheets
+
+def _entry(day, start, group_name="A", room="101", faculty="Dr. A", program="CSE Sem 3"):
+    return {
+        "course_code": "CS101", "course_name": "Programming", "course_credits": 4, "entry_type": "lecture",
+        "day": day, "start_time": start, "end_time": "later",
+        "group_name": group_name, "faculty_name": faculty, "faculty_department": "CSE",
+        "room_number": room, "room_type": "lecture", "room_capacity": 60, "program": program,
+    }
+
+def _timetable(timetable_id, semester, entries):
+    return {
+        "timetable_id": timetable_id, "program_name": "B.Tech CSE", "program_code": "CSE", "semester": semester,
+        "academic_year": "2026-27", "created_at": datetime.datetime(2026, 7, 1, 9, 30), "entries": entries,
+    }
+
+def _load(sheets: WorkbookSheets):
+    buffer = io.BytesIO()
+    sheets.save(buffer)
+    buffer.seek(0)
+    return openpyxl.load_workbook(buffer)
+
+def test_namesakes_get_their_own_sheets():
+    sheets = WorkbookSheets(["group"])
+    sheets.add_resource("group", "A", [_entry("Mon", "09:00", program="CSE Sem 3")])
+    sheets.add_resource("group", "A", [_entry("Mon", "09:00", program="CSE Sem 5")])
+    workbook = _load(sheets)
+
+    assert workbook.sheetnames == ["Group A", "Group A (2)"]
+    assert workbook["Group A"]["G4"].value == "CSE Sem 3"
+    assert workbook["Group A (2)"]["G4"].value == "CSE Sem 5"
+
+def test_resource_sheet_layout():
+    sheets = WorkbookSheets(["room"])
+    sheets.add_resource("room", "101", [_entry("Mon", "09:00"), _entry("Wed", "09:00")])
+    sheet = _load(sheets)["Room 101"]
+
+    assert sheet["A1"].value == "Room: 101"
+    assert sheet["A1"].style == "timetable_title"
+    assert sheet["A3"].style == "timetable_header"
+    assert sheet.freeze_panes == "A4"
+    assert [row[:2] for row in sheet.iter_rows(min_row=4, values_only=True)] == [
+        ("Mon", "09:00 - later"), ("Wed", "09:00 - later")
+    ]
+    assert sheet["D4"].style == "timetable_cell"
+    assert sheet["H4"].value == "Lecture"
+
+def test_timetable_view_has_a_sheet_per_timetable_sorted_by_day_and_time():
+    sheets = WorkbookSheets(["timetable"])
+    sheets.add_timetable(_timetable("t1", 3, [_entry("Wed", "09:00"), _entry("Mon", "11:00"), _entry("Mon", "09:00")]))
+    sheets.add_timetable(_timetable("t2", 3, [_entry("Mon", "09:00")]))
+    workbook = _load(sheets)
+
+    assert workbook.sheetnames == ["CSE Sem 3", "CSE Sem 3 (2)"]
+    sheet = workbook["CSE Sem 3"]
+    assert [row[:2] for row in sheet.iter_rows(min_row=9, values_only=True)] == [
+        ("Mon", "09:00 - later"), ("Mon", "11:00 - later"), ("Wed", "09:00 - later")
+    ]
+
+def test_timetable_sheet_keeps_the_single_export_layout():
+    sheets = WorkbookSheets(["timetable"])
+    sheets.add_timetable(_timetable("t1", 3, [_entry("Mon", "09:00")]))
+    sheet = _load(sheets)["CSE Sem 3"]
+
+    assert sheet["A1"].value == "Timetable - B.Tech CSE"
+    assert [sheet.cell(row=row, column=1).value for row in range(3, 7)] == [
+        "Program: CSE", "Semester: 3", "Academic Year: 2026-27", "Generated: 2026-07-01 09:30"
+    ]
+    assert [cell.value for cell in sheet[8]] == [
+        "Day", "Time", "Course Code", "Course Name", "Credits", "Faculty", "Department",
+        "Room", "Room Type", "Capacity", "Type"
+    ]
+    assert [cell.value for cell in sheet[9]] == [
+        "Mon", "09:00 - later", "CS101", "Programming", 4, "Dr. A", "CSE", "101", "lecture", 60, "Lecture"
+    ]
+    assert sheet.freeze_panes == "A9"
+
+def test_empty_export_still_has_a_sheet():
+    assert _load(WorkbookSheets(["group"])).sheetnames == ["Timetable"]
+
+def test_unknown_views_are_rejected():
+    with pytest.raises(ValueError):
+        WorkbookSheets(["bogus"])